@@ -1,18 +1,101 @@
-from fastapi import FastAPI, UploadFile, Form, File
+from fastapi import FastAPI, APIRouter, UploadFile, Form, File, Header
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from src.extraction.unstructured_extraction import DocumentExtractor
-from src.embedding.chroma_embedder import ChromaEmbedder
+from fastapi.responses import StreamingResponse, PlainTextResponse, FileResponse
 from src.rag_pipeline.retriever import Retriever
 from src.rag_pipeline.context_builder import ContextBuilder
 from src.rag_pipeline.llm_wrapper import LLMWrapper
 from src.rag_pipeline.query_embedder import QueryEmbedder
-from src.chunking.chunker import StructuredChunker
-
-import uuid
+from src.rag_pipeline.embedding_scheduler import EmbeddingScheduler
+from src.rag_pipeline.answer_cache import AnswerCache, SingleFlight
+from src.ingestion.jobs import IngestionJobQueue
+from src.ingestion.documents import SessionDocuments, valid_id
+from src.ingestion.sessions import SessionManager
+from src.ingestion.upload_cache import UploadCache
+from src.extraction.image_assets import ImageAssets, THUMBNAIL_SIZES
+from src.embedding.model_registry import registry, CHROMA_SERVER, DEFAULT_DB_PATH
+from src.embedding.vector_store import DEFAULT_VECTOR_BACKEND
+from src.rag_pipeline.tokenizer import Tokenizer
+from src.observability import tracing
+
+import os
+import hmac
+import asyncio
 import json
+import time
+import uuid
+import logging
+import zipfile
+from concurrent.futures import wait
+from contextlib import asynccontextmanager
 from pathlib import Path
-
-app = FastAPI()
+from types import SimpleNamespace
+from typing import List, Optional
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    started = time.perf_counter()
+    workers = []
+    if SERVES_INGEST:
+        app.state.jobs = IngestionJobQueue(
+            base_dir=DATA_DIR,
+            max_workers=INGEST_WORKERS,
+            max_pending=INGEST_MAX_PENDING,
+            save_artifacts=SAVE_ARTIFACTS,
+            page_workers=EXTRACT_PAGE_WORKERS,
+            strategy=EXTRACT_STRATEGY,
+            use_cache=UPLOAD_CACHE,
+            embedding_cache_size=EMBEDDING_CACHE_SIZE
+        )
+        # Workers load the embedding model and extraction stack while this process warms up
+        workers = app.state.jobs.warmup()
+    if SERVES_QUERY:
+        # Load the embedding model, Chroma client and tokenizer once, before serving traffic
+        registry.warmup(db_paths=() if DEFAULT_VECTOR_BACKEND == "numpy" else (DEFAULT_DB_PATH,))
+        Tokenizer.get()
+        app.state.answer_cache = AnswerCache(
+            max_entries=ANSWER_CACHE_SIZE,
+            ttl=ANSWER_CACHE_TTL,
+            similarity=ANSWER_CACHE_SIMILARITY
+        )
+        app.state.single_flight = SingleFlight()
+    # Idle sessions are evicted in the background (SESSION_TTL, SESSION_DISK_QUOTA_MB) by the
+    # process that runs ingestion, the only one that knows which sessions have jobs in flight
+    app.state.sessions = SessionManager(
+        base_dir=DATA_DIR, busy=app.state.jobs.active_sessions if SERVES_INGEST else None
+    )
+    if SERVES_INGEST:
+        app.state.sessions.start()
+    wait(workers)
+    _log_startup(time.perf_counter() - started, sum(1 for worker in workers if worker.exception() is None))
+    yield
+    app.state.sessions.stop()
+    if SERVES_INGEST:
+        app.state.jobs.shutdown()
+    if SERVES_QUERY:
+        await LLMWrapper.aclose()
+
+
+def _log_startup(warmup_seconds, ingest_workers):
+    stats = tracing.process_stats()
+    fields = [f"role={APP_ROLE}", f"warmup={warmup_seconds:.2f}s"]
+    if stats["uptime_seconds"] is not None:
+        fields.append(f"ready_after={stats['uptime_seconds']:.2f}s")
+    if stats["rss_mb"] is not None:
+        fields.append(f"rss={stats['rss_mb']:.0f}MB")
+    if stats["peak_rss_mb"] is not None:
+        fields.append(f"peak_rss={stats['peak_rss_mb']:.0f}MB")
+    if SERVES_INGEST:
+        fields.append(f"ingest_workers={ingest_workers}/{INGEST_WORKERS}")
+    # uvicorn's logger, so the line shows up next to "Application startup complete"
+    logging.getLogger("uvicorn.error").info("RAGpedia ready: %s", " ".join(fields))
+
+
+app = FastAPI(lifespan=lifespan)
+# Routes only served when APP_ROLE includes querying / ingestion
+query_routes = APIRouter()
+ingest_routes = APIRouter()
 
 # app.add_middleware(
 #     CORSMiddleware,
@@ -25,148 +108,423 @@ app.add_middleware(
     CORSMiddleware,
     allow_origins=["https://your-frontend-domain.com"],  # Only allow your frontend
     allow_credentials=True,
-    allow_methods=["POST"],  # or specify exact ones
+    allow_methods=["GET", "POST", "PUT"],  # or specify exact ones
     allow_headers=["Content-Type", "Authorization"],
 )
 DATA_DIR = Path("data")
+# "query" serves /query only (no ingestion workers), "ingest" serves uploads only (no
+# query model in the API process), "all" serves both; each warms up only what it serves
+APP_ROLE = os.getenv("APP_ROLE", "all")
+if APP_ROLE not in ("all", "query", "ingest"):
+    raise ValueError(f"Unknown APP_ROLE: {APP_ROLE}")
+SERVES_QUERY = APP_ROLE in ("all", "query")
+SERVES_INGEST = APP_ROLE in ("all", "ingest")
+if SERVES_INGEST and DEFAULT_VECTOR_BACKEND == "chroma" and not CHROMA_SERVER:
+    # Ingestion workers write from their own processes, which a local Chroma directory doesn't support
+    raise ValueError("VECTOR_BACKEND=chroma with ingestion needs a shared Chroma server (CHROMA_SERVER)")
+SUPPORTED_EXTENSIONS = (".pdf", ".docx")
+# Also write extracted.json / chunked.json per session (debugging aid)
+SAVE_ARTIFACTS = os.getenv("SAVE_INGEST_ARTIFACTS", "0") == "1"
+# Ingestion runs on its own process pool, capped independently of API workers
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "2"))
+INGEST_MAX_PENDING = int(os.getenv("INGEST_MAX_PENDING", "16"))
+# Limits of one /upload-batch request: documents (archive members included) and their total
+# uncompressed size
+BATCH_MAX_FILES = int(os.getenv("BATCH_MAX_FILES", "64"))
+BATCH_MAX_MB = float(os.getenv("BATCH_MAX_MB", "512"))
+# Processes used to partition page ranges of one PDF in parallel (0 = single pass)
+EXTRACT_PAGE_WORKERS = int(os.getenv("EXTRACT_PAGE_WORKERS", "0"))
+# "hi_res" for every PDF page, or "auto" to use the fast text-layer path where possible
+EXTRACT_STRATEGY = os.getenv("EXTRACT_STRATEGY", "hi_res")
+# Reuse extraction, chunks and embeddings for byte-identical uploads
+UPLOAD_CACHE = os.getenv("UPLOAD_CACHE", "1") == "1"
+# Max chunk embeddings kept in the cross-session embedding cache (0 disables it)
+EMBEDDING_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE", "200000"))
+# Answers reused for near-identical questions over the same retrieved chunks (size 0 disables)
+ANSWER_CACHE_SIZE = int(os.getenv("ANSWER_CACHE_SIZE", "1024"))
+ANSWER_CACHE_TTL = float(os.getenv("ANSWER_CACHE_TTL", "600"))
+ANSWER_CACHE_SIMILARITY = float(os.getenv("ANSWER_CACHE_SIMILARITY", "0.95"))
+# /admin endpoints require it in the X-Admin-Token header; without it they are disabled
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
 
 
 @app.post("/new-session")
 def new_session():
     session_id = str(uuid.uuid4())[:8]
+    app.state.sessions.touch(session_id, create=True)
     return {"session_id": session_id}
 
 
-@app.post("/upload")
-def upload(file: UploadFile = File(...), session_id: str = Form(...)):
+@ingest_routes.post("/upload")
+def upload(file: UploadFile = File(...), session_id: str = Form(...), doc_id: Optional[str] = Form(None)):
+    with tracing.trace("upload") as current:
+        try:
+            if not app.state.sessions.valid_id(session_id):
+                raise ValueError(f"Invalid session id: {session_id}")
+            if doc_id is not None and not valid_id(doc_id):
+                raise ValueError(f"Invalid document id: {doc_id}")
+            app.state.sessions.touch(session_id, create=True)
+            # Extraction, chunking and embedding run in the background under the same
+            # trace id; poll /jobs/{job_id}
+            job_id = app.state.jobs.submit(file, session_id, doc_id=doc_id, trace_id=current.trace_id)
+            return {
+                "status": "queued",
+                "job_id": job_id,
+                "session_id": session_id,
+                "trace_id": current.trace_id
+            }
+
+        except Exception as e:
+            current.fail(e)
+            return {"status": "error", "detail": str(e), "trace_id": current.trace_id}
+
+
+def _archive_members(archive):
+    for info in archive.infolist():
+        name = Path(info.filename).name
+        if not info.is_dir() and name.lower().endswith(SUPPORTED_EXTENSIONS):
+            yield name, info
+
+
+def _measure_uploads(files):
+    # (documents, uncompressed bytes) of a batch, read from the zip directories without
+    # extracting anything; a member can't expand past the size recorded there
+    count, size = 0, 0
+    for file in files:
+        if not file.filename.lower().endswith(".zip"):
+            count += 1
+            size += file.file.seek(0, os.SEEK_END)
+            file.file.seek(0)
+            continue
+        with zipfile.ZipFile(file.file) as archive:
+            for _, info in _archive_members(archive):
+                count += 1
+                size += info.file_size
+        file.file.seek(0)
+    return count, size
+
+
+def _expand_uploads(files):
+    # Yields (filename, fileobj) for every document, unpacking .zip archives
+    for file in files:
+        if not file.filename.lower().endswith(".zip"):
+            yield file.filename, file.file
+            continue
+        with zipfile.ZipFile(file.file) as archive:
+            for name, info in _archive_members(archive):
+                with archive.open(info) as member:
+                    yield name, member
+
+
+@ingest_routes.post("/upload-batch")
+def upload_batch(files: List[UploadFile] = File(...), session_id: str = Form(...)):
+    # Every document becomes its own job, so they extract and embed concurrently
+    # (up to INGEST_WORKERS) into the same session collection
+    jobs = []
+    with tracing.trace("upload_batch") as current:
+        try:
+            if not app.state.sessions.valid_id(session_id):
+                raise ValueError(f"Invalid session id: {session_id}")
+            count, size = _measure_uploads(files)
+            if count > BATCH_MAX_FILES:
+                raise ValueError(f"Batch holds {count} documents; at most {BATCH_MAX_FILES} are accepted")
+            if size > BATCH_MAX_MB * 1024 * 1024:
+                raise ValueError(
+                    f"Batch is {size / 1024 / 1024:.1f} MB uncompressed; at most {BATCH_MAX_MB:g} MB are accepted"
+                )
+            app.state.sessions.touch(session_id, create=True)
+            # Every document takes its own INGEST_MAX_PENDING slot, reserved before any is spooled
+            with app.state.jobs.reserve(count) as reservation:
+                for filename, fileobj in _expand_uploads(files):
+                    try:
+                        job_id = app.state.jobs.submit(
+                            SimpleNamespace(filename=filename, file=fileobj), session_id,
+                            trace_id=current.trace_id, reservation=reservation
+                        )
+                        jobs.append({"filename": filename, "status": "queued", "job_id": job_id})
+                    except Exception as e:
+                        jobs.append({"filename": filename, "status": "error", "detail": str(e)})
+
+            return {
+                "status": "queued",
+                "session_id": session_id,
+                "jobs": jobs,
+                "trace_id": current.trace_id
+            }
+
+        except Exception as e:
+            current.fail(e)
+            return {"status": "error", "detail": str(e), "jobs": jobs, "trace_id": current.trace_id}
+
+
+@app.get("/sessions/{session_id}/documents")
+def session_documents(session_id: str):
+    if not app.state.sessions.valid_id(session_id):
+        return {"status": "error", "detail": f"Invalid session id: {session_id}"}
+    app.state.sessions.touch(session_id)
+    return {
+        "session_id": session_id,
+        "documents": SessionDocuments(DATA_DIR, session_id).list()
+    }
+
+
+def _image_assets(session_id: str, name: str):
+    # A session's images are in its own directory or, for cached uploads, in the upload
+    # cache entry of one of its documents
+    if not (app.state.sessions.valid_id(session_id) and ImageAssets.valid_name(name)):
+        return None
+    image_dirs = [DATA_DIR / session_id / "images"] + [
+        UploadCache(DATA_DIR).entry_dir(record["digest"]) / "images"
+        for record in SessionDocuments(DATA_DIR, session_id).list() if record.get("digest")
+    ]
+    for image_dir in image_dirs:
+        if (image_dir / name).is_file():
+            return ImageAssets(image_dir)
+    return None
+
+
+@app.get("/sessions/{session_id}/images/{name}")
+def session_image(session_id: str, name: str):
+    assets = _image_assets(session_id, name)
+    if assets is None:
+        return {"status": "error", "detail": f"Unknown image: {name}"}
+    app.state.sessions.touch(session_id)
+    return FileResponse(assets.image_dir / name)
+
+
+@app.get("/sessions/{session_id}/images/{name}/thumbnail")
+def session_image_thumbnail(session_id: str, name: str, size: int = 256):
+    # Generated on the first request for each size, then served from disk
+    if size not in THUMBNAIL_SIZES:
+        return {"status": "error", "detail": f"size must be one of {list(THUMBNAIL_SIZES)}"}
+    assets = _image_assets(session_id, name)
+    if assets is None:
+        return {"status": "error", "detail": f"Unknown image: {name}"}
+    app.state.sessions.touch(session_id)
     try:
-        session_dir = DATA_DIR / session_id
-        session_dir.mkdir(parents=True, exist_ok=True)
-
-        # Step 1: Extract
-        extractor = DocumentExtractor(session_id=session_id, base_dir=DATA_DIR)
-        extracted = extractor.process(file)
-
-        # Step 2: Save raw extracted output to JSON
-        json_path = session_dir / "extracted.json"
-        with open(json_path, "w", encoding="utf-8") as f:
-            json.dump(extracted, f, indent=2, ensure_ascii=False)
-
-        # Step 3: Chunk using StructuredChunker
-        chunker = StructuredChunker(input_path=json_path)
-        chunks = chunker.chunk()
-        chunked_json_path = session_dir/"chunked.json"
-        with open(chunked_json_path, "w", encoding="utf-8") as f:
-            json.dump(chunks, f, indent=2, ensure_ascii=False)
-        # Step 4: Embed chunks to Chroma
-        embedder = ChromaEmbedder(chunk_json_path=chunked_json_path,collection_name=session_id)
-        embedder.embed_and_store()
-
-        return {
-            "status": "success",
-            "message": f"{len(chunks)} chunks embedded.",
-            "chunks": len(chunks),
-            "images": len(extracted["images"]),
-            "tables": len(extracted["tables"]),
-            "code_snippets": len(extracted["code_snippets"])
-        }
-
+        return FileResponse(assets.thumbnail(name, size))
     except Exception as e:
         return {"status": "error", "detail": str(e)}
 
 
-@app.post("/query")
-def query(user_query: str = Form(...), session_id: str = Form(...)):
-    try:
-        # Step 1: Embed the query
-        query_vector = QueryEmbedder().embed(user_query)
-
-        # Step 2: Retrieve top chunks
-        retriever = Retriever(collection_name=session_id)
-        top_chunks = retriever.retrieve(query_embedding=query_vector, top_k=5)
-
-        # Step 3: Build context
-        builder = ContextBuilder()
-        context_data = builder.build(top_chunks)
-
-        # Step 4: LLM
-#         system_prompt = """
-# You are a helpful assistant that provides clear, well-structured, and well-formatted answers based on the given context.
-
-# Always follow these rules:
-# - Use Markdown formatting throughout.
-# - Structure the response into numbered major topics and subtopics based on core concepts, not just listing content types.
-# - Integrate **all image references** directly in the explanation using `![Alt Text](path)` and provide descriptive captions and contextual relevance.
-# - Include all **tables** and **code snippets** exactly as provided, embedding them naturally where they support the explanation.
-# - Use bullet points or numbered lists to organize details within subtopics.
-# - Use math notation (LaTeX style) where appropriate for equations.
-# - Be concise yet thorough, ensuring no referenced visual or code element is omitted.
-# - Write in a conversational, academic style suitable for graduate-level readers.
-
-# Never treat images, tables, or code snippets as separate sections; always embed them smoothly into the flow of your explanation.
-# """
-
-        system_prompt = """
-You are an intelligent documentation assistant built to help users understand complex documents like financial guides, software manuals, and scientific papers.
-
-You must always follow these formatting and response rules:
-
-1. **Markdown Output**
-   - Your final answer must be fully written in **Markdown syntax**.
-   - Include all visual elements (images, tables, code) inline with proper formatting.
-   - Start every major section with a Markdown heading (##, ###) based on context hierarchy.
-
-2. **Images**
-   - If any image path is provided in the context, embed it directly using:
-     `![Descriptive Alt Text](data/session_<session_id>/images/<filename>.png)`
-   - The image must be accompanied by a **clear, helpful caption** explaining its relevance.
-
-3. **Tables**
-   - If table HTML or text is provided, insert it using Markdown's triple backticks:
-     ```html
-     <!-- Table -->
-     <table>...</table>
-     ```
-   - Mention the table title or summary **before** the table.
-
-4. **Code Snippets**
-   - Wrap all code blocks in triple backticks with correct language syntax:
-     ```python
-     def example():
-         print("Hello World")
-     ```
-
-5. **Structure**
-   - Organize your response into **numbered major sections** and **bullet-point sublists**.
-   - Maintain academic tone: concise, graduate-level, and easy to follow.
-   - If math equations are needed, use LaTeX-style Markdown (e.g., `$E = mc^2$`).
-
-6. **Accuracy and Relevance**
-   - Only use provided context to answer.
-   - Avoid hallucination. Do not invent image filenames or paths.
-   - Embed only the visual/code/table elements actually present in the context.
-
-7. **Consistency**
-   - Always use the same path format: `data/session_<session_id>/images/<filename>.png`
-   - Ensure every chunk of content has its accompanying image/table/code in the **same section**.
-
-Never output plain text explanations without Markdown formatting. Never place visuals at the end or outside of the explanation.
-"""
-
-        llm = LLMWrapper()
-        result = llm.query(
-            user_query=user_query,
-            context=context_data["context"],
-            image_refs=context_data["images"],
-            table_refs=context_data["tables"],
-            code_snippets=context_data["code"],
-            system_prompt=system_prompt
-        )
-
-        return {
-            "status": "success",
-            "response": result
-        }
-
-    except Exception as e:
-        return {"status": "error", "detail": str(e)}
+@ingest_routes.put("/sessions/{session_id}/documents/{doc_id}")
+def update_document(session_id: str, doc_id: str, file: UploadFile = File(...)):
+    with tracing.trace("upload") as current:
+        try:
+            if not app.state.sessions.valid_id(session_id):
+                raise ValueError(f"Invalid session id: {session_id}")
+            if not valid_id(doc_id):
+                raise ValueError(f"Invalid document id: {doc_id}")
+            app.state.sessions.touch(session_id)
+            # Only chunks whose content changed are embedded; removed ones are deleted
+            if SessionDocuments(DATA_DIR, session_id).get(doc_id) is None:
+                return {"status": "error", "detail": f"Unknown document: {doc_id}"}
+            job_id = app.state.jobs.submit(file, session_id, doc_id=doc_id, trace_id=current.trace_id)
+            return {
+                "status": "queued",
+                "job_id": job_id,
+                "session_id": session_id,
+                "doc_id": doc_id,
+                "trace_id": current.trace_id
+            }
+
+        except Exception as e:
+            current.fail(e)
+            return {"status": "error", "detail": str(e), "trace_id": current.trace_id}
+
+
+@ingest_routes.get("/jobs/{job_id}")
+def job_status(job_id: str):
+    job = app.state.jobs.get(job_id)
+    if job is None:
+        return {"status": "error", "detail": f"Unknown job id: {job_id}"}
+    return job
+
+
+def _build_context(user_query: str, session_id: str):
+    # Step 1: Embed the query
+    query_vector = QueryEmbedder().embed(user_query)
+
+    # Step 2: Retrieve top chunks (the session's store stays open between requests)
+    retriever = Retriever(collection_name=session_id, store=app.state.sessions.store(session_id))
+    top_chunks = retriever.retrieve(query_embedding=query_vector, top_k=5)
+
+    # Step 3: Build context
+    builder = ContextBuilder()
+    return builder.build(top_chunks), query_vector, top_chunks["ids"][0]
+
+
+async def _answer(user_query: str, session_id: str, on_token=None):
+    # With on_token, the LLM answer is streamed and each token passed to it as it arrives
+    app.state.sessions.touch(session_id)
+    # Embedding and retrieval are CPU/disk bound, so keep them off the event loop
+    context_data, query_vector, chunk_ids = await run_in_threadpool(_build_context, user_query, session_id)
+
+    # Same session, same retrieved chunks and a near-identical question: reuse the answer
+    cached = app.state.answer_cache.get(session_id, chunk_ids, query_vector)
+    if cached is not None:
+        if on_token is not None:
+            on_token(cached)
+        return cached, None
+
+    # Step 4: LLM
+    llm = LLMWrapper()
+    prompt = dict(
+        user_query=user_query,
+        context=context_data["context"],
+        image_refs=context_data["images"],
+        table_refs=context_data["tables"],
+        code_snippets=context_data["code"]
+    )
+    if on_token is None:
+        result = await llm.aquery(**prompt)
+    else:
+        tokens = []
+        async for token in llm.astream(**prompt):
+            tokens.append(token)
+            on_token(token)
+        result = "".join(tokens)
+    app.state.answer_cache.put(session_id, chunk_ids, query_vector, result)
+    return result, llm.last_prompt_stats
+
+
+def _flight_key(user_query: str, session_id: str):
+    return session_id, " ".join(user_query.lower().split())
+
+
+@query_routes.post("/query")
+async def query(user_query: str = Form(...), session_id: str = Form(...)):
+    with tracing.trace("query") as current:
+        try:
+            if not app.state.sessions.valid_id(session_id):
+                raise ValueError(f"Invalid session id: {session_id}")
+            # Identical questions already in flight for this session share one pipeline run
+            # (its spans are recorded under the trace of the request that started it)
+            result, prompt_stats = await app.state.single_flight.do(
+                _flight_key(user_query, session_id), lambda: _answer(user_query, session_id)
+            )
+
+            return {
+                "status": "success",
+                "response": result,
+                "prompt": prompt_stats,
+                "trace_id": current.trace_id
+            }
+
+        except Exception as e:
+            current.fail(e)
+            return {"status": "error", "detail": str(e), "trace_id": current.trace_id}
+
+
+@query_routes.get("/llm/metrics")
+def llm_metrics():
+    # Retry, hedge and circuit-breaker counters plus recent upstream latency,
+    # and how often the answer cache / single-flight saved an LLM call
+    return {
+        **LLMWrapper.resilience_metrics(),
+        "answer_cache": app.state.answer_cache.snapshot(),
+        "single_flight": app.state.single_flight.snapshot()
+    }
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    # Prometheus histograms of per-stage latency (ingestion stages are merged in as jobs finish)
+    return PlainTextResponse(tracing.prometheus_text(), media_type="text/plain; version=0.0.4")
+
+
+@query_routes.get("/embedding/metrics")
+def embedding_metrics():
+    # Query embedding micro-batching: queue depth, batch sizes, wait and encode times per model
+    return EmbeddingScheduler.metrics()
+
+
+def _admin_denied(token):
+    if not ADMIN_TOKEN:
+        return {"status": "error", "detail": "Admin endpoints are disabled; set ADMIN_TOKEN to enable them"}
+    if not token or not hmac.compare_digest(token.encode(), ADMIN_TOKEN.encode()):
+        return {"status": "error", "detail": "Admin token required"}
+    return None
+
+
+@ingest_routes.get("/admin/sessions")
+def admin_sessions(x_admin_token: Optional[str] = Header(None)):
+    # Every session with its last access, disk footprint and whether its store is loaded
+    return _admin_denied(x_admin_token) or app.state.sessions.list()
+
+
+@ingest_routes.delete("/admin/sessions/{session_id}")
+def admin_evict_session(session_id: str, x_admin_token: Optional[str] = Header(None)):
+    denied = _admin_denied(x_admin_token)
+    if denied:
+        return denied
+    if not app.state.sessions.valid_id(session_id) or app.state.sessions.last_access(session_id) is None:
+        return {"status": "error", "detail": f"Unknown session: {session_id}"}
+    if session_id in app.state.jobs.active_sessions():
+        return {"status": "error", "detail": f"Session {session_id} has ingestion jobs in flight"}
+    app.state.sessions.evict(session_id)
+    return {"status": "success", "session_id": session_id}
+
+
+@ingest_routes.post("/admin/sessions/sweep")
+def admin_sweep_sessions(x_admin_token: Optional[str] = Header(None)):
+    # Runs the TTL/quota eviction now instead of waiting for the background sweep
+    denied = _admin_denied(x_admin_token)
+    if denied:
+        return denied
+    return {"status": "success", "evicted": app.state.sessions.sweep()}
+
+
+def _sse(data, event=None):
+    message = f"event: {event}\n" if event else ""
+    return message + f"data: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@query_routes.post("/query/stream")
+async def query_stream(user_query: str = Form(...), session_id: str = Form(...)):
+    # Same pipeline as /query, but LLM tokens are sent as server-sent events as they arrive
+    async def events():
+        with tracing.trace("query_stream") as current:
+            try:
+                if not app.state.sessions.valid_id(session_id):
+                    raise ValueError(f"Invalid session id: {session_id}")
+                key = _flight_key(user_query, session_id)
+                leader = app.state.single_flight.join(key)
+                if leader is not None:
+                    # The same question is already being answered (streamed or not): wait for it
+                    # and send the answer in one piece
+                    result, _ = await asyncio.shield(leader)
+                    yield _sse({"token": result})
+                    yield _sse({"status": "success", "coalesced": True, "trace_id": current.trace_id},
+                               event="done")
+                    return
+
+                # This request leads the flight. The pipeline runs as its own task so that a
+                # client leaving doesn't cancel the answer other requests are waiting for.
+                tokens = asyncio.Queue()
+                task = app.state.single_flight.start(
+                    key, lambda: _answer(user_query, session_id, on_token=tokens.put_nowait)
+                )
+                task.add_done_callback(lambda _: tokens.put_nowait(None))
+                while (token := await tokens.get()) is not None:
+                    yield _sse({"token": token})
+                result, prompt_stats = await asyncio.shield(task)
+                done = {"status": "success", "trace_id": current.trace_id}
+                done.update({"cached": True} if prompt_stats is None else {"prompt": prompt_stats})
+                yield _sse(done, event="done")
+
+            except Exception as e:
+                current.fail(e)
+                yield _sse({"status": "error", "detail": str(e), "trace_id": current.trace_id}, event="error")
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+if SERVES_QUERY:
+    app.include_router(query_routes)
+if SERVES_INGEST:
+    app.include_router(ingest_routes)
@@ -0,0 +1,441 @@
+"""Offline throughput and latency benchmark of the ingestion and query pipeline.
+
+    python -m scripts.bench_pipeline --docs 8 --out bench.json
+    python -m scripts.bench_pipeline --corpus bench_corpus --skip api
+    python -m scripts.bench_pipeline --concurrency 16 --requests 200 --only api
+
+A synthetic corpus (scripts.synthetic_corpus) is generated unless --corpus
+points at existing PDF/DOCX files. Stages run in isolation, each on the
+output of the previous one, and then end to end:
+
+    extract     DocumentExtractor.iter_items, per document
+    chunk       StructuredChunker.iter_chunks, per document
+    embed       ChromaEmbedder.embed_and_store, per document
+    query_embed QueryEmbedder.embed, per question
+    retrieve    Retriever.retrieve, per question
+    context     ContextBuilder.build, per retrieved result
+    ingest      IngestionPipeline.run, per document (end to end)
+    query       embed + retrieve + context build, per question (end to end, no LLM)
+    api         concurrent POST /query against app.py, served by uvicorn with
+                scripts.stub_llm_server standing in for OpenRouter
+
+Every stage reports ops, items, seconds, ops/items per second, p50/p95/p99
+latency in ms (null when a stage ran no ops) and peak RSS in MB (sampled
+from /proc; for `api_ingest` it is the API server plus the ingestion worker
+processes it spawned, for `api` the API server process's high-water mark). Everything runs in a temporary
+working directory, and the report is JSON with stable keys so runs can be
+diffed between releases.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import resource
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+import httpx
+import numpy as np
+from scripts.synthetic_corpus import generate_corpus, questions, parse_mix, WRITERS
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def _rss_bytes(pid="self"):
+    try:
+        with open(f"/proc/{pid}/statm") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except OSError:
+        # No /proc: fall back to this process's lifetime peak (KiB on Linux)
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def _descendants(pid):
+    # Child processes, recursively (ingestion workers, their page-range pools, the job manager)
+    children = []
+    try:
+        tasks = os.listdir(f"/proc/{pid}/task")
+    except OSError:
+        return children
+    for task in tasks:
+        try:
+            with open(f"/proc/{pid}/task/{task}/children") as f:
+                children += [int(child) for child in f.read().split()]
+        except OSError:
+            continue
+    return children + [grandchild for child in children for grandchild in _descendants(child)]
+
+
+def _tree_rss_bytes(pid):
+    total = 0
+    for member in [pid] + _descendants(pid):
+        try:
+            with open(f"/proc/{member}/statm") as f:
+                total += int(f.read().split()[1]) * _PAGE_SIZE
+        except OSError:
+            pass  # exited between listing and reading
+    return total
+
+
+def _peak_rss_bytes(pid):
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) * 1024
+    return 0
+
+
+class _RssSampler:
+    # Tracks the peak RSS of this process (or of `measure()`) while a stage runs
+    def __init__(self, interval=0.005, measure=_rss_bytes):
+        self.interval = interval
+        self.measure = measure
+        self.start_rss = self.peak = measure()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, self.measure())
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, self.measure())
+
+
+def _mb(size):
+    return round(size / 2 ** 20, 1)
+
+
+def _summary(latencies, seconds, items, start_rss, peak_rss, **extra):
+    latencies = np.asarray(latencies, dtype=float) * 1000
+
+    def percentile(q):
+        return round(float(np.percentile(latencies, q)), 3) if len(latencies) else None
+
+    return {
+        "ops": len(latencies),
+        "items": items,
+        "seconds": round(seconds, 3),
+        "ops_per_sec": round(len(latencies) / seconds, 2) if seconds > 0 else 0.0,
+        "items_per_sec": round(items / seconds, 2) if seconds > 0 else 0.0,
+        "latency_ms": {
+            "p50": percentile(50),
+            "p95": percentile(95),
+            "p99": percentile(99),
+            "max": percentile(100)
+        },
+        "rss_mb": {"start": _mb(start_rss), "peak": _mb(peak_rss)},
+        **extra
+    }
+
+
+def _run_stage(inputs, fn):
+    # fn(input) -> (output, items); returns the outputs and the stage report
+    outputs, latencies, items = [], [], 0
+    with _RssSampler() as rss:
+        start = time.perf_counter()
+        for value in inputs:
+            op_start = time.perf_counter()
+            output, count = fn(value)
+            latencies.append(time.perf_counter() - op_start)
+            outputs.append(output)
+            items += count
+        seconds = time.perf_counter() - start
+    return outputs, _summary(latencies, seconds, items, rss.start_rss, rss.peak)
+
+
+def bench_stages(paths, query_texts, work_dir, args):
+    from src.extraction.unstructured_extraction import DocumentExtractor
+    from src.chunking.chunker import StructuredChunker
+    from src.embedding.chroma_embedder import ChromaEmbedder
+    from src.ingestion.pipeline import LocalUpload
+    from src.rag_pipeline.query_embedder import QueryEmbedder
+    from src.rag_pipeline.retriever import Retriever
+    from src.rag_pipeline.context_builder import ContextBuilder
+
+    db_path = work_dir / "stages" / "chroma_db"
+    extractor = DocumentExtractor("bench_stages", base_dir=(work_dir / "stages").as_posix(), strategy=args.strategy)
+    chunker = StructuredChunker(max_words=args.max_words)
+    report = {}
+
+    def extract(path):
+        with LocalUpload(path) as upload:
+            items = list(extractor.iter_items(upload))
+        return items, len(items)
+
+    def chunk(items):
+        chunks = list(chunker.iter_chunks(items))
+        return chunks, len(chunks)
+
+    documents, report["extract"] = _run_stage(paths, extract)
+    chunked, report["chunk"] = _run_stage(documents, chunk)
+
+    def embed(doc):
+        index, chunks = doc
+        embedder = ChromaEmbedder(persist_dir=db_path, collection_name="bench_stages", doc_id=f"doc{index}",
+                                  source=paths[index].name, backend=args.backend)
+        return None, embedder.embed_and_store(chunks)["chunks"]
+
+    _, report["embed"] = _run_stage(list(enumerate(chunked)), embed)
+
+    query_embedder = QueryEmbedder()
+    vectors, report["query_embed"] = _run_stage(query_texts, lambda text: (query_embedder.embed(text), 1))
+    retriever = Retriever(db_path=db_path, collection_name="bench_stages", backend=args.backend)
+    results, report["retrieve"] = _run_stage(
+        vectors, lambda vector: (retriever.retrieve(vector, top_k=args.top_k), 1)
+    )
+    builder = ContextBuilder(db_path=db_path)
+    _, report["context"] = _run_stage(results, lambda result: (None, len(builder.build(result)["context"])))
+    report["context"]["items_unit"] = "context characters"
+    return report
+
+
+def bench_end_to_end(paths, query_texts, work_dir, args):
+    from src.ingestion.pipeline import IngestionPipeline, LocalUpload
+    from src.rag_pipeline.query_embedder import QueryEmbedder
+    from src.rag_pipeline.retriever import Retriever
+    from src.rag_pipeline.context_builder import ContextBuilder
+
+    report = {}
+    # Upload and embedding caches are off so every document is really processed
+    pipeline_options = {"base_dir": (work_dir / "e2e").as_posix(), "strategy": args.strategy,
+                        "max_words": args.max_words, "use_cache": False, "embedding_cache_size": 0}
+
+    def ingest(path):
+        pipeline = IngestionPipeline(session_id="bench_e2e", **pipeline_options)
+        with LocalUpload(path) as upload:
+            stats = pipeline.run(upload)
+        return stats, stats["chunks"]
+
+    _, report["ingest"] = _run_stage(paths, ingest)
+
+    def query(text):
+        # Same steps as app._build_context; IngestionPipeline writes to the default store path
+        vector = QueryEmbedder().embed(text)
+        result = Retriever(collection_name="bench_e2e", backend=args.backend).retrieve(vector, top_k=args.top_k)
+        ContextBuilder().build(result)
+        return None, len(result["ids"][0])
+
+    _, report["query"] = _run_stage(query_texts, query)
+    return report
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _serve(target, port, cwd, env):
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", target, "--port", str(port), "--log-level", "warning"],
+        cwd=cwd, env=env
+    )
+
+
+def _wait_ready(url, process, timeout):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"server exited with code {process.returncode}")
+        try:
+            httpx.get(url, timeout=1)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    raise TimeoutError(f"{url} not ready after {timeout}s")
+
+
+async def _drive_queries(base_url, session_id, query_texts, concurrency):
+    latencies, errors = [], 0
+    semaphore = asyncio.Semaphore(concurrency)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=120, limits=limits) as client:
+        async def one(text):
+            nonlocal errors
+            async with semaphore:
+                start = time.perf_counter()
+                try:
+                    response = await client.post("/query", data={"user_query": text, "session_id": session_id})
+                    ok = response.status_code == 200 and response.json().get("status") == "success"
+                except httpx.HTTPError:
+                    ok = False
+                latencies.append(time.perf_counter() - start)
+                errors += not ok
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one(text) for text in query_texts))
+        return latencies, errors, time.perf_counter() - start
+
+
+def bench_api(paths, query_texts, work_dir, args):
+    run_dir = work_dir / "api" / "run"
+    run_dir.mkdir(parents=True, exist_ok=True)
+    stub_port, api_port = _free_port(), _free_port()
+    env = dict(
+        os.environ,
+        PYTHONPATH=os.pathsep.join(filter(None, [REPO_ROOT.as_posix(), os.environ.get("PYTHONPATH")])),
+        OPENROUTER_API_URL=f"http://127.0.0.1:{stub_port}/api/v1/chat/completions",
+        OPENROUTER_API_KEY="stub",
+        STUB_FIRST_TOKEN_DELAY=str(args.stub_first_token_delay),
+        STUB_TOKEN_DELAY=str(args.stub_token_delay),
+        EXTRACT_STRATEGY=args.strategy,
+        VECTOR_BACKEND=args.backend,
+        UPLOAD_CACHE="0",
+        EMBEDDING_CACHE_SIZE="0",
+        # Every question should reach the LLM unless the answer cache is being measured
+        ANSWER_CACHE_SIZE=os.environ.get("ANSWER_CACHE_SIZE", "1024") if args.answer_cache else "0"
+    )
+    stub = _serve("scripts.stub_llm_server:app", stub_port, run_dir, env)
+    api = _serve("app:app", api_port, run_dir, env)
+    base_url = f"http://127.0.0.1:{api_port}"
+    try:
+        _wait_ready(f"http://127.0.0.1:{stub_port}/stats", stub, args.startup_timeout)
+        _wait_ready(f"{base_url}/embedding/metrics", api, args.startup_timeout)
+        session_id = httpx.post(f"{base_url}/new-session").json()["session_id"]
+
+        # Ingest the corpus through the API, then wait for every job (job latency includes queueing).
+        # Jobs run in the API's worker processes, so the whole process tree is sampled.
+        with _RssSampler(interval=0.05, measure=lambda: _tree_rss_bytes(api.pid)) as ingest_rss:
+            start = time.perf_counter()
+            job_ids = []
+            for path in paths:
+                with open(path, "rb") as f:
+                    response = httpx.post(f"{base_url}/upload", data={"session_id": session_id},
+                                          files={"file": (path.name, f)}, timeout=60).json()
+                if response.get("status") != "queued":
+                    raise RuntimeError(f"upload of {path.name} failed: {response}")
+                job_ids.append(response["job_id"])
+            jobs = {}
+            while len(jobs) < len(job_ids):
+                for job_id in job_ids:
+                    if job_id not in jobs:
+                        job = httpx.get(f"{base_url}/jobs/{job_id}").json()
+                        if job.get("status") in ("done", "error"):
+                            jobs[job_id] = job
+                time.sleep(0.2)
+            ingest_seconds = time.perf_counter() - start
+        job_latencies = [job["updated_at"] - job["created_at"] for job in jobs.values()]
+        failed = sum(1 for job in jobs.values() if job["status"] == "error")
+        chunks = sum(job.get("result", {}).get("chunks", 0) for job in jobs.values())
+        query_rss = _rss_bytes(api.pid)
+
+        latencies, errors, seconds = asyncio.run(
+            _drive_queries(base_url, session_id, query_texts, args.concurrency)
+        )
+        peak = _peak_rss_bytes(api.pid)
+        return {
+            "api_ingest": _summary(job_latencies, ingest_seconds, chunks, ingest_rss.start_rss, ingest_rss.peak,
+                                   errors=failed),
+            "api": _summary(latencies, seconds, len(latencies) - errors, query_rss, peak, errors=errors,
+                            concurrency=args.concurrency,
+                            stub_llm={"first_token_delay": args.stub_first_token_delay,
+                                      "token_delay": args.stub_token_delay})
+        }
+    finally:
+        for process in (api, stub):
+            process.terminate()
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+
+def _git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=REPO_ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--corpus", help="directory of existing PDF/DOCX files (skips generation)")
+    parser.add_argument("--docs", type=int, default=6)
+    parser.add_argument("--sections", type=int, default=4)
+    parser.add_argument("--blocks", type=int, default=15, help="blocks per section")
+    parser.add_argument("--mix", nargs="+", default=None, metavar="TYPE=WEIGHT")
+    parser.add_argument("--formats", nargs="+", default=["pdf", "docx"], choices=sorted(WRITERS))
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--requests", type=int, default=200, help="POST /query calls in the api stage")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--max-words", type=int, default=300)
+    parser.add_argument("--strategy", default="auto", choices=["auto", "hi_res"])
+    parser.add_argument("--backend", default="auto", choices=["auto", "numpy", "chroma"])
+    parser.add_argument("--answer-cache", action="store_true", help="keep the answer cache on in the api stage")
+    parser.add_argument("--stub-first-token-delay", type=float, default=0.2)
+    parser.add_argument("--stub-token-delay", type=float, default=0.0)
+    parser.add_argument("--startup-timeout", type=float, default=180)
+    parser.add_argument("--only", nargs="+", choices=["stages", "e2e", "api"], default=["stages", "e2e", "api"])
+    parser.add_argument("--skip", nargs="+", choices=["stages", "e2e", "api"], default=[])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="write the JSON report here as well as to stdout")
+    args = parser.parse_args()
+    groups = [group for group in args.only if group not in args.skip]
+    out_path = Path(args.out).resolve() if args.out else None
+
+    with tempfile.TemporaryDirectory(prefix="ragpedia-bench-") as tmp:
+        work_dir = Path(tmp)
+        if args.corpus:
+            corpus_dir = Path(args.corpus).resolve()
+            manifest = {"corpus": corpus_dir.as_posix()}
+        else:
+            corpus_dir = work_dir / "corpus"
+            manifest = generate_corpus(corpus_dir, args.docs, args.sections, args.blocks,
+                                       parse_mix(args.mix) if args.mix else None, args.formats, args.seed)
+            manifest = {key: value for key, value in manifest.items() if key != "documents"}
+        paths = sorted(p for p in corpus_dir.iterdir() if p.suffix.lower() in (".pdf", ".docx"))
+
+        # The pipeline resolves data/ and ../data/chroma_db against the working directory
+        run_dir = work_dir / "run"
+        run_dir.mkdir()
+        os.chdir(run_dir)
+
+        report = {
+            "meta": {
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+                "revision": _git_revision(),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "cpus": os.cpu_count(),
+                "args": {key: value for key, value in vars(args).items() if key not in ("out",)}
+            },
+            "corpus": dict(manifest, files=len(paths)),
+            "stages": {}
+        }
+
+        if "stages" in groups or "e2e" in groups:
+            from src.embedding.model_registry import registry
+            start = time.perf_counter()
+            registry.warmup()
+            report["meta"]["warmup_seconds"] = round(time.perf_counter() - start, 3)
+
+        if "stages" in groups:
+            report["stages"].update(bench_stages(paths, questions(args.queries, args.seed), work_dir, args))
+        if "e2e" in groups:
+            report["stages"].update(bench_end_to_end(paths, questions(args.queries, args.seed + 1), work_dir, args))
+        if "api" in groups:
+            report["stages"].update(bench_api(paths, questions(args.requests, args.seed + 2), work_dir, args))
+
+    output = json.dumps(report, indent=2)
+    if out_path:
+        out_path.write_text(output + "\n", encoding="utf-8")
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
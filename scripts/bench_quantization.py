@@ -0,0 +1,105 @@
+"""Recall vs. memory of quantized NumPy vector storage.
+
+    python -m scripts.bench_quantization --size 5000 --queries 200
+    python -m scripts.bench_quantization --vectors exported_embeddings.npy
+
+A session is written once unquantized; its Retriever.retrieve results are
+the exact reference. The same vectors are then stored as int8 and as binary
+codes, and each mode is queried with several rescore factors. For every
+configuration the report has:
+
+    recall            overlap of the top-k with the exact top-k
+    search_bytes      bytes per vector scanned by the coarse search
+    rescored_rows     float32 rows read per query for rescoring
+    query_ms          p50/p95 latency of open + search
+
+Without --vectors the session is synthetic: clustered unit vectors
+(384-dim, like all-MiniLM-L6-v2) with queries drawn near stored chunks.
+The results are printed as JSON.
+"""
+import argparse
+import json
+import tempfile
+import time
+import numpy as np
+from src.embedding.vector_store import NumpyVectorStore
+from src.rag_pipeline.retriever import Retriever
+
+DIM = 384
+
+
+def _unit(matrix):
+    return matrix / np.linalg.norm(matrix, axis=1, keepdims=True)
+
+
+def _synthetic(size, queries, clusters, noise, rng):
+    # Noise vectors have norm ~`noise` relative to the unit cluster centers
+    centers = _unit(rng.standard_normal((clusters, DIM)))
+    spread = noise / np.sqrt(DIM)
+    vectors = _unit(centers[rng.integers(clusters, size=size)] + spread * rng.standard_normal((size, DIM)))
+    picks = vectors[rng.integers(size, size=queries)]
+    return vectors.astype(np.float32), _unit(picks + spread * rng.standard_normal(picks.shape))
+
+
+def _fill(store, vectors):
+    ids = [f"doc:{i:08x}" for i in range(len(vectors))]
+    metadatas = [{"doc_id": "doc", "source_id": str(i)} for i in range(len(vectors))]
+    documents = [f"chunk {i}" for i in range(len(vectors))]
+    # One write: the store rewrites its files on every upsert
+    store.upsert(ids, vectors.tolist(), documents, metadatas)
+
+
+def _percentile(samples, q):
+    return round(float(np.percentile(samples, q)) * 1000, 3)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--vectors", help="float32 .npy matrix of real chunk embeddings")
+    parser.add_argument("--size", type=int, default=5000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--clusters", type=int, default=50)
+    parser.add_argument("--noise", type=float, default=1.5)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--rescore-factors", type=int, nargs="+", default=[1, 4, 10, 20])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    if args.vectors:
+        vectors = _unit(np.load(args.vectors).astype(np.float32))
+        picks = vectors[rng.integers(len(vectors), size=args.queries)]
+        queries = _unit(picks + 0.05 * rng.standard_normal(picks.shape))
+    else:
+        vectors, queries = _synthetic(args.size, args.queries, args.clusters, args.noise, rng)
+
+    report = {"vectors": len(vectors), "dim": vectors.shape[1], "top_k": args.top_k, "modes": {}}
+    with tempfile.TemporaryDirectory() as db_path:
+        _fill(NumpyVectorStore(db_path, "exact", quantization="none"), vectors)
+        retriever = Retriever(db_path=db_path, collection_name="exact", backend="numpy")
+        exact = [set(retriever.retrieve(query.tolist(), top_k=args.top_k)["ids"][0]) for query in queries]
+
+        for mode in ("none", "int8", "binary"):
+            _fill(NumpyVectorStore(db_path, mode, quantization=mode), vectors)
+            search_bytes = {"none": 4 * vectors.shape[1], "int8": vectors.shape[1],
+                            "binary": (vectors.shape[1] + 7) // 8}[mode]
+            for factor in ([1] if mode == "none" else args.rescore_factors):
+                hits, latencies = 0, []
+                for query, expected in zip(queries, exact):
+                    start = time.perf_counter()
+                    store = NumpyVectorStore(db_path, mode, quantization=mode, rescore_factor=factor)
+                    result = store.query(query.tolist(), top_k=args.top_k)
+                    latencies.append(time.perf_counter() - start)
+                    hits += len(set(result["ids"][0]) & expected)
+                report["modes"][mode if mode == "none" else f"{mode}/x{factor}"] = {
+                    "recall": round(hits / (len(queries) * args.top_k), 4),
+                    "search_bytes": search_bytes,
+                    "search_mb": round(search_bytes * len(vectors) / 2 ** 20, 3),
+                    "rescored_rows": 0 if mode == "none" else args.top_k * factor,
+                    "query_ms": {"p50": _percentile(latencies, 50), "p95": _percentile(latencies, 95)},
+                }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
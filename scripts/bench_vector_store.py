@@ -0,0 +1,97 @@
+"""Compare the NumPy and Chroma vector store backends on synthetic sessions.
+
+    python -m scripts.bench_vector_store --sizes 200 1000 5000 --queries 200
+
+For each session size both backends are filled with the same random unit
+vectors (384-dim, like all-MiniLM-L6-v2). The benchmark then measures:
+
+    write_seconds   time to upsert every chunk in batches of 64
+    open_ms         time to open the store, as Retriever does on every request
+    query_ms        p50/p95 latency of open + top-k search
+    recall          overlap of the top-k with exact (brute-force) results
+
+The results are printed as JSON.
+"""
+import argparse
+import json
+import tempfile
+import time
+import numpy as np
+from src.embedding.vector_store import BACKENDS
+
+DIM = 384
+
+
+def _percentile(samples, q):
+    return round(float(np.percentile(samples, q)) * 1000, 3)
+
+
+def _session(size, rng):
+    vectors = rng.standard_normal((size, DIM)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    ids = [f"doc:{i:08x}" for i in range(size)]
+    documents = [f"chunk {i} " + "lorem ipsum " * 100 for i in range(size)]
+    metadatas = [{"doc_id": "doc", "source_id": str(i), "image_ids": "", "table_ids": "", "code_ids": ""}
+                 for i in range(size)]
+    return ids, vectors, documents, metadatas
+
+
+def bench_backend(backend, db_path, session, queries, top_k, exact):
+    ids, vectors, documents, metadatas = session
+    collection = f"bench_{backend}_{len(ids)}"
+    store = BACKENDS[backend](db_path, collection)
+
+    start = time.perf_counter()
+    # Batched like ChromaEmbedder.embed_and_store, inside one bulk() block
+    with store.bulk():
+        for i in range(0, len(ids), 64):
+            store.upsert(ids[i:i + 64], vectors[i:i + 64].tolist(), documents[i:i + 64], metadatas[i:i + 64])
+    write_seconds = time.perf_counter() - start
+
+    open_times, query_times, hits = [], [], 0
+    for query, expected in zip(queries, exact):
+        start = time.perf_counter()
+        store = BACKENDS[backend](db_path, collection)
+        opened = time.perf_counter()
+        result = store.query(query.tolist(), top_k=top_k)
+        done = time.perf_counter()
+        open_times.append(opened - start)
+        query_times.append(done - start)
+        hits += len(set(result["ids"][0]) & expected)
+
+    return {
+        "write_seconds": round(write_seconds, 3),
+        "open_ms": {"p50": _percentile(open_times, 50), "p95": _percentile(open_times, 95)},
+        "query_ms": {"p50": _percentile(query_times, 50), "p95": _percentile(query_times, 95)},
+        "recall": round(hits / (len(queries) * top_k), 4),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[200, 1000, 5000])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--backends", nargs="+", default=["numpy", "chroma"], choices=["numpy", "chroma"])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    report = {}
+    with tempfile.TemporaryDirectory() as db_path:
+        for size in args.sizes:
+            session = _session(size, rng)
+            ids, vectors = session[0], session[1]
+            queries = rng.standard_normal((args.queries, DIM)).astype(np.float32)
+            exact = [
+                {ids[i] for i in np.argsort(-(vectors @ query))[:args.top_k]} for query in queries
+            ]
+            report[size] = {
+                backend: bench_backend(backend, db_path, session, queries, args.top_k, exact)
+                for backend in args.backends
+            }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
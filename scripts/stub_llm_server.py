@@ -0,0 +1,94 @@
+"""Local stand-in for the OpenRouter chat completions API.
+
+Run it and point the app at it instead of OpenRouter:
+
+    uvicorn scripts.stub_llm_server:app --port 8001
+    export OPENROUTER_API_URL=http://127.0.0.1:8001/api/v1/chat/completions
+    export OPENROUTER_API_KEY=stub
+
+STUB_FIRST_TOKEN_DELAY and STUB_TOKEN_DELAY (seconds) shape the response timing.
+Faults for exercising retries, hedging and the circuit breaker:
+
+    STUB_ERROR_RATE   fraction of requests answered with STUB_ERROR_STATUS (default 503)
+    STUB_SLOW_RATE    fraction of requests delayed by an extra STUB_SLOW_DELAY seconds
+"""
+import asyncio
+import json
+import os
+import random
+import time
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+app = FastAPI()
+
+FIRST_TOKEN_DELAY = float(os.getenv("STUB_FIRST_TOKEN_DELAY", "0.2"))
+TOKEN_DELAY = float(os.getenv("STUB_TOKEN_DELAY", "0.02"))
+ERROR_RATE = float(os.getenv("STUB_ERROR_RATE", "0"))
+ERROR_STATUS = int(os.getenv("STUB_ERROR_STATUS", "503"))
+SLOW_RATE = float(os.getenv("STUB_SLOW_RATE", "0"))
+SLOW_DELAY = float(os.getenv("STUB_SLOW_DELAY", "5"))
+stats = {"requests": 0, "errors": 0, "slow": 0}
+ANSWER = (
+    "## Answer\n\nThis is a stub response generated locally. "
+    "It echoes the query so callers can check the round trip: "
+)
+
+
+def _tokens(messages):
+    query = messages[-1]["content"] if messages else ""
+    text = ANSWER + " ".join(query.split()[:40])
+    return [word + " " for word in text.split(" ")]
+
+
+@app.post("/api/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    tokens = _tokens(body.get("messages", []))
+    created = int(time.time())
+
+    stats["requests"] += 1
+    if random.random() < ERROR_RATE:
+        stats["errors"] += 1
+        return JSONResponse(
+            {"error": {"code": ERROR_STATUS, "message": "injected failure"}}, status_code=ERROR_STATUS
+        )
+    if random.random() < SLOW_RATE:
+        stats["slow"] += 1
+        await asyncio.sleep(SLOW_DELAY)
+
+    if not body.get("stream"):
+        await asyncio.sleep(FIRST_TOKEN_DELAY + TOKEN_DELAY * len(tokens))
+        return {
+            "id": "stub",
+            "object": "chat.completion",
+            "created": created,
+            "model": body.get("model"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": "".join(tokens)},
+                "finish_reason": "stop"
+            }]
+        }
+
+    async def events():
+        yield ": STUB PROCESSING\n\n"
+        await asyncio.sleep(FIRST_TOKEN_DELAY)
+        for token in tokens:
+            chunk = {
+                "id": "stub",
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": body.get("model"),
+                "choices": [{"index": 0, "delta": {"content": token}, "finish_reason": None}]
+            }
+            yield f"data: {json.dumps(chunk)}\n\n"
+            await asyncio.sleep(TOKEN_DELAY)
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
+@app.get("/stats")
+def get_stats():
+    return stats
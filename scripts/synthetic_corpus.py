@@ -0,0 +1,412 @@
+"""Synthetic PDF/DOCX documents for benchmarking ingestion and retrieval.
+
+    python -m scripts.synthetic_corpus --out bench_corpus --docs 20 --blocks 60
+    python -m scripts.synthetic_corpus --mix text=0.5 table=0.2 image=0.2 code=0.1 --formats pdf
+
+Each document is a sequence of sections; every section has a heading and
+`--blocks` blocks drawn from the mix: paragraphs, ruled tables, captioned
+images (raster, generated in memory) and monospaced code listings. Both
+formats are written by hand (PDF objects / OOXML parts), so nothing beyond
+the standard library is needed. The text reuses a small accounting
+vocabulary so generated questions (see questions()) retrieve real chunks.
+
+A manifest.json with the per-document block counts is written next to the
+files. Output is deterministic for a given --seed.
+"""
+import argparse
+import json
+import random
+import struct
+import zipfile
+import zlib
+from pathlib import Path
+from xml.sax.saxutils import escape
+
+BLOCK_TYPES = ("text", "table", "image", "code")
+DEFAULT_MIX = {"text": 0.7, "table": 0.1, "image": 0.1, "code": 0.1}
+
+TOPICS = [
+    "invoice", "ledger", "voucher", "payroll", "inventory", "tax", "receipt", "budget",
+    "audit", "purchase order", "credit note", "balance sheet", "cost centre", "bank reconciliation",
+    "depreciation", "sales return", "GST filing", "expense claim", "stock transfer", "journal entry"
+]
+WORDS = (
+    "the a each every company account entry period report value amount total customer supplier "
+    "record balance update review approve create select open close post adjust confirm export "
+    "monthly quarterly annual default pending final opening closing net gross due outstanding "
+    "menu screen field option button list date rate quantity item group master voucher ledger"
+).split()
+CODE_LINES = [
+    "def post_{name}(ledger, amount):",
+    "    entry = ledger.new_entry(kind=\"{name}\")",
+    "    entry.amount = round(amount * (1 + TAX_RATE), 2)",
+    "    if entry.amount <= 0:",
+    "        raise ValueError(\"amount must be positive\")",
+    "    ledger.post(entry)",
+    "    return entry.id",
+]
+
+
+def _sentence(rng, topic):
+    words = rng.sample(WORDS, rng.randint(8, 16))
+    words.insert(rng.randrange(len(words)), topic)
+    return " ".join(words).capitalize() + "."
+
+
+def _paragraph(rng, topic):
+    return " ".join(_sentence(rng, topic) for _ in range(rng.randint(3, 7)))
+
+
+def _table(rng, topic):
+    columns = rng.randint(3, 5)
+    header = ["Item", "Quantity", "Rate", "Amount", "Status"][:columns]
+    rows = [[f"{topic.title()} {i + 1}", str(rng.randint(1, 99)), f"{rng.uniform(1, 500):.2f}",
+             f"{rng.uniform(10, 5000):.2f}", rng.choice(["open", "posted", "due"])][:columns]
+            for i in range(rng.randint(3, 8))]
+    return [header] + rows
+
+
+def _code(rng, topic):
+    name = topic.replace(" ", "_").lower()
+    return [line.format(name=name) for line in CODE_LINES[:rng.randint(4, len(CODE_LINES))]]
+
+
+def _image(rng, width=160, height=120):
+    # Smooth colour gradient with a random tint: compresses like a real figure, not like noise
+    tint = [rng.randint(0, 255) for _ in range(3)]
+    rows = []
+    for y in range(height):
+        row = bytearray()
+        for x in range(width):
+            row += bytes(((x * 255 // width + tint[0]) % 256, (y * 255 // height + tint[1]) % 256, tint[2]))
+        rows.append(bytes(row))
+    return width, height, rows
+
+
+def _blocks(rng, sections, blocks_per_section, mix):
+    types, weights = zip(*[(kind, mix.get(kind, 0)) for kind in BLOCK_TYPES])
+    for section in range(sections):
+        topic = rng.choice(TOPICS)
+        yield "heading", f"{section + 1}. {topic.title()} procedures"
+        for _ in range(blocks_per_section):
+            kind = rng.choices(types, weights)[0]
+            if kind == "text":
+                yield kind, _paragraph(rng, topic)
+            elif kind == "table":
+                yield kind, _table(rng, topic)
+            elif kind == "image":
+                yield kind, (_image(rng), f"Figure: {topic} summary screen")
+            else:
+                yield kind, _code(rng, topic)
+
+
+# ---------- PDF ----------
+
+def _pdf_text(text):
+    text = text.encode("latin-1", "replace").decode("latin-1")
+    return "(" + text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)") + ")"
+
+
+def _wrap(text, width):
+    lines, line = [], ""
+    for word in text.split():
+        if line and len(line) + len(word) + 1 > width:
+            lines.append(line)
+            line = word
+        else:
+            line = f"{line} {word}" if line else word
+    return lines + ([line] if line else [])
+
+
+class _PdfWriter:
+    TOP, BOTTOM, LEFT, WIDTH = 770, 60, 60, 475
+
+    def __init__(self):
+        self.pages = []  # (content operations, {image name: (w, h, compressed rgb)})
+        self._new_page()
+
+    def _new_page(self):
+        self.ops, self.images, self.y = [], {}, self.TOP
+        self.pages.append((self.ops, self.images))
+
+    def _space(self, height):
+        if self.y - height < self.BOTTOM:
+            self._new_page()
+        self.y -= height
+
+    def text(self, lines, font="F1", size=10, leading=14):
+        for line in lines:
+            self._space(leading)
+            self.ops.append(f"BT /{font} {size} Tf {self.LEFT} {self.y} Td {_pdf_text(line)} Tj ET")
+        self.y -= leading // 2
+
+    def table(self, rows):
+        col_width = self.WIDTH / len(rows[0])
+        for row in rows:
+            self._space(18)
+            for i, cell in enumerate(row):
+                x = self.LEFT + i * col_width
+                self.ops.append(f"{x:.1f} {self.y} {col_width:.1f} 18 re S")
+                self.ops.append(f"BT /F1 9 Tf {x + 4:.1f} {self.y + 5} Td {_pdf_text(cell)} Tj ET")
+        self.y -= 10
+
+    def image(self, image, caption):
+        width, height, rows = image
+        self._space(height * 1.5 + 10)
+        name = f"Im{sum(len(images) for _, images in self.pages) + 1}"
+        self.images[name] = (width, height, zlib.compress(b"".join(rows)))
+        self.ops.append(f"q {width * 1.5} 0 0 {height * 1.5} {self.LEFT} {self.y + 10} cm /{name} Do Q")
+        self.text([caption], font="F1", size=9)
+
+    def render(self):
+        # Objects 1-5: catalog, page tree and the three standard fonts; then per page
+        # its page object, content stream and image XObjects
+        objects = {}
+        page_ids = []
+        next_id = 6
+        for ops, images in self.pages:
+            page_id, content_id = next_id, next_id + 1
+            next_id += 2
+            image_refs = {}
+            for name, (width, height, data) in images.items():
+                objects[next_id] = (
+                    f"<< /Type /XObject /Subtype /Image /Width {width} /Height {height} "
+                    f"/ColorSpace /DeviceRGB /BitsPerComponent 8 /Filter /FlateDecode /Length {len(data)} >>"
+                ).encode() + b"\nstream\n" + data + b"\nendstream"
+                image_refs[name] = next_id
+                next_id += 1
+            stream = "\n".join(ops).encode("latin-1")
+            objects[content_id] = f"<< /Length {len(stream)} >>\nstream\n".encode() + stream + b"\nendstream"
+            xobjects = " ".join(f"/{name} {id_} 0 R" for name, id_ in image_refs.items())
+            objects[page_id] = (
+                f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] /Contents {content_id} 0 R "
+                f"/Resources << /Font << /F1 3 0 R /F2 4 0 R /F3 5 0 R >> /XObject << {xobjects} >> >> >>"
+            ).encode()
+            page_ids.append(page_id)
+        objects[1] = b"<< /Type /Catalog /Pages 2 0 R >>"
+        kids = " ".join(f"{id_} 0 R" for id_ in page_ids)
+        objects[2] = f"<< /Type /Pages /Kids [{kids}] /Count {len(page_ids)} >>".encode()
+        for id_, font in ((3, "Helvetica"), (4, "Helvetica-Bold"), (5, "Courier")):
+            objects[id_] = f"<< /Type /Font /Subtype /Type1 /BaseFont /{font} >>".encode()
+
+        out = bytearray(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+        offsets = {}
+        for id_ in sorted(objects):
+            offsets[id_] = len(out)
+            out += f"{id_} 0 obj\n".encode() + objects[id_] + b"\nendobj\n"
+        xref = len(out)
+        out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+        for id_ in sorted(objects):
+            out += f"{offsets[id_]:010d} 00000 n \n".encode()
+        out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+        return bytes(out)
+
+
+def write_pdf(path, blocks):
+    pdf = _PdfWriter()
+    for kind, value in blocks:
+        if kind == "heading":
+            pdf.text([value], font="F2", size=14, leading=20)
+        elif kind == "text":
+            pdf.text(_wrap(value, 95))
+        elif kind == "table":
+            pdf.table(value)
+        elif kind == "image":
+            pdf.image(*value)
+        else:
+            pdf.text(value, font="F3", size=9, leading=11)
+    Path(path).write_bytes(pdf.render())
+
+
+# ---------- DOCX ----------
+
+def _png(image):
+    width, height, rows = image
+
+    def chunk(kind, data):
+        return struct.pack("!I", len(data)) + kind + data + struct.pack("!I", zlib.crc32(kind + data))
+
+    raw = b"".join(b"\x00" + row for row in rows)  # filter type 0 per scanline
+    return (b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", struct.pack("!IIBBBBB", width, height, 8, 2, 0, 0, 0))
+            + chunk(b"IDAT", zlib.compress(raw)) + chunk(b"IEND", b""))
+
+
+_DOCX_NS = (
+    'xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships" '
+    'xmlns:wp="http://schemas.openxmlformats.org/drawingml/2006/wordprocessingDrawing" '
+    'xmlns:a="http://schemas.openxmlformats.org/drawingml/2006/main" '
+    'xmlns:pic="http://schemas.openxmlformats.org/drawingml/2006/picture"'
+)
+_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Default Extension="png" ContentType="image/png"/>'
+    '<Override PartName="/word/document.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>'
+    '<Override PartName="/word/styles.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.styles+xml"/>'
+    '</Types>'
+)
+_ROOT_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/'
+    'officeDocument" Target="word/document.xml"/></Relationships>'
+)
+
+# Built-in style names, so headings and captions are recognised as such
+_STYLES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<w:styles xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">'
+    '<w:style w:type="paragraph" w:default="1" w:styleId="Normal"><w:name w:val="Normal"/></w:style>'
+    '<w:style w:type="paragraph" w:styleId="Heading1"><w:name w:val="heading 1"/>'
+    '<w:basedOn w:val="Normal"/><w:rPr><w:b/><w:sz w:val="32"/></w:rPr></w:style>'
+    '<w:style w:type="paragraph" w:styleId="Caption"><w:name w:val="caption"/>'
+    '<w:basedOn w:val="Normal"/><w:rPr><w:i/></w:rPr></w:style>'
+    '<w:style w:type="table" w:styleId="TableGrid"><w:name w:val="Table Grid"/></w:style>'
+    '</w:styles>'
+)
+
+
+def _docx_paragraph(text, style=None, font=None):
+    style_xml = f'<w:pPr><w:pStyle w:val="{style}"/></w:pPr>' if style else ""
+    font_xml = f'<w:rPr><w:rFonts w:ascii="{font}" w:hAnsi="{font}"/></w:rPr>' if font else ""
+    return f'<w:p>{style_xml}<w:r>{font_xml}<w:t xml:space="preserve">{escape(text)}</w:t></w:r></w:p>'
+
+
+def _docx_image(rel_id, index, width, height):
+    cx, cy = width * 9525 * 2, height * 9525 * 2  # EMUs at 2x scale
+    return (
+        f'<w:p><w:r><w:drawing><wp:inline><wp:extent cx="{cx}" cy="{cy}"/>'
+        f'<wp:docPr id="{index}" name="Picture {index}"/>'
+        '<a:graphic><a:graphicData uri="http://schemas.openxmlformats.org/drawingml/2006/picture">'
+        f'<pic:pic><pic:nvPicPr><pic:cNvPr id="{index}" name="image{index}.png"/><pic:cNvPicPr/></pic:nvPicPr>'
+        f'<pic:blipFill><a:blip r:embed="{rel_id}"/><a:stretch><a:fillRect/></a:stretch></pic:blipFill>'
+        f'<pic:spPr><a:xfrm><a:off x="0" y="0"/><a:ext cx="{cx}" cy="{cy}"/></a:xfrm>'
+        '<a:prstGeom prst="rect"><a:avLst/></a:prstGeom></pic:spPr></pic:pic>'
+        '</a:graphicData></a:graphic></wp:inline></w:drawing></w:r></w:p>'
+    )
+
+
+def write_docx(path, blocks):
+    body, media, rels = [], {}, []
+    for kind, value in blocks:
+        if kind == "heading":
+            body.append(_docx_paragraph(value, style="Heading1"))
+        elif kind == "text":
+            body.append(_docx_paragraph(value))
+        elif kind == "table":
+            rows = "".join(
+                "<w:tr>" + "".join(f"<w:tc>{_docx_paragraph(cell)}</w:tc>" for cell in row) + "</w:tr>"
+                for row in value
+            )
+            body.append(f'<w:tbl><w:tblPr><w:tblStyle w:val="TableGrid"/></w:tblPr>{rows}</w:tbl>')
+        elif kind == "image":
+            image, caption = value
+            index = len(media) + 1
+            rel_id = f"rIdImg{index}"
+            media[f"word/media/image{index}.png"] = _png(image)
+            rels.append(
+                f'<Relationship Id="{rel_id}" Type="http://schemas.openxmlformats.org/officeDocument/2006/'
+                f'relationships/image" Target="media/image{index}.png"/>'
+            )
+            body.append(_docx_image(rel_id, index, image[0], image[1]))
+            body.append(_docx_paragraph(caption, style="Caption"))
+        else:
+            body.extend(_docx_paragraph(line, font="Courier New") for line in value)
+
+    document = (
+        f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?><w:document {_DOCX_NS}><w:body>'
+        + "".join(body) + "</w:body></w:document>"
+    )
+    document_rels = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rIdStyles" Type="http://schemas.openxmlformats.org/officeDocument/2006/'
+        'relationships/styles" Target="styles.xml"/>'
+        + "".join(rels) + "</Relationships>"
+    )
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr("[Content_Types].xml", _CONTENT_TYPES)
+        archive.writestr("_rels/.rels", _ROOT_RELS)
+        archive.writestr("word/document.xml", document)
+        archive.writestr("word/styles.xml", _STYLES)
+        archive.writestr("word/_rels/document.xml.rels", document_rels)
+        for name, data in media.items():
+            archive.writestr(name, data)
+
+
+WRITERS = {"pdf": write_pdf, "docx": write_docx}
+
+
+def generate_corpus(out_dir, docs=10, sections=4, blocks=15, mix=None, formats=("pdf", "docx"), seed=0):
+    # Writes `docs` files (formats used round robin) and returns the manifest
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    mix = mix or DEFAULT_MIX
+    rng = random.Random(seed)
+    documents = []
+    for i in range(docs):
+        file_format = formats[i % len(formats)]
+        content = list(_blocks(rng, sections, blocks, mix))
+        path = out_dir / f"doc_{i:04d}.{file_format}"
+        WRITERS[file_format](path, content)
+        counts = {kind: sum(1 for block_kind, _ in content if block_kind == kind) for kind in BLOCK_TYPES}
+        documents.append({"file": path.name, "format": file_format, "bytes": path.stat().st_size, **counts})
+
+    manifest = {
+        "seed": seed, "docs": docs, "sections": sections, "blocks_per_section": blocks, "mix": mix,
+        "formats": list(formats), "bytes": sum(doc["bytes"] for doc in documents), "documents": documents
+    }
+    with open(out_dir / "manifest.json", "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def questions(count, seed=0):
+    # Questions phrased around the corpus topics, distinct so answer caching doesn't hide work
+    rng = random.Random(seed)
+    templates = ["How do I {verb} a {topic}?", "What is the {noun} of a {topic}?",
+                 "Which {noun} is used when I {verb} the {topic}?"]
+    verbs = ["create", "post", "review", "approve", "export", "adjust", "close"]
+    nouns = ["rate", "total", "due date", "status", "quantity", "default option"]
+    return [
+        rng.choice(templates).format(verb=rng.choice(verbs), noun=rng.choice(nouns), topic=rng.choice(TOPICS))
+        + f" (#{i})"
+        for i in range(count)
+    ]
+
+
+def parse_mix(values):
+    mix = {kind: 0.0 for kind in BLOCK_TYPES}
+    for value in values:
+        kind, _, weight = value.partition("=")
+        if kind not in mix:
+            raise argparse.ArgumentTypeError(f"Unknown block type: {kind}")
+        mix[kind] = float(weight)
+    return mix
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--out", default="bench_corpus")
+    parser.add_argument("--docs", type=int, default=10)
+    parser.add_argument("--sections", type=int, default=4)
+    parser.add_argument("--blocks", type=int, default=15, help="blocks per section")
+    parser.add_argument("--mix", nargs="+", default=None, metavar="TYPE=WEIGHT",
+                        help="relative block weights, e.g. text=0.7 table=0.1 image=0.1 code=0.1")
+    parser.add_argument("--formats", nargs="+", default=["pdf", "docx"], choices=sorted(WRITERS))
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    manifest = generate_corpus(args.out, args.docs, args.sections, args.blocks,
+                               parse_mix(args.mix) if args.mix else None, args.formats, args.seed)
+    summary = {key: value for key, value in manifest.items() if key != "documents"}
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
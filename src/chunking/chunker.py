@@ -2,8 +2,8 @@ import json
 from pathlib import Path
 
 class StructuredChunker:
-    def __init__(self, input_path, max_words=300):
-        self.input_path = Path(input_path)
+    def __init__(self, input_path=None, max_words=300):
+        self.input_path = Path(input_path) if input_path else None
         self.max_words = max_words
 
     def load_data(self):
@@ -20,8 +20,11 @@ class StructuredChunker:
                 all_items.append(item)
 
         all_items.sort(key=lambda x: x.get("index", 0))
+        return list(self.iter_chunks(all_items))
 
-        chunks = []
+    def iter_chunks(self, items):
+        # `items` must already be in index order, e.g. straight from
+        # DocumentExtractor.iter_items; chunks are yielded as soon as they fill up
         current_chunk = {
             "content": [],
             "images": [],
@@ -30,18 +33,18 @@ class StructuredChunker:
             "word_count": 0
         }
 
-        for item in all_items:
+        for item in items:
             text = item.get("content") or item.get("text") or ""
             num_words = len(text.strip().split())
 
             # Flush current chunk if it exceeds max words
             if current_chunk["word_count"] + num_words > self.max_words and current_chunk["content"]:
-                chunks.append({
+                yield {
                     "content": " ".join(current_chunk["content"]),
                     "images": current_chunk["images"],
                     "tables": current_chunk["tables"],
                     "code_snippets": current_chunk["code_snippets"]
-                })
+                }
                 current_chunk = {
                     "content": [],
                     "images": [],
@@ -57,7 +60,6 @@ class StructuredChunker:
 
             elif item["type"] == "table":
                 current_chunk["tables"].append({
-                    "path": item.get("path"),
                     "html": item.get("html"),
                     "text": item.get("text"),
                     "context": item.get("context")
@@ -78,11 +80,9 @@ class StructuredChunker:
 
         # Flush last chunk
         if current_chunk["content"]:
-            chunks.append({
+            yield {
                 "content": " ".join(current_chunk["content"]),
                 "images": current_chunk["images"],
                 "tables": current_chunk["tables"],
                 "code_snippets": current_chunk["code_snippets"]
-            })
-
-        return chunks
+            }
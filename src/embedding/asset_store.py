@@ -0,0 +1,154 @@
+import hashlib
+import json
+import sqlite3
+import threading
+from pathlib import Path
+
+# Fields of each asset kind that end up in a prompt; anything else (extraction
+# context, file paths of intermediate artifacts) is not stored
+ASSET_FIELDS = {
+    "image": ("path", "caption"),
+    "table": ("html", "text"),
+    "code": ("text",),
+}
+
+# Chunk keys holding assets -> (asset kind, Chroma metadata key listing their ids)
+ASSET_KEYS = {
+    "images": ("image", "image_ids"),
+    "tables": ("table", "table_ids"),
+    "code_snippets": ("code", "code_ids"),
+}
+
+
+def asset_payload(kind: str, item):
+    if not isinstance(item, dict):
+        item = {"text": str(item)}
+    return {field: item.get(field) for field in ASSET_FIELDS[kind]}
+
+
+def asset_id(kind: str, payload):
+    # Content address: identical assets share one row across chunks, documents and sessions
+    data = json.dumps(payload, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(f"{kind}\0{data}".encode("utf-8")).hexdigest()[:24]
+
+
+def prompt_text(kind: str, payload):
+    # The text an asset contributes to the prompt, used for token budgeting
+    if kind == "image":
+        caption = payload.get("caption") or "No Caption"
+        return f"![{caption}]({payload.get('path')}) *{caption}*"
+    if kind == "table":
+        return payload.get("html") or payload.get("text") or ""
+    return payload.get("text") or ""
+
+
+def has_content(kind: str, payload):
+    if kind == "image":
+        return bool(payload.get("path"))
+    return bool(prompt_text(kind, payload))
+
+
+class AssetStore:
+    """Content-addressed store for chunk assets (images, tables, code snippets).
+
+    Chroma metadata only carries asset ids; the payloads live here in one
+    SQLite file next to the index, together with their prompt token counts so
+    the context builder can budget without loading them. Rows are shared, so
+    each session that writes one records a reference to it; release() drops
+    a session's references and deletes the rows no other session holds.
+    """
+
+    def __init__(self, path="../data/chroma_db/assets.sqlite"):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path.as_posix(), timeout=30, check_same_thread=False)
+        # Only takes effect on a new file; lets release() hand freed pages back to the filesystem
+        self._conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS assets ("
+            "id TEXT PRIMARY KEY, kind TEXT NOT NULL, payload TEXT NOT NULL, tokens INTEGER NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS asset_refs ("
+            "session_id TEXT NOT NULL, asset_id TEXT NOT NULL, PRIMARY KEY (session_id, asset_id)) WITHOUT ROWID"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS asset_refs_asset ON asset_refs (asset_id)")
+        self._conn.commit()
+
+    def put_many(self, rows, session_id=None):
+        # `rows` is an iterable of (id, kind, payload, tokens); existing ids are left as they are.
+        # With a session_id the rows are referenced by that session until release().
+        rows = [(id_, kind, json.dumps(payload, ensure_ascii=False), tokens) for id_, kind, payload, tokens in rows]
+        if not rows:
+            return
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO assets (id, kind, payload, tokens) VALUES (?, ?, ?, ?)", rows
+            )
+            if session_id is not None:
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO asset_refs (session_id, asset_id) VALUES (?, ?)",
+                    [(session_id, row[0]) for row in rows]
+                )
+            self._conn.commit()
+
+    def release(self, session_id):
+        # Drops the session's references and deletes the rows left without any; rows written
+        # before references were recorded have none and are kept. Returns the rows deleted.
+        deleted = 0
+        with self._lock:
+            ids = [row[0] for row in self._conn.execute(
+                "SELECT asset_id FROM asset_refs WHERE session_id = ?", (session_id,)
+            )]
+            self._conn.execute("DELETE FROM asset_refs WHERE session_id = ?", (session_id,))
+            for start in range(0, len(ids), 500):
+                part = ids[start:start + 500]
+                placeholders = ",".join("?" * len(part))
+                deleted += self._conn.execute(
+                    f"DELETE FROM assets WHERE id IN ({placeholders})"
+                    " AND NOT EXISTS (SELECT 1 FROM asset_refs WHERE asset_id = assets.id)", part
+                ).rowcount
+            self._conn.commit()
+            if deleted:
+                # executescript steps the pragma to completion; execute() would free a single page
+                self._conn.executescript("PRAGMA incremental_vacuum;")
+                self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        return deleted
+
+    def disk_bytes(self):
+        return sum(
+            path.stat().st_size for path in (self.path, self.path.with_name(self.path.name + "-wal"))
+            if path.exists()
+        )
+
+    def _select(self, columns, ids):
+        ids = list(dict.fromkeys(ids))
+        rows = []
+        with self._lock:
+            for start in range(0, len(ids), 500):
+                part = ids[start:start + 500]
+                placeholders = ",".join("?" * len(part))
+                rows += self._conn.execute(
+                    f"SELECT id, {columns} FROM assets WHERE id IN ({placeholders})", part
+                ).fetchall()
+        return rows
+
+    def token_counts(self, ids):
+        # {id: tokens} for the ids present, without reading payloads
+        return {id_: tokens for id_, tokens in self._select("tokens", ids)}
+
+    def get_many(self, ids):
+        # {id: payload} for the ids present
+        return {id_: json.loads(payload) for id_, payload in self._select("payload", ids)}
+
+    def stats(self):
+        with self._lock:
+            rows = self._conn.execute("SELECT kind, COUNT(*) FROM assets GROUP BY kind").fetchall()
+        return dict(rows)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -1,46 +1,227 @@
 import json
+import time
+import hashlib
+import itertools
 from pathlib import Path
-from sentence_transformers import SentenceTransformer
-import chromadb
+from src.embedding.model_registry import registry, DEFAULT_DB_PATH, DEFAULT_MODEL_NAME
+from src.embedding.embedding_cache import EmbeddingCache, normalize_text
+from src.embedding.vector_store import open_vector_store, DEFAULT_VECTOR_BACKEND
+from src.embedding.asset_store import ASSET_KEYS, asset_payload, asset_id, has_content, prompt_text
+from src.rag_pipeline.tokenizer import Tokenizer
+from src.observability.tracing import span
+
+
+def chunk_hash(chunk):
+    # Hash of everything a chunk contributes to a prompt. Asset paths are left
+    # out since they change on every extraction even when the content doesn't.
+    parts = [normalize_text(chunk.get("content", ""))]
+    parts += [table.get("text") or "" for table in chunk.get("tables", [])]
+    parts += [code.get("text") or "" for code in chunk.get("code_snippets", [])]
+    parts += [image.get("caption") or "" for image in chunk.get("images", [])]
+    return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
 
 
 class ChromaEmbedder:
-    def __init__(self, chunk_json_path, persist_dir="../data/chroma_db", collection_name="session_id"):
-        self.chunk_json_path = Path(chunk_json_path)
+    def __init__(self, chunk_json_path=None, persist_dir=DEFAULT_DB_PATH, collection_name="session_id",
+                 model_name=DEFAULT_MODEL_NAME, batch_size=64, keep_embeddings=False,
+                 embedding_cache=None, doc_id=None, source=None, backend=DEFAULT_VECTOR_BACKEND):
+        self.chunk_json_path = Path(chunk_json_path) if chunk_json_path else None
         self.persist_dir = Path(persist_dir)
         self.collection_name = collection_name
+        # With a doc_id, chunk ids are "<doc_id>:<content hash>" so several documents
+        # can share a collection and an updated document keeps the ids of unchanged chunks
+        self.doc_id = doc_id
+        self.source = source
+
+        # Chroma, or for small sessions a memory-mapped NumPy index (see vector_store)
+        self.store = open_vector_store(self.collection_name, self.persist_dir, backend)
+        # Asset payloads go to the side-car store; Chroma metadata only lists their ids
+        self.asset_store = registry.get_asset_store(self.persist_dir)
+        self.tokenizer = Tokenizer.get()
+
+        self.model_name = model_name
+        self.embedder = registry.get_encoder(model_name)
+        # Optional EmbeddingCache consulted before encoding
+        self.embedding_cache = embedding_cache
+        self.cache_hits = 0
+        self.cache_misses = 0
 
-        self.client = chromadb.PersistentClient(path=str(self.persist_dir))
-        self.collection = self.client.get_or_create_collection(name=self.collection_name)
+        # Chroma rejects writes above its own max batch size
+        max_batch_size = self.store.max_batch_size or batch_size
+        self.batch_size = max(1, min(batch_size, max_batch_size))
 
-        self.embedder = SentenceTransformer("all-MiniLM-L6-v2")
+        # With keep_embeddings, every chunk and its vector are kept (in document
+        # order) so callers can cache them
+        self.keep_embeddings = keep_embeddings
+        self.embedded_ids = []
+        self.embedded_chunks = []
+        self.embeddings = []
+        # Ids produced by the last embed_and_store call, including skipped ones
+        self.seen_ids = set()
 
     def load_chunks(self):
         with open(self.chunk_json_path, "r", encoding="utf-8") as f:
             return json.load(f)
 
-    def embed_and_store(self):
-        chunks = self.load_chunks()
+    def _encode(self, texts):
+        if self.embedding_cache is None:
+            return self.embedder.encode(
+                texts, batch_size=self.batch_size, convert_to_numpy=True
+            ).tolist()
 
-        for idx, chunk in enumerate(chunks):
-            text = chunk.get("content", "").strip()
-            if not text:
-                continue  # skip empty text chunks
+        keys = [EmbeddingCache.key(self.model_name, text) for text in texts]
+        vectors = self.embedding_cache.get_many(list(dict.fromkeys(keys)))
+        # Encode each distinct missing text once, even if repeated within the batch
+        missing = {key: text for key, text in zip(keys, texts) if key not in vectors}
+        self.cache_hits += len(keys) - sum(1 for key in keys if key in missing)
+        self.cache_misses += len(missing)
+        if missing:
+            encoded = self.embedder.encode(
+                list(missing.values()), batch_size=self.batch_size, convert_to_numpy=True
+            )
+            new_vectors = dict(zip(missing.keys(), encoded))
+            self.embedding_cache.put_many(self.model_name, new_vectors.items())
+            vectors.update(new_vectors)
+        return [vectors[key].tolist() for key in keys]
+
+    def _asset_metadata(self, chunk, assets):
+        # Adds the chunk's assets to `assets` ({id: row}) and returns the metadata fields
+        metadata = {}
+        for chunk_key, (kind, metadata_key) in ASSET_KEYS.items():
+            ids = []
+            for item in chunk.get(chunk_key) or []:
+                payload = asset_payload(kind, item)
+                if not has_content(kind, payload):
+                    continue
+                id_ = asset_id(kind, payload)
+                if id_ not in assets:
+                    assets[id_] = (id_, kind, payload, self.tokenizer.count(prompt_text(kind, payload)))
+                ids.append(id_)
+            metadata[metadata_key] = ",".join(ids)
+        return metadata
 
-            metadata = {
-                "images": json.dumps(chunk.get("images", [])),
-                "tables": json.dumps(chunk.get("tables", [])),
-                "code_snippets": json.dumps(chunk.get("code_snippets", [])),
-                "source_id": str(idx)
-            }
+    def _flush(self, batch):
+        ids, chunks, texts, metadatas, record_indexes, embeddings = zip(*batch)
+        if any(embedding is None for embedding in embeddings):
+            with span("ingest.encode"):
+                embeddings = self._encode(list(texts))
+        else:
+            embeddings = [list(map(float, embedding)) for embedding in embeddings]
 
-            embedding = self.embedder.encode(text).tolist()
+        if self.keep_embeddings:
+            for record_index, embedding in zip(record_indexes, embeddings):
+                self.embeddings[record_index] = embedding
 
-            self.collection.add(
-                documents=[text],
-                embeddings=[embedding],
-                ids=[str(idx)],
-                metadatas=[metadata]
+        # Assets are written before the chunks that reference them
+        assets = {}
+        for chunk, metadata in zip(chunks, metadatas):
+            metadata.update(self._asset_metadata(chunk, assets))
+        with span("ingest.store"):
+            self.asset_store.put_many(assets.values(), session_id=self.collection_name)
+            self.store.upsert(
+                documents=list(texts),
+                embeddings=embeddings,
+                ids=list(ids),
+                metadatas=list(metadatas)
             )
 
-        # print(f"{len(chunks)} chunks embedded and stored in ChromaDB at '{self.persist_dir}'")
+    def existing_ids(self):
+        # Ids of this document's chunks already in the collection
+        if not self.doc_id:
+            return set()
+        return self.store.ids_for_doc(self.doc_id)
+
+    def delete_ids(self, ids):
+        ids = list(ids)
+        with self.store.bulk():
+            for start in range(0, len(ids), self.batch_size):
+                self.store.delete(ids[start:start + self.batch_size])
+
+    def fill_kept_embeddings(self):
+        # Skipped (unchanged) chunks are recorded without a vector; fetch theirs from the store
+        missing = [chunk_id for chunk_id, embedding in zip(self.embedded_ids, self.embeddings) if embedding is None]
+        if not missing:
+            return
+        found = {}
+        for start in range(0, len(missing), self.batch_size):
+            found.update(self.store.get_embeddings(missing[start:start + self.batch_size]))
+        self.embeddings = [
+            found[chunk_id] if embedding is None else embedding
+            for chunk_id, embedding in zip(self.embedded_ids, self.embeddings)
+        ]
+
+    def embed_and_store(self, chunks=None, on_batch=None, embeddings=None, skip_ids=None):
+        # `chunks` may be any iterable (e.g. a generator from StructuredChunker.iter_chunks);
+        # without it the chunks are loaded from chunk_json_path. `embeddings`, if given,
+        # are precomputed vectors aligned with `chunks` and skip encoding. Chunks whose id
+        # is in `skip_ids` are already stored and are neither encoded nor written.
+        # `on_batch(stored)` is called after every bulk write.
+        if chunks is None:
+            chunks = self.load_chunks()
+        if embeddings is None:
+            embeddings = itertools.repeat(None)
+        skip_ids = skip_ids or set()
+        start = time.perf_counter()
+        stored = 0
+        skipped = 0
+        batch = []
+        hash_counts = {}
+        self.seen_ids = set()
+
+        # The NumPy backend publishes everything written in here as one generation
+        with self.store.bulk():
+            for idx, (chunk, embedding) in enumerate(zip(chunks, embeddings)):
+                text = chunk.get("content", "").strip()
+                if not text:
+                    continue  # skip empty text chunks
+
+                metadata = {"source_id": str(idx)}
+                chunk_id = str(idx)
+                if self.doc_id:
+                    content_hash = chunk_hash(chunk)
+                    # Repeated content within one document gets an occurrence suffix
+                    occurrence = hash_counts.get(content_hash, 0)
+                    hash_counts[content_hash] = occurrence + 1
+                    chunk_id = f"{self.doc_id}:{content_hash[:16]}"
+                    if occurrence:
+                        chunk_id += f"-{occurrence}"
+                    metadata["doc_id"] = self.doc_id
+                    metadata["source"] = self.source or ""
+                    metadata["chunk_hash"] = content_hash
+                self.seen_ids.add(chunk_id)
+
+                # Recorded in document order; the vector is filled in when the batch is flushed
+                record_index = len(self.embedded_ids)
+                if self.keep_embeddings:
+                    self.embedded_ids.append(chunk_id)
+                    self.embedded_chunks.append(chunk)
+                    self.embeddings.append(None)
+
+                if chunk_id in skip_ids:
+                    skipped += 1
+                    continue
+                batch.append((chunk_id, chunk, text, metadata, record_index, embedding))
+
+                # One forward pass and one store write per batch instead of per chunk
+                if len(batch) >= self.batch_size:
+                    self._flush(batch)
+                    stored += len(batch)
+                    batch = []
+                    if on_batch:
+                        on_batch(stored)
+
+            if batch:
+                self._flush(batch)
+                stored += len(batch)
+                if on_batch:
+                    on_batch(stored)
+
+        elapsed = time.perf_counter() - start
+        return {
+            "chunks": stored,
+            "skipped": skipped,
+            "seconds": round(elapsed, 3),
+            "chunks_per_sec": round(stored / elapsed, 2) if elapsed > 0 else 0.0,
+            "cache_hits": self.cache_hits,
+            "cache_misses": self.cache_misses
+        }
@@ -0,0 +1,216 @@
+"""Shared embedding service reached over a Unix domain socket.
+
+One process owns the SentenceTransformer models and encodes for every API
+worker and ingestion job on the host:
+
+    python -m src.embedding.embedding_server --socket /tmp/ragpedia-embed.sock
+    export EMBEDDING_SERVER_SOCKET=/tmp/ragpedia-embed.sock
+
+Messages are length-prefixed frames. A request is one JSON frame
+{"model": ..., "texts": [...]}; the reply is a JSON frame {"shape": [n, dim]}
+(or {"error": ...}) followed by a frame of raw float32 vectors.
+"""
+import argparse
+import json
+import os
+import queue
+import socket
+import socketserver
+import struct
+import threading
+import time
+import numpy as np
+
+DEFAULT_SOCKET_PATH = "/tmp/ragpedia-embed.sock"
+# After a failed connection, encode in-process for this long before trying the server again
+RETRY_INTERVAL = float(os.getenv("EMBEDDING_SERVER_RETRY", "30"))
+# Seconds a connect, send or reply may take before the server counts as down (a hung
+# server would otherwise block the caller forever)
+CLIENT_TIMEOUT = float(os.getenv("EMBEDDING_SERVER_TIMEOUT", "60"))
+# Server side: concurrent requests are merged into batches of up to this many texts
+SERVER_MAX_BATCH = int(os.getenv("EMBEDDING_SERVER_MAX_BATCH", "128"))
+SERVER_WAIT_MS = float(os.getenv("EMBEDDING_SERVER_WAIT_MS", "2"))
+
+_HEADER = struct.Struct("!I")
+
+
+def _send_frame(sock, payload: bytes):
+    sock.sendall(_HEADER.pack(len(payload)) + payload)
+
+
+def _recv_exact(sock, size):
+    buffer = bytearray()
+    while len(buffer) < size:
+        part = sock.recv(size - len(buffer))
+        if not part:
+            raise ConnectionError("embedding server closed the connection")
+        buffer += part
+    return bytes(buffer)
+
+
+def _recv_frame(sock):
+    (size,) = _HEADER.unpack(_recv_exact(sock, _HEADER.size))
+    return _recv_exact(sock, size)
+
+
+class _ModelWorker:
+    # Merges requests queued by handler threads into one encode call per batch
+    def __init__(self, model):
+        self.model = model
+        self._queue = queue.Queue()
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def encode(self, texts):
+        done = threading.Event()
+        slot = {"texts": texts, "done": done}
+        self._queue.put(slot)
+        done.wait()
+        if "error" in slot:
+            raise slot["error"]
+        return slot["vectors"]
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            size = len(batch[0]["texts"])
+            deadline = time.perf_counter() + SERVER_WAIT_MS / 1000
+            while size < SERVER_MAX_BATCH:
+                remaining = deadline - time.perf_counter()
+                try:
+                    slot = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                batch.append(slot)
+                size += len(slot["texts"])
+            try:
+                texts = [text for slot in batch for text in slot["texts"]]
+                vectors = np.asarray(self.model.encode(texts, batch_size=len(texts), convert_to_numpy=True),
+                                     dtype=np.float32)
+                start = 0
+                for slot in batch:
+                    slot["vectors"] = vectors[start:start + len(slot["texts"])]
+                    start += len(slot["texts"])
+            except Exception as e:
+                for slot in batch:
+                    slot["error"] = e
+            for slot in batch:
+                slot["done"].set()
+
+
+class _Handler(socketserver.BaseRequestHandler):
+    def handle(self):
+        while True:
+            try:
+                request = json.loads(_recv_frame(self.request))
+            except (ConnectionError, OSError):
+                return
+            try:
+                vectors = self.server.worker(request.get("model")).encode(list(request["texts"]))
+                _send_frame(self.request, json.dumps({"shape": list(vectors.shape)}).encode("utf-8"))
+                _send_frame(self.request, np.ascontiguousarray(vectors).tobytes())
+            except Exception as e:
+                _send_frame(self.request, json.dumps({"error": str(e)}).encode("utf-8"))
+
+
+class EmbeddingServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socket_path=DEFAULT_SOCKET_PATH, model_names=()):
+        from src.embedding.model_registry import registry, DEFAULT_MODEL_NAME
+        self.registry = registry
+        self.default_model = DEFAULT_MODEL_NAME
+        self._workers = {}
+        self._lock = threading.Lock()
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)  # stale socket from a previous run
+        super().__init__(socket_path, _Handler)
+        os.chmod(socket_path, 0o660)
+        for model_name in model_names:
+            self.worker(model_name).encode(["warmup"])
+
+    def worker(self, model_name=None):
+        model_name = model_name or self.default_model
+        with self._lock:
+            if model_name not in self._workers:
+                self._workers[model_name] = _ModelWorker(self.registry.get_model(model_name))
+            return self._workers[model_name]
+
+
+class RemoteEncoder:
+    """Drop-in for SentenceTransformer.encode backed by the embedding server.
+
+    If the server can't be reached the call is served by the in-process
+    model instead (loaded on first need), and the server is retried after
+    RETRY_INTERVAL seconds.
+    """
+
+    def __init__(self, model_name, socket_path, fallback):
+        self.model_name = model_name
+        self.socket_path = socket_path
+        self._fallback = fallback  # returns the in-process model
+        self._local = threading.local()
+        self._down_until = 0.0
+        self.remote_calls = 0
+        self.fallback_calls = 0
+
+    def _connection(self):
+        sock = getattr(self._local, "sock", None)
+        if sock is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            # socket.timeout is an OSError, so a stalled server takes the fallback path
+            sock.settimeout(CLIENT_TIMEOUT)
+            try:
+                sock.connect(self.socket_path)
+            except OSError:
+                sock.close()
+                raise
+            self._local.sock = sock
+        return sock
+
+    def _remote(self, texts):
+        sock = self._connection()
+        try:
+            _send_frame(sock, json.dumps({"model": self.model_name, "texts": texts}).encode("utf-8"))
+            reply = json.loads(_recv_frame(sock))
+            if "error" in reply:
+                raise RuntimeError(f"embedding server: {reply['error']}")
+            data = _recv_frame(sock)
+        except OSError:
+            sock.close()
+            self._local.sock = None
+            raise
+        return np.frombuffer(data, dtype=np.float32).reshape(reply["shape"])
+
+    def encode(self, sentences, batch_size=32, convert_to_numpy=True, **kwargs):
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        if time.monotonic() >= self._down_until:
+            try:
+                vectors = self._remote(texts)
+                self.remote_calls += 1
+                return vectors[0] if single else vectors
+            except OSError:
+                self._down_until = time.monotonic() + RETRY_INTERVAL
+        self.fallback_calls += 1
+        return self._fallback().encode(sentences, batch_size=batch_size, convert_to_numpy=True, **kwargs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve sentence embeddings over a Unix domain socket")
+    parser.add_argument("--socket", default=os.getenv("EMBEDDING_SERVER_SOCKET") or DEFAULT_SOCKET_PATH)
+    parser.add_argument("--models", nargs="*", default=None, help="models to load at startup")
+    args = parser.parse_args()
+
+    from src.embedding.model_registry import DEFAULT_MODEL_NAME
+    server = EmbeddingServer(args.socket, args.models if args.models is not None else [DEFAULT_MODEL_NAME])
+    print(f"Embedding server listening on {args.socket}")
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        if os.path.exists(args.socket):
+            os.unlink(args.socket)
+
+
+if __name__ == "__main__":
+    main()
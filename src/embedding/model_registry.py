@@ -0,0 +1,122 @@
+import os
+import threading
+from pathlib import Path
+from src.embedding.asset_store import AssetStore
+from src.embedding.embedding_server import RemoteEncoder
+
+DEFAULT_MODEL_NAME = "all-MiniLM-L6-v2"
+DEFAULT_DB_PATH = "../data/chroma_db"
+# When set, encoding goes to the shared embedding server on this Unix socket
+EMBEDDING_SERVER_SOCKET = os.getenv("EMBEDDING_SERVER_SOCKET")
+# Cap on the collection indexes a Chroma client keeps in memory; beyond it the least
+# recently used collections are unloaded (0 keeps every opened collection loaded). Closing
+# a session's store doesn't free its index, so this is what bounds Chroma's memory.
+CHROMA_MEMORY_LIMIT_MB = int(os.getenv("CHROMA_MEMORY_LIMIT_MB", "1024"))
+# "host:port" of a Chroma server shared by the API and ingestion workers. Chroma doesn't
+# support several processes on one local PersistentClient directory, so without it the
+# ingestion workers never write to Chroma (see ModelRegistry.chroma_writable)
+CHROMA_SERVER = os.getenv("CHROMA_SERVER")
+
+
+class ModelRegistry:
+    """Process-wide cache of SentenceTransformer models, Chroma clients and asset stores.
+
+    Every model and client is created at most once per process, so request
+    handlers can ask for them freely without paying the load cost again.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._models = {}
+        self._encoders = {}
+        self._clients = {}
+        self._asset_stores = {}
+        # Cleared in ingestion worker processes: they run beside the API process, so a local
+        # Chroma directory would have several writers
+        self.local_chroma_writes = True
+
+    def get_model(self, model_name: str = DEFAULT_MODEL_NAME):
+        model = self._models.get(model_name)
+        if model is None:
+            with self._lock:
+                model = self._models.get(model_name)
+                if model is None:
+                    # Imported here so processes that never encode (e.g. APP_ROLE=ingest's API
+                    # process) don't pay for torch
+                    from sentence_transformers import SentenceTransformer
+                    model = SentenceTransformer(model_name)
+                    self._models[model_name] = model
+        return model
+
+    def get_encoder(self, model_name: str = DEFAULT_MODEL_NAME):
+        # Anything with SentenceTransformer.encode: the embedding server client when
+        # configured (falling back to the local model), otherwise the local model itself
+        if not EMBEDDING_SERVER_SOCKET:
+            return self.get_model(model_name)
+        encoder = self._encoders.get(model_name)
+        if encoder is None:
+            with self._lock:
+                encoder = self._encoders.get(model_name)
+                if encoder is None:
+                    encoder = RemoteEncoder(
+                        model_name, EMBEDDING_SERVER_SOCKET, lambda: self.get_model(model_name)
+                    )
+                    self._encoders[model_name] = encoder
+        return encoder
+
+    def get_client(self, db_path=DEFAULT_DB_PATH):
+        key = str(Path(db_path).resolve())
+        client = self._clients.get(key)
+        if client is None:
+            with self._lock:
+                client = self._clients.get(key)
+                if client is None:
+                    import chromadb
+                    if CHROMA_SERVER:
+                        host, _, port = CHROMA_SERVER.rpartition(":")
+                        client = chromadb.HttpClient(host=host, port=int(port))
+                    elif CHROMA_MEMORY_LIMIT_MB:
+                        from chromadb.config import Settings
+                        settings = Settings(
+                            chroma_segment_cache_policy="LRU",
+                            chroma_memory_limit_bytes=CHROMA_MEMORY_LIMIT_MB * 1024 * 1024
+                        )
+                        Path(key).mkdir(parents=True, exist_ok=True)
+                        client = chromadb.PersistentClient(path=key, settings=settings)
+                    else:
+                        Path(key).mkdir(parents=True, exist_ok=True)
+                        client = chromadb.PersistentClient(path=key)
+                    self._clients[key] = client
+        return client
+
+    def chroma_writable(self):
+        return bool(CHROMA_SERVER) or self.local_chroma_writes
+
+    def check_chroma_writable(self):
+        if not self.chroma_writable():
+            raise RuntimeError(
+                "This session is stored in Chroma; ingesting into it needs a shared Chroma server (CHROMA_SERVER)"
+            )
+
+    def get_asset_store(self, db_path=DEFAULT_DB_PATH):
+        # Assets live next to the Chroma index they belong to
+        key = str(Path(db_path).resolve())
+        store = self._asset_stores.get(key)
+        if store is None:
+            with self._lock:
+                store = self._asset_stores.get(key)
+                if store is None:
+                    store = AssetStore(Path(key) / "assets.sqlite")
+                    self._asset_stores[key] = store
+        return store
+
+    def warmup(self, model_names=(DEFAULT_MODEL_NAME,), db_paths=(DEFAULT_DB_PATH,)):
+        # Run one encode per model so lazy weight init and thread pools are
+        # paid for here rather than by the first real request
+        for model_name in model_names:
+            self.get_encoder(model_name).encode(["warmup"])
+        for db_path in db_paths:
+            self.get_client(db_path).heartbeat()
+
+
+registry = ModelRegistry()
@@ -0,0 +1,652 @@
+import json
+import os
+import shutil
+import sqlite3
+import uuid
+from contextlib import closing, contextmanager
+from pathlib import Path
+import numpy as np
+from src.embedding.model_registry import registry, DEFAULT_DB_PATH, CHROMA_SERVER
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process locking for the NumPy backend
+    fcntl = None
+
+# "auto", "numpy" or "chroma"
+DEFAULT_VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "auto")
+# Under "auto", sessions move from the NumPy backend to Chroma beyond this many chunks
+NUMPY_MAX_VECTORS = int(os.getenv("NUMPY_MAX_VECTORS", "20000"))
+# NumPy backend: "none", "int8" or "binary" codes searched before float32 rescoring
+DEFAULT_QUANTIZATION = os.getenv("VECTOR_QUANTIZATION", "none")
+# Candidates rescored with full-precision vectors, as a multiple of top_k
+RESCORE_FACTOR = int(os.getenv("VECTOR_RESCORE_FACTOR", "10"))
+
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def _empty_result():
+    return {"ids": [[]], "documents": [[]], "metadatas": [[]], "distances": [[]]}
+
+
+def _normalize(matrix):
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    return matrix / np.where(norms == 0, 1, norms)
+
+
+def _top_k(scores, k):
+    k = min(k, len(scores))
+    top = np.argpartition(-scores, k - 1)[:k]
+    return top[np.argsort(-scores[top])]
+
+
+def _int8_scale(vectors):
+    return float(np.abs(vectors).max()) / 127 if len(vectors) else 0.0
+
+
+def _quantize(vectors, mode, scale):
+    if mode == "int8":
+        # One scale for the whole matrix keeps coarse scores comparable across rows; rows
+        # appended later reuse it and saturate where they exceed it
+        return np.clip(np.round(vectors / (scale or 1.0)), -127, 127).astype(np.int8)
+    # binary: one sign bit per dimension
+    return np.packbits(vectors > 0, axis=1)
+
+
+def _coarse_scores(codes, query, mode, block=8192):
+    # Higher is more similar; computed in blocks so int8 rows are never all widened at once
+    scores = []
+    if mode == "binary":
+        query_bits = np.packbits(query > 0)
+        for start in range(0, len(codes), block):
+            differing = _POPCOUNT[codes[start:start + block] ^ query_bits].sum(axis=1, dtype=np.int32)
+            scores.append(-differing)
+    else:
+        for start in range(0, len(codes), block):
+            scores.append(codes[start:start + block].astype(np.float32) @ query)
+    return np.concatenate(scores)
+
+
+class StoreMigratedError(Exception):
+    pass
+
+
+class VectorStore:
+    """Storage and search of one session's chunk vectors.
+
+    query() returns results shaped like Chroma's (one list per query), so
+    callers don't depend on the backend.
+    """
+
+    # Largest upsert the backend accepts in one call (None: no limit)
+    max_batch_size = None
+
+    def upsert(self, ids, embeddings, documents, metadatas):
+        raise NotImplementedError
+
+    def ids_for_doc(self, doc_id):
+        raise NotImplementedError
+
+    def get_embeddings(self, ids):
+        raise NotImplementedError
+
+    def delete(self, ids):
+        raise NotImplementedError
+
+    def query(self, embedding, top_k=5):
+        raise NotImplementedError
+
+    def count(self):
+        raise NotImplementedError
+
+    @contextmanager
+    def bulk(self):
+        # Writes inside may be buffered until the block exits; no-op unless a backend needs it
+        yield
+
+
+class ChromaVectorStore(VectorStore):
+    def __init__(self, db_path=DEFAULT_DB_PATH, collection_name="session_id"):
+        self.client = registry.get_client(db_path)
+        self.collection = self.client.get_or_create_collection(name=collection_name)
+        self.max_batch_size = getattr(self.client, "get_max_batch_size", lambda: None)()
+
+    @staticmethod
+    def exists(db_path, collection_name):
+        try:
+            return registry.get_client(db_path).get_collection(name=collection_name).count() > 0
+        except Exception:
+            return False
+
+    @staticmethod
+    def segment_dirs(db_path, collection_name):
+        # Directories of the collection's persisted index, looked up in Chroma's sqlite catalogue
+        # so that measuring a collection doesn't load it (its rows in chroma.sqlite3 aren't included)
+        catalogue = Path(db_path) / "chroma.sqlite3"
+        if CHROMA_SERVER or not catalogue.exists():
+            return []
+        try:
+            with closing(sqlite3.connect(f"file:{catalogue}?mode=ro", uri=True)) as db:
+                rows = db.execute(
+                    "SELECT segments.id FROM segments JOIN collections ON segments.collection = collections.id"
+                    " WHERE collections.name = ?", (collection_name,)
+                ).fetchall()
+        except sqlite3.Error:
+            return []
+        return [Path(db_path) / row[0] for row in rows if (Path(db_path) / row[0]).is_dir()]
+
+    def upsert(self, ids, embeddings, documents, metadatas):
+        registry.check_chroma_writable()
+        self.collection.upsert(ids=list(ids), embeddings=list(embeddings),
+                               documents=list(documents), metadatas=list(metadatas))
+
+    def ids_for_doc(self, doc_id):
+        return set(self.collection.get(where={"doc_id": doc_id}, include=[])["ids"])
+
+    def get_embeddings(self, ids):
+        result = self.collection.get(ids=list(ids), include=["embeddings"])
+        return dict(zip(result["ids"], result["embeddings"]))
+
+    def delete(self, ids):
+        ids = list(ids)
+        if ids:
+            registry.check_chroma_writable()
+            self.collection.delete(ids=ids)
+
+    def query(self, embedding, top_k=5):
+        return self.collection.query(query_embeddings=[embedding], n_results=top_k)
+
+    def count(self):
+        return self.collection.count()
+
+
+class NumpyVectorStore(VectorStore):
+    """Exact search over a session's vectors in a memory-mapped float32 matrix.
+
+    Vectors are stored L2-normalized, so top-k by cosine similarity is one
+    matrix-vector product. Chunk texts and metadata are kept as JSON lines
+    next to the matrix and only the top-k records are read per query.
+
+    With quantization set to "int8" or "binary", compact codes of the vectors
+    are searched first and only the best top_k * rescore_factor candidates
+    are rescored against the float32 matrix, which stays on disk and is only
+    paged in for those rows.
+
+    Writes happen under an exclusive lock and are published by replacing
+    index.json, which records how many rows of each file belong to the
+    generation, so readers always see a complete one. New vectors and records
+    are appended to the files; updated and deleted rows are only marked dead
+    in the index until they outnumber the live ones and the files are
+    rewritten. Readers hold a shared lock while they use a generation's files,
+    and a rewritten generation is deleted once no reader holds it. Inside bulk(),
+    upserts and deletes are buffered and published as one generation when the
+    block exits.
+    """
+
+    def __init__(self, db_path=DEFAULT_DB_PATH, collection_name="session_id",
+                 quantization=DEFAULT_QUANTIZATION, rescore_factor=RESCORE_FACTOR):
+        if quantization not in ("none", "int8", "binary"):
+            raise ValueError(f"Unknown vector quantization: {quantization}")
+        self.dir = Path(db_path) / "numpy" / collection_name
+        # Applied on the next rewrite; queries follow whatever the index was written with
+        self.quantization = quantization
+        self.rescore_factor = rescore_factor
+        # {id: (vector, record) or None for a delete} while inside bulk()
+        self._pending = None
+        self._pending_base = 0
+
+    @staticmethod
+    def exists(db_path, collection_name):
+        return (Path(db_path) / "numpy" / collection_name / "index.json").exists()
+
+    @staticmethod
+    def migrated(db_path, collection_name):
+        return (Path(db_path) / "numpy" / collection_name / "MIGRATED").exists()
+
+    def _index(self):
+        try:
+            with open(self.dir / "index.json", "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    @staticmethod
+    def _live(index):
+        return len(index["ids"]) - len(index["dead"]) if index else 0
+
+    def _vectors(self, index):
+        # Only the generation's rows: later appends may already have extended the file
+        return np.memmap(self.dir / index["vectors"], dtype=np.float32, mode="r",
+                         shape=(len(index["ids"]), index["dim"]))
+
+    def _codes(self, index):
+        width = index["dim"] if index["quantization"] == "int8" else (index["dim"] + 7) // 8
+        dtype = np.int8 if index["quantization"] == "int8" else np.uint8
+        return np.memmap(self.dir / index["codes"], dtype=dtype, mode="r", shape=(len(index["ids"]), width))
+
+    def _records(self, index, positions):
+        records = []
+        with open(self.dir / index["records"], "rb") as f:
+            for position in positions:
+                f.seek(index["offsets"][position])
+                records.append(json.loads(f.readline()))
+        return records
+
+    @contextmanager
+    def _locked(self):
+        self.dir.mkdir(parents=True, exist_ok=True)
+        with open(self.dir / ".lock", "w") as lock:
+            if fcntl:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                if (self.dir / "MIGRATED").exists():
+                    raise StoreMigratedError(self.dir.name)
+                yield
+            finally:
+                if fcntl:
+                    fcntl.flock(lock, fcntl.LOCK_UN)
+
+    @contextmanager
+    def _reading(self):
+        # Yields the current index with a shared lock held on its generation, so that its files
+        # aren't deleted while they are read (see _collect)
+        while True:
+            index = self._index()
+            if not (index and fcntl):
+                break
+            try:
+                lock = open(self.dir / f".readers-{index['generation']}", "a")
+            except FileNotFoundError:
+                index = None  # evicted meanwhile
+                break
+            fcntl.flock(lock, fcntl.LOCK_SH)
+            if (self.dir / index["vectors"]).exists():
+                try:
+                    yield index
+                finally:
+                    lock.close()
+                return
+            lock.close()  # collected between loading the index and locking it: load the new one
+        yield index
+
+    def _collect(self, current=None, wait=False):
+        # Deletes the files of generations other than the current one. Generations a reader
+        # still holds are left for a later write.
+        retired = {path.name.split("-", 1)[1].split(".")[0] for path in self.dir.glob("*-*")} - {current}
+        for generation in retired:
+            lock_path = self.dir / f".readers-{generation}"
+            with open(lock_path, "a") as lock:
+                if fcntl:
+                    try:
+                        fcntl.flock(lock, fcntl.LOCK_EX if wait else fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    except BlockingIOError:
+                        continue
+                for path in [*self.dir.glob(f"*-{generation}.*"), lock_path]:
+                    try:
+                        path.unlink()
+                    except OSError:
+                        pass
+
+    def _load_all(self, index, dead):
+        positions = [i for i in range(len(index["ids"])) if i not in dead] if index else []
+        if not positions:
+            return [], [], None, []
+        vectors = np.array(self._vectors(index)[positions])
+        records = self._records(index, positions)
+        return [index["ids"][i] for i in positions], [index["doc_ids"][i] for i in positions], vectors, records
+
+    def _publish(self, index):
+        tmp_path = self.dir / f"index-{uuid.uuid4().hex[:12]}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(index, f)
+        os.replace(tmp_path, self.dir / "index.json")
+        self._collect(index["generation"])
+
+    @staticmethod
+    def _encode(records, start):
+        offsets, lines = [], []
+        for record in records:
+            offsets.append(start)
+            lines.append((json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8"))
+            start += len(lines[-1])
+        return offsets, b"".join(lines)
+
+    def _write(self, ids, doc_ids, vectors, records):
+        # Rewrites every file under a new name
+        token = uuid.uuid4().hex[:12]
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        offsets, data = self._encode(records, 0)
+        index = {
+            "ids": ids,
+            "doc_ids": doc_ids,
+            "offsets": offsets,
+            "dead": [],
+            "dim": vectors.shape[1],
+            "generation": token,
+            "vectors": f"vectors-{token}.f32",
+            "records": f"records-{token}.jsonl",
+            "records_end": len(data),
+            "quantization": self.quantization,
+        }
+        vectors.tofile(self.dir / index["vectors"])
+        if self.quantization != "none":
+            index["codes"] = f"codes-{token}.bin"
+            index["scale"] = _int8_scale(vectors)
+            _quantize(vectors, self.quantization, index["scale"]).tofile(self.dir / index["codes"])
+        with open(self.dir / index["records"], "wb") as f:
+            f.write(data)
+        self._publish(index)
+
+    def _write_at(self, name, offset, data):
+        # Past the end of the published rows; whatever an interrupted append left there is dropped
+        with open(self.dir / name, "r+b") as f:
+            f.seek(offset)
+            f.write(data)
+            f.truncate()
+
+    def _append(self, index, dead, ids, doc_ids, vectors, records):
+        rows = len(index["ids"])
+        offsets, data = self._encode(records, index["records_end"])
+        if ids:
+            vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+            self._write_at(index["vectors"], rows * vectors[0].nbytes, vectors.tobytes())
+            if "codes" in index:
+                codes = _quantize(vectors, index["quantization"], index["scale"])
+                self._write_at(index["codes"], rows * codes[0].nbytes, codes.tobytes())
+            self._write_at(index["records"], index["records_end"], data)
+        self._publish(dict(
+            index,
+            ids=index["ids"] + ids,
+            doc_ids=index["doc_ids"] + doc_ids,
+            offsets=index["offsets"] + offsets,
+            dead=sorted(dead),
+            records_end=index["records_end"] + len(data),
+        ))
+
+    def _apply(self, changes):
+        # changes: {id: (normalized vector, record) or None to delete}, published as one generation
+        with self._locked():
+            index = self._index()
+            dead = set(index["dead"]) if index else set()
+            position = {id_: i for i, id_ in enumerate(index["ids"]) if i not in dead} if index else {}
+            removed = set()
+            for id_, change in changes.items():
+                i = position.pop(id_, None)
+                if i is not None:
+                    removed.add(i)  # an update appends the new row and retires this one
+            new_ids = [id_ for id_, change in changes.items() if change is not None]
+            if not (new_ids or removed):
+                return  # only deletes of ids that aren't stored
+            new_vectors = np.stack([changes[id_][0] for id_ in new_ids]) if new_ids else None
+            new_records = [changes[id_][1] for id_ in new_ids]
+            new_doc_ids = [(record["metadata"] or {}).get("doc_id") for record in new_records]
+            dead |= removed
+
+            live = self._live(index) - len(removed) + len(new_ids)
+            if index and len(dead) <= live and index["quantization"] == self.quantization \
+                    and (new_vectors is None or new_vectors.shape[1] == index["dim"]):
+                self._append(index, dead, new_ids, new_doc_ids, new_vectors, new_records)
+                return
+            # Rewrite: first write, dead rows outnumber live ones, or the quantization changed
+            ids, doc_ids, vectors, records = self._load_all(index, dead)
+            if new_ids:
+                vectors = new_vectors if vectors is None else np.vstack([vectors, new_vectors])
+            elif vectors is None:
+                vectors = np.empty((0, index["dim"]), dtype=np.float32)
+            self._write(ids + new_ids, doc_ids + new_doc_ids, vectors, records + new_records)
+
+    def _change(self, changes):
+        if self._pending is not None:
+            self._pending.update(changes)
+        else:
+            self._apply(changes)
+
+    @contextmanager
+    def bulk(self):
+        if self._pending is not None:
+            yield  # nested: the outermost block publishes
+            return
+        self._pending = {}
+        self._pending_base = self._published_count()
+        try:
+            yield
+            self.flush()
+        finally:
+            self._pending = None
+
+    def flush(self):
+        if self._pending:
+            pending, self._pending = self._pending, {}
+            try:
+                self._apply(pending)
+            except StoreMigratedError as e:
+                e.pending = pending  # for the caller to replay on the new backend
+                raise
+            self._pending_base = self._published_count()
+
+    def _published_count(self):
+        return self._live(self._index())
+
+    def size(self):
+        # Upper bound on the vectors held once pending writes are published
+        if self._pending is None:
+            return self.count()
+        return self._pending_base + sum(1 for change in self._pending.values() if change is not None)
+
+    def upsert(self, ids, embeddings, documents, metadatas):
+        new_vectors = _normalize(np.asarray(embeddings, dtype=np.float32))
+        self._change({
+            id_: (vector, {"document": document, "metadata": metadata})
+            for id_, vector, document, metadata in zip(ids, new_vectors, documents, metadatas)
+        })
+
+    def ids_for_doc(self, doc_id):
+        index = self._index()
+        if not index:
+            return set()
+        dead = set(index["dead"])
+        return {id_ for i, (id_, owner) in enumerate(zip(index["ids"], index["doc_ids"]))
+                if owner == doc_id and i not in dead}
+
+    def get_embeddings(self, ids):
+        with self._reading() as index:
+            if not self._live(index):
+                return {}
+            dead = set(index["dead"])
+            position = {id_: i for i, id_ in enumerate(index["ids"]) if i not in dead}
+            vectors = self._vectors(index)
+            return {id_: vectors[position[id_]].tolist() for id_ in ids if id_ in position}
+
+    def delete(self, ids):
+        ids = list(ids)
+        if ids:
+            self._change(dict.fromkeys(ids))
+
+    def query(self, embedding, top_k=5):
+        with self._reading() as index:
+            if not self._live(index):
+                if index is None and (self.dir / "MIGRATED").exists():
+                    raise StoreMigratedError(self.dir.name)
+                return _empty_result()
+            top_k = min(top_k, self._live(index))
+            dead = np.asarray(index["dead"], dtype=np.int64)
+            vectors = self._vectors(index)
+            query = _normalize(np.asarray(embedding, dtype=np.float32))
+            mode = index["quantization"]
+            if mode == "none":
+                scores = vectors @ query
+                scores[dead] = -np.inf
+                top = _top_k(scores, top_k)
+                top_scores = scores[top]
+            else:
+                coarse = _coarse_scores(self._codes(index), query, mode).astype(np.float32)
+                coarse[dead] = -np.inf
+                # Sorted so the float32 rows are read in file order
+                candidates = np.sort(_top_k(coarse, top_k * self.rescore_factor))
+                scores = vectors[candidates] @ query
+                scores[np.isin(candidates, dead)] = -np.inf
+                order = _top_k(scores, top_k)
+                top = candidates[order]
+                top_scores = scores[order]
+            records = self._records(index, top)
+        return {
+            "ids": [[index["ids"][i] for i in top]],
+            "documents": [[record["document"] for record in records]],
+            "metadatas": [[record["metadata"] for record in records]],
+            "distances": [[float(1 - score) for score in top_scores]],
+        }
+
+    def count(self):
+        index = self._index()
+        if index is None and (self.dir / "MIGRATED").exists():
+            raise StoreMigratedError(self.dir.name)
+        return self._live(index)
+
+    def nbytes(self):
+        # Size of the files a query maps (float32 matrix and codes), dead rows included
+        with self._reading() as index:
+            if not index:
+                return 0
+            return sum((self.dir / index[key]).stat().st_size for key in ("vectors", "codes") if key in index)
+
+    def export(self):
+        # (ids, vectors, documents, metadatas) of everything stored, and marks
+        # the store as migrated so later writers go to the new backend
+        with self._locked():
+            index = self._index()
+            ids, _, vectors, records = self._load_all(index, set(index["dead"]) if index else set())
+            (self.dir / "MIGRATED").touch()
+            (self.dir / "index.json").unlink(missing_ok=True)
+            self._collect(wait=True)
+        documents = [record["document"] for record in records]
+        metadatas = [record["metadata"] for record in records]
+        return ids, vectors, documents, metadatas
+
+
+class AutoVectorStore(VectorStore):
+    """Chooses the backend per session by size.
+
+    Sessions start on the NumPy backend and are moved to Chroma once they
+    hold more than max_vectors chunks, unless this process may not write to
+    Chroma (see ModelRegistry.chroma_writable), in which case they stay on
+    NumPy. Sessions that already live in Chroma stay there.
+    """
+
+    def __init__(self, db_path=DEFAULT_DB_PATH, collection_name="session_id",
+                 max_vectors=NUMPY_MAX_VECTORS, quantization=DEFAULT_QUANTIZATION):
+        self.db_path = db_path
+        self.collection_name = collection_name
+        self.max_vectors = max_vectors
+        if NumpyVectorStore.migrated(db_path, collection_name):
+            self.backend = ChromaVectorStore(db_path, collection_name)
+        elif NumpyVectorStore.exists(db_path, collection_name) or \
+                not ChromaVectorStore.exists(db_path, collection_name):
+            self.backend = NumpyVectorStore(db_path, collection_name, quantization)
+        else:
+            self.backend = ChromaVectorStore(db_path, collection_name)
+
+    @property
+    def max_batch_size(self):
+        return self.backend.max_batch_size
+
+    def _to_chroma(self):
+        self.backend = ChromaVectorStore(self.db_path, self.collection_name)
+
+    def _upsert_batched(self, ids, vectors, documents, metadatas):
+        step = self.backend.max_batch_size or 1000
+        for start in range(0, len(ids), step):
+            end = start + step
+            self.backend.upsert(ids[start:end], [list(map(float, vector)) for vector in vectors[start:end]],
+                                documents[start:end], metadatas[start:end])
+
+    def _migrate(self):
+        ids, vectors, documents, metadatas = self.backend.export()
+        self._to_chroma()
+        self._upsert_batched(ids, vectors, documents, metadatas)
+
+    def _replay(self, changes):
+        upserts = {id_: change for id_, change in changes.items() if change is not None}
+        self._upsert_batched(
+            list(upserts), [vector for vector, _ in upserts.values()],
+            [record["document"] for _, record in upserts.values()],
+            [record["metadata"] for _, record in upserts.values()]
+        )
+        self.backend.delete([id_ for id_, change in changes.items() if change is None])
+
+    @contextmanager
+    def bulk(self):
+        backend = self.backend
+        if not isinstance(backend, NumpyVectorStore):
+            yield
+            return
+        try:
+            with backend.bulk():
+                yield
+        except StoreMigratedError as e:
+            if not hasattr(e, "pending"):
+                raise
+            # Another process moved this session to Chroma while the writes were buffered
+            self._to_chroma()
+            self._replay(e.pending)
+
+    def upsert(self, ids, embeddings, documents, metadatas):
+        try:
+            self.backend.upsert(ids, embeddings, documents, metadatas)
+        except StoreMigratedError:
+            # Another process moved this session to Chroma since we opened it
+            self._to_chroma()
+            self.backend.upsert(ids, embeddings, documents, metadatas)
+        if isinstance(self.backend, NumpyVectorStore) and self.backend.size() > self.max_vectors \
+                and registry.chroma_writable():
+            self.backend.flush()
+            self._migrate()
+
+    def ids_for_doc(self, doc_id):
+        return self.backend.ids_for_doc(doc_id)
+
+    def get_embeddings(self, ids):
+        return self.backend.get_embeddings(ids)
+
+    def delete(self, ids):
+        try:
+            self.backend.delete(ids)
+        except StoreMigratedError:
+            self._to_chroma()
+            self.backend.delete(ids)
+
+    def query(self, embedding, top_k=5):
+        # A long-lived handle (see SessionManager) may outlive a migration done elsewhere
+        try:
+            return self.backend.query(embedding, top_k)
+        except StoreMigratedError:
+            self._to_chroma()
+            return self.backend.query(embedding, top_k)
+
+    def count(self):
+        try:
+            return self.backend.count()
+        except StoreMigratedError:
+            self._to_chroma()
+            return self.backend.count()
+
+
+BACKENDS = {
+    "auto": AutoVectorStore,
+    "numpy": NumpyVectorStore,
+    "chroma": ChromaVectorStore,
+}
+
+
+def open_vector_store(collection_name, db_path=DEFAULT_DB_PATH, backend=DEFAULT_VECTOR_BACKEND):
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown vector backend: {backend}")
+    return BACKENDS[backend](db_path, collection_name)
+
+
+def drop_vector_store(collection_name, db_path=DEFAULT_DB_PATH):
+    # Deletes a session's vectors from whichever backends hold them
+    shutil.rmtree(Path(db_path) / "numpy" / collection_name, ignore_errors=True)
+    try:
+        registry.get_client(db_path).delete_collection(name=collection_name)
+    except Exception:
+        pass  # no Chroma collection for this session
@@ -0,0 +1,75 @@
+import hashlib
+import os
+import re
+import shutil
+import tempfile
+import uuid
+from pathlib import Path
+
+# Thumbnail edge lengths served by the API; anything else is rejected so the cache stays bounded
+THUMBNAIL_SIZES = (64, 128, 256, 512)
+_IMAGE_NAME = re.compile(r"[0-9a-f]{32}\.(png|jpe?g)|img_[0-9a-f]{32}\.png")
+
+
+class ImageAssets:
+    """Image files of one extraction directory, named by content hash.
+
+    unstructured writes each cropped figure straight to an incoming directory;
+    add() hashes the file as a stream and renames it to <sha256[:32]>.<ext>,
+    or deletes it when the same bytes are already stored, so a logo repeated on
+    every page is kept once. Thumbnails are made on first request under
+    thumbs/<size>/.
+    """
+
+    def __init__(self, image_dir):
+        self.image_dir = Path(image_dir)
+        self.image_dir.mkdir(parents=True, exist_ok=True)
+        self.stored = 0
+        self.duplicates = 0
+
+    @staticmethod
+    def valid_name(name: str):
+        # Content-hash names, plus the uuid names written before images were deduplicated
+        return bool(_IMAGE_NAME.fullmatch(name or ""))
+
+    def incoming_dir(self):
+        # Same filesystem as image_dir, so add() is a rename rather than a copy
+        return Path(tempfile.mkdtemp(prefix=".incoming-", dir=self.image_dir))
+
+    def add(self, source):
+        source = Path(source)
+        sha = hashlib.sha256()
+        with open(source, "rb") as f:
+            while block := f.read(1024 * 1024):
+                sha.update(block)
+        suffix = source.suffix.lower() or ".png"
+        target = self.image_dir / f"{sha.hexdigest()[:32]}{suffix}"
+        if target.exists():
+            source.unlink()
+            self.duplicates += 1
+        else:
+            os.replace(source, target)
+            self.stored += 1
+        return target
+
+    @staticmethod
+    def discard(incoming):
+        # Crops nobody asked for (and leftovers of a failed extraction)
+        shutil.rmtree(incoming, ignore_errors=True)
+
+    def thumbnail(self, name: str, size: int):
+        thumb = self.image_dir / "thumbs" / str(size) / name
+        if thumb.exists():
+            return thumb
+        from PIL import Image
+
+        with Image.open(self.image_dir / name) as image:
+            image.thumbnail((size, size))
+            if thumb.suffix in (".jpg", ".jpeg") and image.mode not in ("RGB", "L"):
+                image = image.convert("RGB")
+            thumb.parent.mkdir(parents=True, exist_ok=True)
+            # Concurrent first requests each write their own file; the last rename wins
+            tmp_path = thumb.with_name(f".{uuid.uuid4().hex}{thumb.suffix}")
+            image.save(tmp_path, format="JPEG" if thumb.suffix in (".jpg", ".jpeg") else "PNG")
+        os.replace(tmp_path, thumb)
+        return thumb
@@ -1,66 +1,204 @@
+import io
 import os
-import uuid
-import base64
-from unstructured.partition.pdf import partition_pdf
-from unstructured.partition.docx import partition_docx
-from unstructured.documents.elements import (
-    Table, NarrativeText, Title, ListItem, FigureCaption, Image, CodeSnippet
-)
-
+import math
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from pypdf import PdfReader, PdfWriter
 from pathlib import Path
+from src.extraction.image_assets import ImageAssets
+from src.observability.tracing import span, observe
+
+# Item type -> key of the list it is grouped under in extracted.json
+OUTPUT_KEYS = {
+    "text": "text_chunks",
+    "table": "tables",
+    "image": "images",
+    "code_snippet": "code_snippets"
+}
+
+
+# Pages with at least this many characters of extractable text have a usable text layer
+MIN_TEXT_LAYER_CHARS = 200
+# Ruling operators (lines/rectangles) on a page beyond which it probably holds a table
+TABLE_RULE_THRESHOLD = 12
+
+
+def warmup():
+    # Ingestion workers import the partitioners up front instead of during their first job
+    import unstructured.partition.pdf
+    import unstructured.partition.docx
+
+
+def _partition_pdf(file, image_dir, starting_page_number=1, strategy="hi_res"):
+    # unstructured (and its layout model stack) is only imported once something is extracted
+    from unstructured.partition.pdf import partition_pdf
+    if strategy == "fast":
+        # Text-layer only: no layout model, nothing to crop out
+        return partition_pdf(file=file, strategy="fast", starting_page_number=starting_page_number)
+    # Figures are written straight to image_dir and referenced by metadata.image_path; no
+    # base64 copy is kept on the element. Table crops aren't requested: tables are kept as
+    # html/text and nothing referenced the crop.
+    return partition_pdf(
+        file=file,
+        strategy="hi_res",
+        extract_image_block_types=["Image"],
+        extract_image_block_output_dir=image_dir,
+        extract_image_block_to_payload=False,
+        starting_page_number=starting_page_number
+    )
+
+
+def _partition_pdf_range(pdf_bytes, image_dir, starting_page_number, strategy="hi_res"):
+    # Runs (possibly in a worker process) on one page range split out of the source PDF
+    return _partition_pdf(io.BytesIO(pdf_bytes), image_dir, starting_page_number, strategy)
+
+
+def _has_images(resources, depth=0):
+    resources = resources.get_object() if resources is not None else None
+    xobjects = resources.get("/XObject") if resources else None
+    if not xobjects:
+        return False
+    for name in xobjects.get_object():
+        xobject = xobjects.get_object()[name].get_object()
+        subtype = xobject.get("/Subtype")
+        if subtype == "/Image":
+            return True
+        # Form XObjects can wrap images in their own resources
+        if subtype == "/Form" and depth < 3 and _has_images(xobject.get("/Resources"), depth + 1):
+            return True
+    return False
+
+
+def _classify_page(page):
+    # "fast" only for pages with a real text layer and no figures or likely tables;
+    # scanned pages, images and ruled tables all need the hi_res layout model
+    text = page.extract_text() or ""
+    if len(text.strip()) < MIN_TEXT_LAYER_CHARS:
+        return "hi_res"
+    if _has_images(page.get("/Resources")):
+        return "hi_res"
+
+    contents = page.get_contents()
+    rules = 0
+    for _, operator in (contents.operations if contents is not None else []):
+        if operator == b"INLINE IMAGE":
+            return "hi_res"
+        if operator in (b"re", b"l"):
+            rules += 1
+            if rules >= TABLE_RULE_THRESHOLD:
+                return "hi_res"
+    return "fast"
 
 
 class DocumentExtractor:
-    def __init__(self, session_id: str, base_dir: str = "../data"):
+    def __init__(self, session_id: str, base_dir: str = "../data", page_workers: int = 0,
+                 pages_per_range: int = None, strategy: str = "hi_res"):
+        # page_workers > 1 partitions page ranges of a PDF in parallel processes
+        self.page_workers = page_workers
+        self.pages_per_range = pages_per_range
+        # "hi_res" for every page, or "auto" to pick fast/hi_res per page
+        if strategy not in ("hi_res", "auto"):
+            raise ValueError(f"Unknown extraction strategy: {strategy}")
+        self.strategy = strategy
+        # Page counts are only reported for PDFs; a DOCX has no pages to classify
+        self.stats = {"images_stored": 0, "images_duplicate": 0}
         self.session_id = session_id
         self.base_dir = Path(base_dir)
         self.session_dir = self.base_dir / session_id
         self.image_dir = self.session_dir / "images"
-        self.table_dir = self.session_dir / "tables"
         os.makedirs(self.session_dir, exist_ok=True)
-        os.makedirs(self.image_dir, exist_ok=True)
-        os.makedirs(self.table_dir, exist_ok=True)
+        self.images = ImageAssets(self.image_dir)
 
-    def _get_elements(self, file):
+    def _get_elements(self, file, image_dir):
         filename = file.filename.lower()
         if filename.endswith(".pdf"):
-            return partition_pdf(
-                file=file.file,
-                strategy="hi_res",
-                extract_image_block_types=["Image", "Table"],
-                extract_image_block_output_dir=self.image_dir.as_posix(),
-                extract_image_block_to_payload=True
-            )
+            if self.strategy == "auto" or (self.page_workers and self.page_workers > 1):
+                return self._partition_pdf_ranges(file.file, image_dir)
+            # Single pass: every page goes through the hi_res layout model
+            num_pages = len(PdfReader(file.file).pages)
+            file.file.seek(0)
+            self.stats.update(pages=num_pages, pages_fast=0, pages_hi_res=num_pages)
+            with span("ingest.partition"):
+                return _partition_pdf(file.file, image_dir)
         elif filename.endswith(".docx"):
-            return partition_docx(file=file.file)
+            from unstructured.partition.docx import partition_docx
+            with span("ingest.partition"):
+                return partition_docx(file=file.file)
         else:
             raise ValueError("Unsupported file type. Only PDF and DOCX are supported.")
 
+    def _split_pdf(self, pdf_file):
+        reader = PdfReader(pdf_file)
+        num_pages = len(reader.pages)
+        if self.page_workers and self.page_workers > 1:
+            # A few ranges per worker so one slow range doesn't leave the others idle
+            pages_per_range = self.pages_per_range or max(1, math.ceil(num_pages / (self.page_workers * 4)))
+        else:
+            pages_per_range = self.pages_per_range or num_pages
+
+        if self.strategy == "auto":
+            strategies = [_classify_page(page) for page in reader.pages]
+        else:
+            strategies = ["hi_res"] * num_pages
+
+        self.stats["pages"] = num_pages
+        self.stats["pages_fast"] = strategies.count("fast")
+        self.stats["pages_hi_res"] = strategies.count("hi_res")
+
+        # Runs of consecutive pages sharing a strategy, each capped at pages_per_range
+        start = 0
+        while start < num_pages:
+            end = start + 1
+            while end < num_pages and end - start < pages_per_range and strategies[end] == strategies[start]:
+                end += 1
+            writer = PdfWriter()
+            for page in reader.pages[start:end]:
+                writer.add_page(page)
+            buffer = io.BytesIO()
+            writer.write(buffer)
+            yield start + 1, strategies[start], buffer.getvalue()
+            start = end
+
+    def _partition_pdf_ranges(self, pdf_file, image_dir):
+        # Yields each range's elements as soon as that range is partitioned, so later stages
+        # start on the first pages while the rest are still running. Partitioning is then
+        # interleaved with them; the time spent waiting on it is observed as ingest.partition.
+        started = time.perf_counter()
+        waited = 0.0
+        if not (self.page_workers and self.page_workers > 1):
+            for first_page, strategy, pdf_bytes in self._split_pdf(pdf_file):
+                elements = _partition_pdf_range(pdf_bytes, image_dir, first_page, strategy)
+                waited += time.perf_counter() - started
+                yield from elements
+                started = time.perf_counter()
+            observe("ingest.partition", waited)
+            return
+
+        context = multiprocessing.get_context("spawn")
+        pool = ProcessPoolExecutor(max_workers=self.page_workers, mp_context=context)
+        try:
+            futures = [
+                pool.submit(_partition_pdf_range, pdf_bytes, image_dir, first_page, strategy)
+                for first_page, strategy, pdf_bytes in self._split_pdf(pdf_file)
+            ]
+            # In page order, so process() sees the same element sequence (and image/caption
+            # adjacency) as a single-pass partition
+            for future in futures:
+                elements = future.result()
+                waited += time.perf_counter() - started
+                yield from elements
+                started = time.perf_counter()
+        finally:
+            # Also reached when the consumer stops early: ranges not started yet are dropped
+            pool.shutdown(wait=True, cancel_futures=True)
+        observe("ingest.partition", waited)
+
     def _save_image(self, element):
-        image_base64 = getattr(element.metadata, "image_base64", None)
-        if image_base64:
-            # print(" image base64 found")
-            # return None
-            img_name = f"img_{uuid.uuid4().hex}.png"
-            img_path = self.image_dir / img_name
-            img_path = img_path.as_posix()
-            with open(img_path, "wb") as img_file:
-                img_file.write(base64.b64decode(image_base64))
-            return img_path
-        
+        image_path = getattr(element.metadata, "image_path", None)
+        if image_path and os.path.exists(image_path):
+            return self.images.add(image_path).as_posix()
         return None
-    
-    def _save_table(self, element):
-        table_name = f"table_{uuid.uuid4().hex}.html"
-        table_path = self.table_dir / table_name
-        table_html = getattr(element.metadata, "text_as_html", None)
-        table_path = table_path.as_posix()
-        with open(table_path, "w", encoding="utf-8") as f:
-            if table_html is not None:
-                f.write(table_html)
-            else:
-                f.write(element.text)
-        return table_path
 
     def _finalize_image(self, image_element, caption, context, index):
         image_path = self._save_image(image_element)
@@ -74,14 +212,27 @@ class DocumentExtractor:
             "index": index
         }
 
-    def process(self, file):
-        elements = self._get_elements(file)
-        output = {
-            "text_chunks": [],
-            "tables": [],
-            "images": [],
-            "code_snippets": []
-        }
+    @staticmethod
+    def _timed(item, started):
+        # Per-element extraction time (after partitioning), by item type
+        observe(f"ingest.extract.{item['type']}", time.perf_counter() - started)
+        return item
+
+    def iter_items(self, file):
+        # Yields text/table/image/code items in document (index) order as they are
+        # produced, so downstream stages can consume them without a JSON round trip
+        incoming = self.images.incoming_dir()
+        try:
+            yield from self._iter_elements(self._get_elements(file, incoming.as_posix()))
+        finally:
+            self.images.discard(incoming)
+            self.stats["images_stored"] = self.images.stored
+            self.stats["images_duplicate"] = self.images.duplicates
+
+    def _iter_elements(self, elements):
+        from unstructured.documents.elements import (
+            Table, NarrativeText, Title, ListItem, FigureCaption, Image, CodeSnippet
+        )
 
         last_text_context = ""
         last_caption = None
@@ -89,11 +240,13 @@ class DocumentExtractor:
         index = 0
 
         for el in elements:
+            started = time.perf_counter()
             # Flush any held image before non-caption elements
             if temp_image and not isinstance(el, FigureCaption):
                 flushed = self._finalize_image(temp_image, last_caption, last_text_context, index)
                 if flushed:
-                    output["images"].append(flushed)
+                    yield self._timed(flushed, started)
+                    started = time.perf_counter()
                     index += 1
                 temp_image = None
                 last_caption = None
@@ -101,24 +254,24 @@ class DocumentExtractor:
             if isinstance(el, (NarrativeText, Title, ListItem)):
                 text = el.text.strip()
                 if text:
-                    output["text_chunks"].append({
+                    yield self._timed({
                         "type": "text",
                         "content": text,
                         "index": index
-                    })
+                    }, started)
                     last_text_context = text
                     index += 1
 
             elif isinstance(el, Table):
-                table_path = self._save_table(el)
-                output["tables"].append({
+                # Table content is kept inline (html/text) and ends up in the asset store;
+                # no separate HTML file is written
+                yield self._timed({
                     "type": "table",
                     "context": last_text_context,
-                    "path": table_path.replace("../data/", ""),
                     "html": getattr(el.metadata, "text_as_html", None),
                     "text": el.text,
                     "index": index
-                })
+                }, started)
                 index += 1
 
             elif isinstance(el, Image):
@@ -128,18 +281,23 @@ class DocumentExtractor:
                 last_caption = el.text.strip()
 
             elif isinstance(el, CodeSnippet):
-                output["code_snippets"].append({
+                yield self._timed({
                     "type": "code_snippet",
                     "context": last_text_context,
                     "text": el.text,
                     "index": index
-                })
+                }, started)
                 index += 1
 
         # Flush image at end if any left
         if temp_image:
+            started = time.perf_counter()
             flushed = self._finalize_image(temp_image, last_caption, last_text_context, index)
             if flushed:
-                output["images"].append(flushed)
+                yield self._timed(flushed, started)
 
+    def process(self, file):
+        output = {key: [] for key in OUTPUT_KEYS.values()}
+        for item in self.iter_items(file):
+            output[OUTPUT_KEYS[item["type"]]].append(item)
         return output
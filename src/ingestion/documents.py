@@ -0,0 +1,51 @@
+import json
+import os
+import re
+from pathlib import Path
+
+# Session and document ids become path components, so nothing else is accepted
+_ID = re.compile(r"[A-Za-z0-9_-]{1,128}")
+
+
+def valid_id(value: str):
+    return bool(_ID.fullmatch(value or ""))
+
+
+class SessionDocuments:
+    """Per-session registry of ingested documents.
+
+    One small JSON file per document under data/<session>/documents/, so
+    concurrent ingestion workers never write to the same file.
+    """
+
+    def __init__(self, base_dir, session_id: str):
+        self.doc_dir = Path(base_dir) / session_id / "documents"
+
+    def _path(self, doc_id: str):
+        if not valid_id(doc_id):
+            raise ValueError(f"Invalid document id: {doc_id}")
+        return self.doc_dir / f"{doc_id}.json"
+
+    def save(self, record):
+        self.doc_dir.mkdir(parents=True, exist_ok=True)
+        path = self._path(record["doc_id"])
+        tmp_path = path.with_suffix(".json.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(record, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    def get(self, doc_id: str):
+        path = self._path(doc_id)
+        if not path.exists():
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def list(self):
+        if not self.doc_dir.exists():
+            return []
+        records = []
+        for path in sorted(self.doc_dir.glob("*.json")):
+            with open(path, "r", encoding="utf-8") as f:
+                records.append(json.load(f))
+        return sorted(records, key=lambda record: record["ingested_at"])
@@ -0,0 +1,248 @@
+import multiprocessing
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+from pathlib import Path
+from src.ingestion.documents import valid_id
+from src.observability import tracing
+
+
+class QueueFullError(Exception):
+    pass
+
+
+def _init_worker():
+    # Load the embedding model and extraction stack once per worker process, not once per job
+    from src.embedding.model_registry import CHROMA_SERVER, DEFAULT_DB_PATH, registry
+    from src.extraction import unstructured_extraction
+    registry.local_chroma_writes = False
+    registry.warmup(db_paths=(DEFAULT_DB_PATH,) if CHROMA_SERVER else ())
+    unstructured_extraction.warmup()
+
+
+def _worker_ready():
+    return True
+
+
+def _run_job(job_id, jobs, upload_path, filename, session_id, doc_id, base_dir, pipeline_options):
+    with tracing.trace("ingest", trace_id=jobs[job_id]["trace_id"]) as current:
+        _run_pipeline(job_id, jobs, upload_path, filename, session_id, doc_id, base_dir, pipeline_options,
+                      current)
+    if tracing.TRACING:
+        # Spans were observed in this worker process; hand them to the API process's /metrics
+        record = dict(jobs[job_id])
+        record["stage_histogram"] = tracing.STAGE_SECONDS.drain()
+        jobs[job_id] = record
+
+
+def _run_pipeline(job_id, jobs, upload_path, filename, session_id, doc_id, base_dir, pipeline_options,
+                  current):
+    # Only worker processes need the extraction/chunking/embedding stack
+    from src.ingestion.pipeline import IngestionPipeline, LocalUpload
+
+    def update(**fields):
+        record = dict(jobs[job_id])
+        record.update(fields)
+        record["updated_at"] = time.time()
+        jobs[job_id] = record  # reassign: manager proxies don't see nested mutation
+
+    update(status="running", stage="starting", started_at=time.time())
+    pipeline = IngestionPipeline(
+        session_id=session_id,
+        base_dir=base_dir,
+        on_progress=lambda stage, progress: update(stage=stage, progress=progress),
+        **pipeline_options
+    )
+    try:
+        with LocalUpload(upload_path, filename=filename) as upload:
+            stats = pipeline.run(upload, doc_id=doc_id)
+        update(status="done", stage="done", doc_id=stats["doc_id"], progress=dict(pipeline.progress),
+               timings=stats.pop("timings"), result=stats)
+    except Exception as e:
+        current.fail(e)
+        update(status="error", stage="failed", progress=dict(pipeline.progress),
+               timings={k: round(v, 3) for k, v in pipeline.timings.items()}, error=str(e))
+    finally:
+        Path(upload_path).unlink(missing_ok=True)
+
+
+class IngestionJobQueue:
+    """Runs IngestionPipeline jobs on a bounded process pool.
+
+    Job records live in a multiprocessing manager dict so workers can publish
+    stage, progress and timings while the API process serves status polls.
+    """
+
+    def __init__(self, base_dir="data", max_workers=2, max_pending=16, retention_seconds=3600,
+                 **pipeline_options):
+        # pipeline_options are passed through to IngestionPipeline in the worker
+        self.base_dir = Path(base_dir)
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.retention_seconds = retention_seconds
+        self.pipeline_options = pipeline_options
+
+        self._lock = threading.Lock()
+        self._pending = 0
+        # spawn rather than fork: forking a process that already holds torch threads can deadlock
+        self._context = multiprocessing.get_context("spawn")
+        self._manager = self._context.Manager()
+        self._jobs = self._manager.dict()
+        self._executor = self._new_executor()
+
+    def _new_executor(self):
+        return ProcessPoolExecutor(
+            max_workers=self.max_workers, mp_context=self._context, initializer=_init_worker
+        )
+
+    def _replace_executor(self, broken):
+        # A worker died (e.g. killed for memory on a large hi_res PDF): the pool is unusable
+        # from then on, so later uploads get a fresh one
+        with self._lock:
+            if self._executor is not broken:
+                return
+            self._executor = self._new_executor()
+        broken.shutdown(wait=False)
+
+    def warmup(self):
+        # Starts every worker now (each loads the embedding model in _init_worker) rather
+        # than on the first uploads; returns futures that finish once the workers are up
+        return [self._executor.submit(_worker_ready) for _ in range(self.max_workers)]
+
+    def _acquire(self):
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise QueueFullError("Ingestion queue is full, retry later.")
+            self._pending += 1
+
+    def _release(self):
+        with self._lock:
+            self._pending -= 1
+
+    @contextmanager
+    def reserve(self, count: int):
+        # Takes `count` max_pending slots at once, so a batch is queued whole or not at all.
+        # Each submit(..., reservation=...) uses one of them; unused ones are given back.
+        with self._lock:
+            if self._pending + count > self.max_pending:
+                raise QueueFullError(
+                    f"Ingestion queue has room for {self.max_pending - self._pending} documents, "
+                    f"not {count}; retry later."
+                )
+            self._pending += count
+        reservation = {"slots": count}
+        try:
+            yield reservation
+        finally:
+            with self._lock:
+                self._pending -= reservation["slots"]
+
+    def _job_done(self, job_id, future, executor, upload_path):
+        self._release()
+        # The worker deletes the spooled upload itself, unless it died or never started the job
+        upload_path.unlink(missing_ok=True)
+        if future.cancelled():
+            return  # shutting down
+        error = future.exception()
+        if isinstance(error, BrokenProcessPool):
+            self._replace_executor(executor)
+        record = self._jobs.get(job_id)
+        if record is None:
+            return
+        record = dict(record)
+        if error is not None and record["status"] in ("queued", "running"):
+            # The worker never got to record an outcome
+            record.update(status="error", stage="failed", error=f"Ingestion worker failed: {error!r}",
+                          updated_at=time.time())
+        if "stage_histogram" in record:
+            tracing.STAGE_SECONDS.merge(record.pop("stage_histogram"))
+        self._jobs[job_id] = record
+
+    def _prune(self):
+        cutoff = time.time() - self.retention_seconds
+        for job_id, record in list(self._jobs.items()):
+            if record["status"] in ("done", "error") and record["updated_at"] < cutoff:
+                self._jobs.pop(job_id, None)
+
+    def submit(self, file, session_id: str, doc_id: str = None, trace_id: str = None, reservation=None):
+        # `file` only needs .filename and a readable binary .file; the job runs
+        # under `trace_id` (defaults to the job id), in a slot of `reservation` if given
+        if not valid_id(session_id):
+            raise ValueError(f"Invalid session id: {session_id}")
+        if doc_id is not None and not valid_id(doc_id):
+            raise ValueError(f"Invalid document id: {doc_id}")
+        if reservation is None:
+            self._acquire()
+        else:
+            with self._lock:
+                if not reservation["slots"]:
+                    raise QueueFullError("No reserved ingestion slot left.")
+                reservation["slots"] -= 1
+
+        upload_path = None
+        try:
+            self._prune()
+            job_id = uuid.uuid4().hex
+            # UploadFile can't cross process boundaries, so spool it to disk first
+            upload_dir = self.base_dir / session_id / "uploads"
+            upload_dir.mkdir(parents=True, exist_ok=True)
+            upload_path = upload_dir / f"{job_id}_{Path(file.filename).name}"
+            with open(upload_path, "wb") as f:
+                while block := file.file.read(1024 * 1024):
+                    f.write(block)
+
+            now = time.time()
+            self._jobs[job_id] = {
+                "job_id": job_id,
+                "session_id": session_id,
+                "filename": file.filename,
+                "doc_id": doc_id,
+                "trace_id": trace_id or job_id,
+                "status": "queued",
+                "stage": "queued",
+                "progress": {"items": 0, "chunks": 0, "embedded": 0},
+                "timings": {},
+                "created_at": now,
+                "updated_at": now
+            }
+            executor = self._executor
+            future = executor.submit(
+                _run_job, job_id, self._jobs, upload_path.as_posix(), file.filename, session_id,
+                doc_id, self.base_dir.as_posix(), self.pipeline_options
+            )
+        except BrokenProcessPool:
+            self._release()
+            upload_path.unlink(missing_ok=True)
+            self._replace_executor(executor)
+            raise
+        except Exception:
+            self._release()
+            if upload_path is not None:
+                upload_path.unlink(missing_ok=True)
+            raise
+        future.add_done_callback(lambda done: self._job_done(job_id, done, executor, upload_path))
+        return job_id
+
+    def get(self, job_id: str):
+        record = self._jobs.get(job_id)
+        if record is None:
+            return None
+        record = dict(record)
+        record.pop("stage_histogram", None)
+        if record["status"] == "queued":
+            record["queued_seconds"] = round(time.time() - record["created_at"], 3)
+        return record
+
+    def active_sessions(self):
+        # Sessions with a queued or running job, which must not be evicted meanwhile
+        return {
+            record["session_id"] for record in list(self._jobs.values())
+            if record["status"] in ("queued", "running")
+        }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self._manager.shutdown()
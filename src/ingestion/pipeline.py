@@ -0,0 +1,275 @@
+import json
+import time
+from pathlib import Path
+from src.extraction.unstructured_extraction import DocumentExtractor, OUTPUT_KEYS
+from src.chunking.chunker import StructuredChunker
+from src.embedding.chroma_embedder import ChromaEmbedder
+from src.embedding.embedding_cache import EmbeddingCache
+from src.ingestion.upload_cache import UploadCache
+from src.ingestion.documents import SessionDocuments
+from src.observability.tracing import observe
+
+
+class IngestionPipeline:
+    """Extraction -> chunking -> embedding as one chain of generators.
+
+    Items and chunks are handed along in memory as they are produced; the
+    extracted.json / chunked.json files are only written when save_artifacts
+    is set. With use_cache, uploads are deduplicated by content through
+    UploadCache.
+    """
+
+    def __init__(self, session_id: str, base_dir="data", save_artifacts=False,
+                 max_words=300, batch_size=64, page_workers=0, strategy="hi_res",
+                 use_cache=True, embedding_cache_size=200_000, on_progress=None):
+        self.session_id = session_id
+        self.base_dir = Path(base_dir)
+        self.session_dir = self.base_dir / session_id
+        self.save_artifacts = save_artifacts
+        self.max_words = max_words
+        self.batch_size = batch_size
+        self.page_workers = page_workers
+        self.strategy = strategy
+        self.cache = UploadCache(self.base_dir) if use_cache else None
+        self.documents = SessionDocuments(self.base_dir, session_id)
+        self.doc_id = None
+        self.filename = None
+        # Chunk-level embedding cache shared by all sessions (0 disables it)
+        self.embedding_cache_size = embedding_cache_size
+        # on_progress(stage, progress) is called on every stage change / batch
+        self.on_progress = on_progress
+        self.progress = {"items": 0, "chunks": 0, "embedded": 0}
+        self.timings = {}
+
+    def _report(self, stage):
+        if self.on_progress:
+            self.on_progress(stage, dict(self.progress))
+
+    def _timed(self, iterable, key):
+        # Accumulates the time spent producing values of `iterable` under timings[key]
+        iterator = iter(iterable)
+        self.timings[key] = 0.0
+        while True:
+            start = time.perf_counter()
+            try:
+                value = next(iterator)
+            except StopIteration:
+                self.timings[key] += time.perf_counter() - start
+                return
+            self.timings[key] += time.perf_counter() - start
+            yield value
+
+    def _write_json(self, name, data):
+        path = self.session_dir / name
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+        return path
+
+    def _on_batch(self, stored):
+        self.progress["embedded"] = stored
+        self._report("embedding")
+
+    def run(self, file, doc_id=None):
+        # A session can hold many documents; `doc_id` defaults to a prefix of the
+        # content hash so re-uploading the same file is idempotent. Uploading a new
+        # version under an existing doc_id re-indexes it incrementally.
+        self.session_dir.mkdir(parents=True, exist_ok=True)
+        start = time.perf_counter()
+
+        digest = UploadCache.digest(file.file)
+        self.doc_id = doc_id or digest[:12]
+        self.filename = file.filename
+
+        if self.cache is not None:
+            cached = self.cache.load(digest)
+            if cached is not None:
+                stats = self._run_cached(cached, digest, start)
+                self.documents.save(self._document_record(digest, stats))
+                return stats
+        stats = self._run_fresh(file, digest, start)
+        self.documents.save(self._document_record(digest, stats))
+        return stats
+
+    def _document_record(self, digest, stats):
+        previous = self.documents.get(self.doc_id)
+        return {
+            "doc_id": self.doc_id,
+            "filename": self.filename,
+            "digest": digest,
+            "revision": previous["revision"] + 1 if previous else 1,
+            "chunks": stats["chunks"],
+            "images": stats["images"],
+            "tables": stats["tables"],
+            "code_snippets": stats["code_snippets"],
+            "ingested_at": time.time()
+        }
+
+    def _embed_incremental(self, embedder, chunks, **kwargs):
+        # Chunk ids are content hashes, so diffing id sets against what the collection
+        # already holds for this document gives the added/removed/unchanged chunks
+        existing = embedder.existing_ids()
+        embed_stats = embedder.embed_and_store(
+            chunks, skip_ids=existing, on_batch=self._on_batch, **kwargs
+        )
+        if embedder.keep_embeddings:
+            embedder.fill_kept_embeddings()
+        removed = existing - embedder.seen_ids
+        embedder.delete_ids(removed)
+        return {
+            "chunks": embed_stats["chunks"] + embed_stats["skipped"],
+            "added": embed_stats["chunks"],
+            "unchanged": embed_stats["skipped"],
+            "removed": len(removed),
+            "chunks_per_sec": embed_stats["chunks_per_sec"],
+            "cache_hits": embed_stats["cache_hits"],
+            "cache_misses": embed_stats["cache_misses"]
+        }
+
+    def _embedder(self, **kwargs):
+        return ChromaEmbedder(
+            collection_name=self.session_id, batch_size=self.batch_size,
+            doc_id=self.doc_id, source=self.filename, **kwargs
+        )
+
+    def _run_cached(self, cached, digest, start):
+        # Same bytes were ingested before: reuse chunks, vectors and assets as-is
+        manifest = cached["manifest"]
+        embedder = self._embedder()
+        self.progress["items"] = manifest["items"]
+        self.progress["chunks"] = len(cached["chunks"])
+        self._report("embedding")
+        embed_stats = self._embed_incremental(
+            embedder, cached["chunks"], embeddings=cached["embeddings"]
+        )
+        self.timings["embed"] = time.perf_counter() - start
+
+        if self.save_artifacts:
+            self._write_json("chunked.json", cached["chunks"])
+
+        return {
+            "chunks": embed_stats["chunks"],
+            "added": embed_stats["added"],
+            "unchanged": embed_stats["unchanged"],
+            "removed": embed_stats["removed"],
+            "images": manifest["images"],
+            "tables": manifest["tables"],
+            "code_snippets": manifest["code_snippets"],
+            "chunks_per_sec": embed_stats["chunks_per_sec"],
+            "extraction": manifest["extraction"],
+            "doc_id": self.doc_id,
+            "digest": digest,
+            "cached": True,
+            "seconds": round(time.perf_counter() - start, 3),
+            "timings": {stage: round(seconds, 3) for stage, seconds in self.timings.items()}
+        }
+
+    def _run_fresh(self, file, digest, start):
+        # Cacheable uploads extract their assets into the shared cache entry
+        # rather than the session directory
+        if self.cache is not None:
+            extractor_dirs = {"session_id": digest, "base_dir": self.cache.root}
+        else:
+            extractor_dirs = {"session_id": self.session_id, "base_dir": self.base_dir}
+        extractor = DocumentExtractor(
+            **extractor_dirs, page_workers=self.page_workers, strategy=self.strategy
+        )
+        chunker = StructuredChunker(max_words=self.max_words)
+        embedding_cache = None
+        if self.embedding_cache_size:
+            embedding_cache = EmbeddingCache(
+                self.base_dir / "embedding_cache.sqlite", max_entries=self.embedding_cache_size
+            )
+        embedder = self._embedder(
+            keep_embeddings=self.cache is not None, embedding_cache=embedding_cache
+        )
+
+        counts = {item_type: 0 for item_type in OUTPUT_KEYS}
+        extracted = {key: [] for key in OUTPUT_KEYS.values()} if self.save_artifacts else None
+        chunks = [] if self.save_artifacts else None
+
+        def items():
+            for item in self._timed(extractor.iter_items(file), "extract"):
+                counts[item["type"]] += 1
+                self.progress["items"] += 1
+                if extracted is not None:
+                    extracted[OUTPUT_KEYS[item["type"]]].append(item)
+                yield item
+
+        def chunk_stream():
+            for chunk in self._timed(chunker.iter_chunks(items()), "chunk"):
+                self.progress["chunks"] += 1
+                if chunks is not None:
+                    chunks.append(chunk)
+                yield chunk
+
+        self._report("extracting")
+        try:
+            embed_stats = self._embed_incremental(embedder, chunk_stream())
+        finally:
+            if embedding_cache is not None:
+                embedding_cache.close()
+        total = time.perf_counter() - start
+
+        # Stages are interleaved, so make each timing exclusive of the stage feeding it
+        self.timings["embed"] = total - self.timings["chunk"]
+        self.timings["chunk"] -= self.timings["extract"]
+        # Chunking is interleaved with extraction, so it is only measurable per document
+        observe("ingest.chunk", self.timings["chunk"])
+
+        stats = {
+            "chunks": embed_stats["chunks"],
+            "added": embed_stats["added"],
+            "unchanged": embed_stats["unchanged"],
+            "removed": embed_stats["removed"],
+            "images": counts["image"],
+            "tables": counts["table"],
+            "code_snippets": counts["code_snippet"],
+            "chunks_per_sec": embed_stats["chunks_per_sec"],
+            "extraction": dict(extractor.stats),
+            "embedding_cache": {
+                "hits": embed_stats["cache_hits"],
+                "misses": embed_stats["cache_misses"]
+            },
+            "doc_id": self.doc_id,
+            "digest": digest,
+            "cached": False
+        }
+
+        if self.cache is not None:
+            self.cache.store(digest, embedder.embedded_chunks, embedder.embeddings, {
+                "items": self.progress["items"],
+                "images": stats["images"],
+                "tables": stats["tables"],
+                "code_snippets": stats["code_snippets"],
+                "extraction": stats["extraction"]
+            })
+
+        # Optional side output, written once the stream has been fully consumed
+        if self.save_artifacts:
+            self._report("saving_artifacts")
+            artifacts_start = time.perf_counter()
+            self._write_json("extracted.json", extracted)
+            self._write_json("chunked.json", chunks)
+            self.timings["artifacts"] = time.perf_counter() - artifacts_start
+
+        stats["seconds"] = round(time.perf_counter() - start, 3)
+        stats["timings"] = {stage: round(seconds, 3) for stage, seconds in self.timings.items()}
+        return stats
+
+
+class LocalUpload:
+    """Minimal stand-in for FastAPI's UploadFile around a file on disk."""
+
+    def __init__(self, path, content_type=None, filename=None):
+        self.path = Path(path)
+        self.filename = filename or self.path.name
+        self.content_type = content_type
+        self.file = None
+
+    def __enter__(self):
+        self.file = open(self.path, "rb")
+        return self
+
+    def __exit__(self, *exc):
+        self.file.close()
+        self.file = None
@@ -0,0 +1,291 @@
+import logging
+import os
+import shutil
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from src.embedding.model_registry import DEFAULT_DB_PATH, registry
+from src.embedding.vector_store import (
+    open_vector_store, drop_vector_store, AutoVectorStore, ChromaVectorStore, NumpyVectorStore,
+    DEFAULT_VECTOR_BACKEND
+)
+from src.ingestion.documents import SessionDocuments, valid_id
+
+# Sessions idle for longer than this many seconds are deleted (0 keeps them forever)
+SESSION_TTL = float(os.getenv("SESSION_TTL", str(7 * 24 * 3600)))
+# Disk budget for all session data; least recently used sessions go first beyond it (0 = no quota)
+SESSION_DISK_QUOTA_MB = float(os.getenv("SESSION_DISK_QUOTA_MB", "0"))
+# Session vector stores kept open in this process
+MAX_LOADED_SESSIONS = int(os.getenv("MAX_LOADED_SESSIONS", "64"))
+SESSION_SWEEP_INTERVAL = float(os.getenv("SESSION_SWEEP_INTERVAL", "300"))
+
+ACCESS_FILE = ".last_access"
+# The access mark on disk is refreshed at most this often per session
+_TOUCH_RESOLUTION = 30
+# Quota eviction never takes a session used more recently than this
+_QUOTA_MIN_IDLE = 300
+
+logger = logging.getLogger(__name__)
+
+
+def _disk_usage(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.lstat(os.path.join(root, name)).st_size
+            except OSError:
+                pass
+    return total
+
+
+class SessionManager:
+    """Tracks when sessions were last used and evicts idle ones.
+
+    Last access is the mtime of data/<session>/.last_access, so every API
+    worker sees the same value. A background thread deletes sessions idle
+    for longer than `ttl`, then, while session data plus the upload cache
+    and asset store exceed `disk_quota_mb`, the least recently used ones;
+    sessions with ingestion jobs in flight (`busy()`) are skipped. Eviction
+    removes the session directory (uploads, images, document records), its
+    vectors and the asset store rows only it referenced. Upload cache entries
+    no remaining session refers to are dropped once older than `ttl`, and
+    before any session when over the quota.
+
+    Vector stores opened for queries are kept in an LRU of `max_loaded`
+    sessions; Chroma's own index memory is bounded by CHROMA_MEMORY_LIMIT_MB.
+    """
+
+    def __init__(self, base_dir="data", db_path=DEFAULT_DB_PATH, backend=DEFAULT_VECTOR_BACKEND,
+                 ttl=SESSION_TTL, disk_quota_mb=SESSION_DISK_QUOTA_MB, max_loaded=MAX_LOADED_SESSIONS,
+                 sweep_interval=SESSION_SWEEP_INTERVAL, busy=None):
+        self.base_dir = Path(base_dir)
+        self.db_path = db_path
+        self.backend = backend
+        self.ttl = ttl
+        self.disk_quota = disk_quota_mb * 1024 * 1024
+        self.max_loaded = max(1, max_loaded)
+        self.sweep_interval = sweep_interval
+        # busy() -> session ids that must not be evicted right now
+        self.busy = busy
+
+        self._lock = threading.Lock()
+        self._loaded = OrderedDict()
+        self._touched = {}
+        self._stop = threading.Event()
+        self._thread = None
+        self.evicted = {"ttl": 0, "quota": 0, "admin": 0}
+        self.unloaded = 0
+        self.upload_cache_evicted = 0
+        self.last_sweep = None
+
+    @staticmethod
+    def valid_id(session_id: str):
+        return valid_id(session_id)
+
+    def start(self):
+        if self.sweep_interval > 0 and (self.ttl or self.disk_quota):
+            self._thread = threading.Thread(target=self._run, name="session-sweeper", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.wait(self.sweep_interval):
+            try:
+                self.sweep()
+            except Exception:
+                logger.exception("session sweep failed")
+
+    def touch(self, session_id: str, create=False):
+        # Cheap enough to call on every request: the file is only touched every few seconds
+        now = time.time()
+        last = self._touched.get(session_id)
+        if last is not None and now - last < _TOUCH_RESOLUTION:
+            return
+        if not self.valid_id(session_id):
+            return
+        session_dir = self.base_dir / session_id
+        if create:
+            session_dir.mkdir(parents=True, exist_ok=True)
+        if session_dir.is_dir():
+            (session_dir / ACCESS_FILE).touch()
+            self._touched[session_id] = now
+
+    def last_access(self, session_id: str):
+        session_dir = self.base_dir / session_id
+        for path in (session_dir / ACCESS_FILE, session_dir):
+            try:
+                return path.stat().st_mtime
+            except OSError:
+                continue
+        return None
+
+    def session_ids(self):
+        if not self.base_dir.is_dir():
+            return []
+        # "_uploads" and other "_"-prefixed directories are shared caches, not sessions
+        return sorted(
+            path.name for path in self.base_dir.iterdir()
+            if path.is_dir() and not path.name.startswith("_") and self.valid_id(path.name)
+        )
+
+    def disk_bytes(self, session_id: str):
+        paths = [self.base_dir / session_id, Path(self.db_path) / "numpy" / session_id]
+        paths += ChromaVectorStore.segment_dirs(self.db_path, session_id)
+        return sum(_disk_usage(path) for path in paths)
+
+    def store(self, session_id: str):
+        # The session's vector store, reused across requests while it stays in the LRU
+        with self._lock:
+            store = self._loaded.get(session_id)
+            if store is not None:
+                self._loaded.move_to_end(session_id)
+                return store
+        store = open_vector_store(session_id, self.db_path, self.backend)
+        with self._lock:
+            store = self._loaded.setdefault(session_id, store)
+            self._loaded.move_to_end(session_id)
+            while len(self._loaded) > self.max_loaded:
+                self._loaded.popitem(last=False)
+                self.unloaded += 1
+        return store
+
+    def info(self, session_id: str, now=None):
+        now = now or time.time()
+        last = self.last_access(session_id)
+        with self._lock:
+            store = self._loaded.get(session_id)
+        backend_name, vectors, index_bytes = None, None, None
+        if NumpyVectorStore.exists(self.db_path, session_id):
+            numpy_store = NumpyVectorStore(self.db_path, session_id)
+            backend_name, vectors, index_bytes = "numpy", numpy_store.count(), numpy_store.nbytes()
+        elif store is not None:
+            # Only counted when already loaded: opening a Chroma collection just to list it would load it
+            vectors = store.count()
+            backend = store.backend if isinstance(store, AutoVectorStore) else store
+            backend_name = "numpy" if isinstance(backend, NumpyVectorStore) else "chroma"
+        elif NumpyVectorStore.migrated(self.db_path, session_id):
+            backend_name = "chroma"
+        return {
+            "session_id": session_id,
+            "last_access": last,
+            "idle_seconds": round(now - last, 1) if last else None,
+            "documents": len(SessionDocuments(self.base_dir, session_id).list()),
+            "disk_bytes": self.disk_bytes(session_id),
+            "backend": backend_name,
+            "vectors": vectors,
+            # Bytes of vectors/codes a query maps; Chroma keeps its index in its own memory
+            "index_bytes": index_bytes,
+            "loaded": store is not None
+        }
+
+    def list(self):
+        now = time.time()
+        sessions = [self.info(session_id, now) for session_id in self.session_ids()]
+        with self._lock:
+            loaded = len(self._loaded)
+        return {
+            "sessions": sorted(sessions, key=lambda info: info["last_access"] or 0, reverse=True),
+            "totals": {
+                "sessions": len(sessions),
+                "disk_bytes": sum(info["disk_bytes"] for info in sessions),
+                "upload_cache_bytes": _disk_usage(self.base_dir / "_uploads"),
+                "asset_store_bytes": registry.get_asset_store(self.db_path).disk_bytes(),
+                "loaded": loaded
+            },
+            "limits": {
+                "ttl_seconds": self.ttl,
+                "disk_quota_bytes": self.disk_quota,
+                "max_loaded": self.max_loaded
+            },
+            "evicted": dict(self.evicted),
+            "unloaded": self.unloaded,
+            "upload_cache_evicted": self.upload_cache_evicted,
+            "last_sweep": self.last_sweep
+        }
+
+    def evict(self, session_id: str, reason="admin"):
+        if not self.valid_id(session_id):
+            raise ValueError(f"Invalid session id: {session_id}")
+        with self._lock:
+            self._loaded.pop(session_id, None)
+            self._touched.pop(session_id, None)
+        shutil.rmtree(self.base_dir / session_id, ignore_errors=True)
+        drop_vector_store(session_id, self.db_path)
+        registry.get_asset_store(self.db_path).release(session_id)
+        self.evicted[reason] += 1
+        logger.info("evicted session %s (%s)", session_id, reason)
+
+    def sweep(self):
+        now = time.time()
+        busy = set(self.busy()) if self.busy else set()
+        sessions = sorted(
+            (self.last_access(session_id) or 0, session_id) for session_id in self.session_ids()
+        )
+        evicted = []
+
+        if self.ttl:
+            for last, session_id in sessions:
+                if session_id not in busy and now - last > self.ttl:
+                    self.evict(session_id, "ttl")
+                    evicted.append(session_id)
+            sessions = [(last, session_id) for last, session_id in sessions if session_id not in evicted]
+
+        if self.disk_quota:
+            # The upload cache and the shared asset store count against the quota too; cache
+            # entries no session refers to go before any session does
+            assets = registry.get_asset_store(self.db_path)
+            asset_bytes = assets.disk_bytes()
+            usage = {session_id: self.disk_bytes(session_id) for _, session_id in sessions}
+            total = sum(usage.values()) + _disk_usage(self.base_dir / "_uploads") + asset_bytes
+            total -= self._sweep_upload_cache(now, total - self.disk_quota)
+            for last, session_id in sessions:  # least recently used first
+                if total <= self.disk_quota:
+                    break
+                if session_id in busy or now - last < _QUOTA_MIN_IDLE:
+                    continue
+                self.evict(session_id, "quota")
+                evicted.append(session_id)
+                total -= usage[session_id]
+                # Its asset rows no other session references were deleted with it
+                total -= asset_bytes - assets.disk_bytes()
+                asset_bytes = assets.disk_bytes()
+                total -= self._sweep_upload_cache(now, total - self.disk_quota)
+        else:
+            self._sweep_upload_cache(now)
+        self.last_sweep = now
+        return evicted
+
+    def _sweep_upload_cache(self, now, excess=0):
+        # Entries are shared between sessions (images are read from them), so only ones no
+        # remaining session refers to can go: those idle past the TTL, then the least recently
+        # written until `excess` bytes are freed. Returns the bytes freed.
+        root = self.base_dir / "_uploads"
+        if not root.is_dir():
+            return 0
+        live = {
+            record.get("digest") for session_id in self.session_ids()
+            for record in SessionDocuments(self.base_dir, session_id).list()
+        }
+        entries = []
+        for entry in root.iterdir():
+            if not entry.is_dir() or entry.name in live:
+                continue
+            try:
+                entries.append((entry.stat().st_mtime, entry))
+            except OSError:
+                continue
+        freed = 0
+        for mtime, entry in sorted(entries):
+            idle = now - mtime
+            # A fresh entry may belong to an upload whose job hasn't recorded its document yet
+            if not (self.ttl and idle > self.ttl) and (freed >= excess or idle < _QUOTA_MIN_IDLE):
+                continue
+            size = _disk_usage(entry)
+            shutil.rmtree(entry, ignore_errors=True)
+            freed += size
+            self.upload_cache_evicted += 1
+        return freed
@@ -0,0 +1,72 @@
+import json
+import hashlib
+import os
+import uuid
+from pathlib import Path
+import numpy as np
+
+
+class UploadCache:
+    """Extraction results keyed by upload sha256, shared by every session that uploads the same bytes.
+
+    Each entry lives in <base_dir>/_uploads/<digest>/ and holds the images
+    written during extraction, the chunks, their embeddings and a manifest.
+    """
+
+    def __init__(self, base_dir="data"):
+        self.root = Path(base_dir) / "_uploads"
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def digest(fileobj, block_size=1024 * 1024):
+        # Hashes a binary file object and rewinds it for the extractor
+        sha = hashlib.sha256()
+        while block := fileobj.read(block_size):
+            sha.update(block)
+        fileobj.seek(0)
+        return sha.hexdigest()
+
+    def entry_dir(self, digest: str):
+        return self.root / digest
+
+    def load(self, digest: str):
+        entry = self.entry_dir(digest)
+        manifest_path = entry / "manifest.json"
+        # The manifest is written last, so its presence marks a complete entry
+        if not manifest_path.exists():
+            return None
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        # Marks the entry as recently used for SessionManager's upload cache sweep
+        os.utime(entry)
+        with open(entry / "chunks.json", "r", encoding="utf-8") as f:
+            chunks = json.load(f)
+        embeddings = np.load(entry / "embeddings.npy", mmap_mode="r")
+        return {"manifest": manifest, "chunks": chunks, "embeddings": embeddings}
+
+    @staticmethod
+    def _replace(path, write):
+        # Written beside the target and renamed over it: a concurrent load() (which maps
+        # embeddings.npy) or a second worker storing the same upload never sees a partial file
+        tmp_path = path.with_name(f".{uuid.uuid4().hex}{path.suffix}")
+        try:
+            write(tmp_path)
+            os.replace(tmp_path, path)
+        finally:
+            tmp_path.unlink(missing_ok=True)
+
+    @staticmethod
+    def _write_json(data):
+        def write(path):
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False)
+        return write
+
+    def store(self, digest: str, chunks, embeddings, manifest):
+        entry = self.entry_dir(digest)
+        entry.mkdir(parents=True, exist_ok=True)
+        self._replace(entry / "chunks.json", self._write_json(chunks))
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        self._replace(entry / "embeddings.npy", lambda path: np.save(path, embeddings))
+        # Last, so its presence marks a complete entry
+        self._replace(entry / "manifest.json", self._write_json(manifest))
@@ -0,0 +1,216 @@
+"""Per-stage timing spans with a request-scoped trace id.
+
+    with tracing.trace("query") as current:   # current.trace_id
+        with tracing.span("query.embed"):
+            ...
+
+Every span is an observation of the ragpedia_stage_seconds{stage=...}
+histogram rendered by prometheus_text() (served on /metrics). With
+TRACE_LOG=1 each finished trace is also logged as one JSON line with its
+per-stage counts and seconds. TRACING=0 makes span() and observe() no-ops.
+"""
+import bisect
+import contextvars
+import json
+import logging
+import math
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+TRACING = os.getenv("TRACING", "1") == "1"
+TRACE_LOG = os.getenv("TRACE_LOG", "0") == "1"
+# Histogram bucket upper bounds in seconds (+Inf is implicit)
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+logger = logging.getLogger("ragpedia.trace")
+if TRACE_LOG and not logger.handlers:
+    # Uvicorn only configures its own loggers, and ingestion workers configure none
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+_current = contextvars.ContextVar("ragpedia_trace", default=None)
+
+
+class Histogram:
+    """Thread-safe Prometheus histogram with one label (`stage`)."""
+
+    def __init__(self, name, help_text, buckets=BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(buckets)
+        # stage -> per-bucket counts (last one is +Inf, not cumulative) followed by the sum
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def _get(self, stage):
+        series = self._series.get(stage)
+        if series is None:
+            series = self._series[stage] = [0] * (len(self.buckets) + 1) + [0.0]
+        return series
+
+    def observe(self, stage, seconds):
+        index = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            series = self._get(stage)
+            series[index] += 1
+            series[-1] += seconds
+
+    def drain(self):
+        # Returns and resets all series, e.g. to ship a worker process's observations
+        with self._lock:
+            series, self._series = self._series, {}
+        return series
+
+    def merge(self, series_by_stage):
+        with self._lock:
+            for stage, other in series_by_stage.items():
+                series = self._get(stage)
+                for i, value in enumerate(other):
+                    series[i] += value
+
+    def render(self):
+        with self._lock:
+            items = sorted((stage, list(series)) for stage, series in self._series.items())
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for stage, series in items:
+            label = stage.replace("\\", "\\\\").replace('"', '\\"')
+            count = 0
+            for bound, observed in zip(self.buckets + (math.inf,), series):
+                count += observed
+                le = "+Inf" if bound == math.inf else repr(float(bound))
+                lines.append(f'{self.name}_bucket{{stage="{label}",le="{le}"}} {count}')
+            lines.append(f'{self.name}_sum{{stage="{label}"}} {series[-1]}')
+            lines.append(f'{self.name}_count{{stage="{label}"}} {count}')
+        return "\n".join(lines) + "\n"
+
+
+STAGE_SECONDS = Histogram("ragpedia_stage_seconds", "Time spent in each pipeline stage.")
+
+
+class Trace:
+    def __init__(self, name, trace_id=None):
+        self.name = name
+        self.trace_id = trace_id or uuid.uuid4().hex[:16]
+        self.started = time.perf_counter()
+        self.stages = {}  # stage -> [count, seconds]
+        self.error = None
+
+    def add(self, stage, seconds):
+        entry = self.stages.setdefault(stage, [0, 0.0])
+        entry[0] += 1
+        entry[1] += seconds
+
+    def fail(self, error):
+        # Errors are logged with the trace id so a failed response can be matched to its spans
+        self.error = f"{type(error).__name__}: {error}"
+        logger.error("trace %s (%s) failed: %s", self.trace_id, self.name, self.error, exc_info=error)
+
+    def summary(self):
+        return {
+            "trace_id": self.trace_id,
+            "name": self.name,
+            "seconds": round(time.perf_counter() - self.started, 6),
+            "stages": {stage: {"count": count, "seconds": round(seconds, 6)}
+                       for stage, (count, seconds) in self.stages.items()},
+            "error": self.error
+        }
+
+
+class _Span:
+    __slots__ = ("stage", "start")
+
+    def __init__(self, stage):
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        observe(self.stage, time.perf_counter() - self.start)
+        return False
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+def span(stage):
+    return _Span(stage) if TRACING else _NOOP_SPAN
+
+
+def observe(stage, seconds):
+    # For durations measured elsewhere (time to first token, interleaved generator stages)
+    if not TRACING:
+        return
+    STAGE_SECONDS.observe(stage, seconds)
+    current = _current.get()
+    if current is not None:
+        current.add(stage, seconds)
+
+
+def current_trace_id():
+    current = _current.get()
+    return current.trace_id if current is not None else None
+
+
+@contextmanager
+def trace(name, trace_id=None):
+    # The trace id is assigned even with TRACING=0 so error responses can always carry it
+    current = Trace(name, trace_id)
+    token = _current.set(current)
+    try:
+        yield current
+    finally:
+        try:
+            _current.reset(token)
+        except ValueError:
+            pass  # closed from another context, e.g. an abandoned async generator
+        if TRACING:
+            seconds = time.perf_counter() - current.started
+            STAGE_SECONDS.observe(f"{name}.total", seconds)
+            current.add(f"{name}.total", seconds)
+            if TRACE_LOG:
+                logger.info(json.dumps(current.summary()))
+
+
+def prometheus_text():
+    return STAGE_SECONDS.render()
+
+
+def process_stats():
+    # Resident / peak memory of this process and seconds since it started (None where the
+    # platform doesn't expose them; /proc is Linux-only)
+    stats = {"rss_mb": None, "peak_rss_mb": None, "uptime_seconds": None}
+    try:
+        with open("/proc/self/statm") as f:
+            stats["rss_mb"] = int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+        with open("/proc/self/stat") as f:
+            start_ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime") as f:
+            stats["uptime_seconds"] = float(f.read().split()[0]) - start_ticks / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # kilobytes on Linux, bytes on macOS
+        stats["peak_rss_mb"] = peak / (2 ** 20 if os.uname().sysname == "Darwin" else 1024)
+    except (ImportError, AttributeError):
+        pass
+    return stats
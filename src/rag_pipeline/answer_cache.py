@@ -0,0 +1,130 @@
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+
+
+class SingleFlight:
+    """Collapses concurrent calls with the same key into one execution.
+
+    Every caller awaits the same task; the task is shielded so one caller
+    disconnecting doesn't cancel the work the others are waiting for.
+    """
+
+    def __init__(self):
+        self._inflight = {}
+        self.executed = 0
+        self.coalesced = 0
+
+    def join(self, key):
+        # The task in flight under `key`, or None
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        return task
+
+    def start(self, key, fn):
+        # Runs fn() as the flight for `key`; callers that need the leader's side effects
+        # (e.g. streamed tokens) use this after join() returned None
+        task = asyncio.ensure_future(fn())
+        self._inflight[key] = task
+        task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        self.executed += 1
+        return task
+
+    async def do(self, key, fn):
+        task = self.join(key) or self.start(key, fn)
+        return await asyncio.shield(task)
+
+    def snapshot(self):
+        return {
+            "executed": self.executed,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._inflight)
+        }
+
+
+class AnswerCache:
+    """LLM answers keyed by session and the set of retrieved chunk ids.
+
+    Within one key, a stored answer is reused when the new query embedding's
+    cosine similarity to the stored one is at least `similarity`. Entries
+    expire after `ttl` seconds; beyond `max_entries` the least recently used
+    go first.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 600.0, similarity: float = 0.95):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.similarity = similarity
+        self._entries = OrderedDict()  # (session_id, chunk ids) -> [(vector, answer, expires_at)]
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @staticmethod
+    def _key(session_id, chunk_ids):
+        return session_id, frozenset(chunk_ids)
+
+    @staticmethod
+    def _normalize(vector):
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _drop_expired(self, key, now):
+        entries = self._entries.get(key, [])
+        live = [entry for entry in entries if entry[2] > now]
+        expired = len(entries) - len(live)
+        if expired:
+            self.expirations += expired
+            self._size -= expired
+            if live:
+                self._entries[key] = live
+            else:
+                del self._entries[key]
+        return live
+
+    def get(self, session_id: str, chunk_ids, query_vector):
+        if not self.max_entries:
+            return None
+        key = self._key(session_id, chunk_ids)
+        vector = self._normalize(query_vector)
+        with self._lock:
+            for stored_vector, answer, _ in self._drop_expired(key, time.time()):
+                if float(stored_vector @ vector) >= self.similarity:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return answer
+            self.misses += 1
+        return None
+
+    def put(self, session_id: str, chunk_ids, query_vector, answer):
+        if not self.max_entries:
+            return
+        key = self._key(session_id, chunk_ids)
+        with self._lock:
+            entries = self._drop_expired(key, time.time())
+            entries.append((self._normalize(query_vector), answer, time.time() + self.ttl))
+            self._entries[key] = entries
+            self._entries.move_to_end(key)
+            self._size += 1
+            # Evict whole least-recently-used keys until back under the bound
+            while self._size > self.max_entries and self._entries:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+                self.evictions += len(evicted)
+
+    def snapshot(self):
+        return {
+            "entries": self._size,
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations
+        }
@@ -1,33 +1,143 @@
 import json
+import hashlib
+import os
+from src.rag_pipeline.tokenizer import Tokenizer
+from src.embedding.model_registry import registry, DEFAULT_DB_PATH
+from src.embedding.asset_store import AssetStore, ASSET_KEYS, asset_payload, asset_id, has_content, prompt_text
+from src.observability.tracing import span
+
+DEFAULT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "3000"))
+
+
+def _load_list(value):
+    # Older chunk metadata stores asset lists as JSON strings
+    if isinstance(value, list):
+        return value
+    try:
+        return json.loads(value or "[]")
+    except Exception as e:
+        print(f"Error parsing chunk metadata: {e}")
+        return []
+
+
+def _digest(text):
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
 
 class ContextBuilder:
+    """Packs retrieved chunks and their assets into a token budget.
+
+    Hits are taken in relevance order (as returned by the retriever). Each
+    chunk's text goes in first, then its images, tables and code snippets,
+    skipping anything already included by an earlier chunk and anything
+    that no longer fits the remaining budget. Asset payloads are read from
+    the AssetStore only for the assets that make it into the context.
+    """
+
+    # Rough cost of the separators/markup build_prompt adds around each piece
+    PIECE_OVERHEAD = 4
+
+    def __init__(self, token_budget: int = DEFAULT_TOKEN_BUDGET, tokenizer: Tokenizer = None,
+                 asset_store: AssetStore = None, db_path=DEFAULT_DB_PATH):
+        self.token_budget = token_budget
+        self.tokenizer = tokenizer or Tokenizer.get()
+        self.asset_store = asset_store or registry.get_asset_store(db_path)
+
+    @staticmethod
+    def _asset_ids(meta, metadata_key):
+        return [id_ for id_ in (meta.get(metadata_key) or "").split(",") if id_]
+
+    def _legacy_assets(self, meta):
+        # Chunks indexed before the asset store carry their assets as JSON blobs
+        assets = []
+        for chunk_key, (kind, _) in ASSET_KEYS.items():
+            for item in _load_list(meta.get(chunk_key)):
+                payload = asset_payload(kind, item)
+                if has_content(kind, payload):
+                    tokens = self.tokenizer.count(prompt_text(kind, payload))
+                    assets.append((kind, asset_id(kind, payload), tokens, payload))
+        return assets
+
     def build(self, results):
+        with span("query.context"):
+            return self._build(results)
+
+    def _build(self, results):
         # print(results)
 
         chunks = results["documents"][0]
-        metadata_list = results["metadatas"][0]
+        metadata_list = [meta or {} for meta in results["metadatas"][0]]
 
-        context = "\n\n".join(chunks)
+        # Token counts for every referenced asset, in one query and without payloads
+        candidate_ids = [
+            id_ for meta in metadata_list for _, metadata_key in ASSET_KEYS.values()
+            for id_ in self._asset_ids(meta, metadata_key)
+        ]
+        asset_tokens = self.asset_store.token_counts(candidate_ids)
 
-        image_refs = []
-        table_refs = []
-        code_snippets = []
+        remaining = self.token_budget
+        seen = set()
+        texts = []
+        selected = []  # (kind, asset id, inline payload or None)
+        dropped = 0
+
+        def take(kind, key, tokens):
+            nonlocal remaining, dropped
+            if (kind, key) in seen:
+                return False
+            cost = tokens + self.PIECE_OVERHEAD
+            if cost > remaining:
+                dropped += 1
+                return False
+            seen.add((kind, key))
+            remaining -= cost
+            return True
 
-        for meta in metadata_list:
+        for chunk, meta in zip(chunks, metadata_list):
+            chunk = chunk or ""
+            if not texts and self.tokenizer.count(chunk) + self.PIECE_OVERHEAD > remaining:
+                # Never return an empty context: trim the most relevant chunk to fit
+                chunk = self.tokenizer.truncate(chunk, remaining - self.PIECE_OVERHEAD)
+            # A repeated text (e.g. a boilerplate caption) is packed once, but each chunk
+            # carrying it may still reference assets of its own
+            key = _digest(chunk)
+            if ("text", key) not in seen:
+                if not take("text", key, self.tokenizer.count(chunk)):
+                    continue
+                texts.append(chunk)
 
-            images_json_str = meta.get("images","[]")
-            try:
-                images = json.loads(images_json_str)
-                image_refs.extend([(img["path"], img.get("caption","No Caption")) for img in images])
-            except Exception as e:
-                print(f"Error parsing images: {e}")
+            if "image_ids" in meta:
+                assets = [
+                    (kind, id_, asset_tokens[id_], None)
+                    for kind, metadata_key in ASSET_KEYS.values()
+                    for id_ in self._asset_ids(meta, metadata_key) if id_ in asset_tokens
+                ]
+            else:
+                assets = self._legacy_assets(meta)
+            for kind, id_, tokens, payload in assets:
+                if take(kind, id_, tokens):
+                    selected.append((kind, id_, payload))
 
-            table_refs.extend(meta.get("tables", []))
-            code_snippets.extend(meta.get("code", []))
+        payloads = self.asset_store.get_many([id_ for _, id_, payload in selected if payload is None])
+        image_refs = []
+        table_refs = []
+        code_snippets = []
+        for kind, id_, payload in selected:
+            payload = payload or payloads.get(id_)
+            if payload is None:
+                continue
+            if kind == "image":
+                image_refs.append((payload["path"], payload.get("caption") or "No Caption"))
+            elif kind == "table":
+                table_refs.append(prompt_text(kind, payload))
+            else:
+                code_snippets.append(prompt_text(kind, payload))
 
         return {
-            "context": context,
+            "context": "\n\n".join(texts),
             "images": image_refs,
             "tables": table_refs,
-            "code": code_snippets
+            "code": code_snippets,
+            "tokens": self.token_budget - remaining,
+            "dropped": dropped
         }
@@ -0,0 +1,113 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from src.embedding.model_registry import registry, DEFAULT_MODEL_NAME
+
+# How long the first queued query waits for others to join its batch
+QUERY_BATCH_WAIT_MS = float(os.getenv("QUERY_BATCH_WAIT_MS", "2"))
+# Most queries encoded in one forward pass (1 disables batching)
+QUERY_BATCH_SIZE = int(os.getenv("QUERY_BATCH_SIZE", "32"))
+
+# Upper bounds of the batch size histogram buckets
+_BATCH_BUCKETS = (1, 2, 4, 8, 16, 32, 64)
+
+
+class EmbeddingScheduler:
+    """Micro-batches concurrent encode requests for one model.
+
+    Callers block on their own future while a worker thread collects
+    requests for up to max_wait_ms (or max_batch items), encodes them in
+    one forward pass and hands every caller its vector.
+    """
+
+    _instances = {}
+    _lock = threading.Lock()
+
+    def __init__(self, model_name: str = DEFAULT_MODEL_NAME, max_batch: int = QUERY_BATCH_SIZE,
+                 max_wait_ms: float = QUERY_BATCH_WAIT_MS):
+        self.model_name = model_name
+        self.model = registry.get_encoder(model_name)
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max_wait_ms / 1000
+        self._queue = queue.Queue()
+
+        self.requests = 0
+        self.batches = 0
+        self.max_queue_depth = 0
+        self.wait_seconds = 0.0
+        self.encode_seconds = 0.0
+        self.batch_sizes = {bucket: 0 for bucket in _BATCH_BUCKETS + ("inf",)}
+
+        self._worker = threading.Thread(target=self._run, name=f"embed-{model_name}", daemon=True)
+        self._worker.start()
+
+    @classmethod
+    def get(cls, model_name: str = DEFAULT_MODEL_NAME):
+        with cls._lock:
+            if model_name not in cls._instances:
+                cls._instances[model_name] = cls(model_name)
+            return cls._instances[model_name]
+
+    @classmethod
+    def metrics(cls):
+        return {name: scheduler.snapshot() for name, scheduler in cls._instances.items()}
+
+    def submit(self, text: str):
+        future = Future()
+        self._queue.put((text, future, time.perf_counter()))
+        self.max_queue_depth = max(self.max_queue_depth, self._queue.qsize())
+        return future
+
+    def encode(self, text: str):
+        return self.submit(text).result()
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            started = time.perf_counter()
+            try:
+                vectors = self.model.encode(
+                    [text for text, _, _ in batch], batch_size=len(batch), convert_to_numpy=True
+                )
+            except Exception as e:
+                for _, future, _ in batch:
+                    future.set_exception(e)
+                continue
+            for (_, future, _), vector in zip(batch, vectors):
+                future.set_result(vector)
+            self._record(batch, started)
+
+    def _record(self, batch, started):
+        self.requests += len(batch)
+        self.batches += 1
+        self.wait_seconds += sum(started - queued_at for _, _, queued_at in batch)
+        self.encode_seconds += time.perf_counter() - started
+        bucket = next((bucket for bucket in _BATCH_BUCKETS if len(batch) <= bucket), "inf")
+        self.batch_sizes[bucket] += 1
+
+    def snapshot(self):
+        return {
+            "requests": self.requests,
+            "batches": self.batches,
+            "mean_batch_size": round(self.requests / self.batches, 2) if self.batches else 0.0,
+            "batch_sizes": {f"le_{bucket}": count for bucket, count in self.batch_sizes.items()},
+            "queue_depth": self._queue.qsize(),
+            "max_queue_depth": self.max_queue_depth,
+            "mean_wait_ms": round(self.wait_seconds / self.requests * 1000, 3) if self.requests else 0.0,
+            "mean_encode_ms": round(self.encode_seconds / self.batches * 1000, 3) if self.batches else 0.0,
+            "max_batch": self.max_batch,
+            "max_wait_ms": self.max_wait * 1000
+        }
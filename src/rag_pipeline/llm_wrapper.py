@@ -1,86 +1,273 @@
-import requests
+import json
 import os
+import threading
+import time
+import httpx
 from pathlib import Path
 from dotenv import load_dotenv
+from src.rag_pipeline.resilience import ResilientCaller, CircuitBreaker, LLMAPIError
+from src.rag_pipeline.prompt_templates import PromptTemplate, DEFAULT_PROMPT_VERSION
+from src.observability.tracing import span, observe
+
+DEFAULT_API_URL = "https://openrouter.ai/api/v1/chat/completions"
+
+
+def _default_timeout():
+    # The read timeout bounds the gap between bytes, so it also caps a stalled stream
+    return httpx.Timeout(
+        connect=float(os.getenv("LLM_CONNECT_TIMEOUT", "5")),
+        read=float(os.getenv("LLM_READ_TIMEOUT", "60")),
+        write=float(os.getenv("LLM_WRITE_TIMEOUT", "10")),
+        pool=float(os.getenv("LLM_POOL_TIMEOUT", "5")),
+    )
+
+
+def _resilient_callers():
+    # Completions and streams share one breaker (same upstream) but keep separate
+    # latency windows: stream latency is time to first token, not full completion
+    breaker = CircuitBreaker(
+        failure_threshold=int(os.getenv("LLM_BREAKER_FAILURES", "5")),
+        reset_timeout=float(os.getenv("LLM_BREAKER_RESET", "30")),
+    )
+    hedge_percentile = os.getenv("LLM_HEDGE_PERCENTILE")
+    options = {
+        "max_attempts": int(os.getenv("LLM_MAX_ATTEMPTS", "3")),
+        "deadline": float(os.getenv("LLM_DEADLINE", "90")),
+        "breaker": breaker,
+    }
+    return {
+        "complete": ResilientCaller(
+            hedge_percentile=float(hedge_percentile) if hedge_percentile else None, **options
+        ),
+        "stream": ResilientCaller(**options),
+    }
+
+
+def _retry_after(response):
+    try:
+        return float(response.headers.get("Retry-After"))
+    except (TypeError, ValueError):
+        return None
+
 
 class LLMWrapper:
-    def __init__(self, api_key: str = None, model: str = "mistral-7b-instruct"):
+    # Connection pools are shared by every LLMWrapper in the process, so keep-alive
+    # connections (and their TLS sessions) are reused across requests
+    _client = None
+    _async_client = None
+    _callers = None
+    _client_lock = threading.Lock()
+    _limits = httpx.Limits(max_connections=100, max_keepalive_connections=20)
+
+    def __init__(self, api_key: str = None, model: str = "mistral-7b-instruct", api_url: str = None,
+                 timeout: httpx.Timeout = None, prompt_version: str = DEFAULT_PROMPT_VERSION):
         env_path = Path(__file__).resolve().parents[2] / ".env"
         load_dotenv(dotenv_path=env_path)
         self.api_key = api_key or os.getenv("OPENROUTER_API_KEY")
-        self.api_url = "https://openrouter.ai/api/v1/chat/completions"
+        self.api_url = api_url or os.getenv("OPENROUTER_API_URL", DEFAULT_API_URL)
         self.model = f"mistralai/{model}"
+        self.timeout = timeout or _default_timeout()
+        self.template = PromptTemplate.get(prompt_version)
+        self.last_prompt_stats = None
 
         if not self.api_key:
             raise ValueError("OpenRouter API key not provided. Set it in code or as OPENROUTER_API_KEY.")
 
+    @classmethod
+    def _sync_client(cls):
+        with cls._client_lock:
+            if cls._client is None:
+                cls._client = httpx.Client(limits=cls._limits)
+            return cls._client
+
+    @classmethod
+    def _get_async_client(cls):
+        if cls._async_client is None:
+            cls._async_client = httpx.AsyncClient(limits=cls._limits)
+        return cls._async_client
+
+    @classmethod
+    def _resilience(cls):
+        if cls._callers is None:
+            cls._callers = _resilient_callers()
+        return cls._callers
+
+    @classmethod
+    def resilience_metrics(cls):
+        return {name: caller.snapshot() for name, caller in cls._resilience().items()}
+
+    @classmethod
+    async def aclose(cls):
+        if cls._async_client is not None:
+            await cls._async_client.aclose()
+            cls._async_client = None
+        with cls._client_lock:
+            if cls._client is not None:
+                cls._client.close()
+                cls._client = None
+
     def build_prompt(self,context, images, tables, code_snippets):
-        prompt = "### Contextual Explanation\n\n"
+        # Collect parts and join once: linear in the prompt size
+        parts = ["### Contextual Explanation\n\n"]
 
         if context:
+            if isinstance(context, str):
+                context = [context]
             for doc in context:
-                prompt += f"{doc}\n\n"
+                parts.append(f"{doc}\n\n")
 
         if images:
             for path,caption in images:
 
-                prompt += f"![{caption}]({path})\n\n*{caption}*\n\n"
+                parts.append(f"![{caption}]({path})\n\n*{caption}*\n\n")
 
         if tables:
             for tbl in tables:
-                prompt += "**Table:**\n" + tbl + "\n\n"
+                parts.append("**Table:**\n" + tbl + "\n\n")
 
         if code_snippets:
             for code in code_snippets:
-                prompt += "```" + code + "\n```\n\n"
+                parts.append("```\n" + code + "\n```\n\n")
 
-        prompt += "### Please explain the above material in a clear, detailed manner, incorporating all elements as appropriate."
-        return prompt
+        return "".join(parts).rstrip()
 
-    def query(
-        self, 
-        user_query: str, 
-        context: str, 
-        image_refs: list, 
-        table_refs: list = None, 
-        code_snippets: list = None, 
-        system_prompt: str = None
-    ) -> str:
-        headers = {
+    def _headers(self):
+        return {
             "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "application/json",
             "HTTP-Referer": "http://localhost",  # Replace if hosted
         }
 
-
-        user_prompt = self.build_prompt(context,image_refs,table_refs,code_snippets)
-
-        messages = []
-        if system_prompt:
-            messages.append({"role": "system", "content": system_prompt})
-
-        messages.append({
-            "role": "user",
-            "content": f"""
-You are a helpful assistant. Use only the context provided below to answer the query. Do not hallucinate information. If you don't find enough context, say so.
-
-### Query:
-{user_query}
-### Context:
-{user_prompt}
-Please format your answer with headings, bullet points, or code blocks where appropriate.
-"""
-        })
+    def _payload(self, user_query, context, image_refs, table_refs, code_snippets, system_prompt, stream=False):
+        # The system message is the compiled template prefix, identical on every request;
+        # everything that varies goes in the user message after it
+        with span("query.prompt"):
+            context_prompt = self.build_prompt(context,image_refs,table_refs,code_snippets)
+            messages, stats = self.template.messages(user_query, context_prompt)
+            if system_prompt:
+                # Explicit override: still works, but the prefix is no longer the shared one
+                messages[0] = {"role": "system", "content": system_prompt}
+                stats = dict(stats, version="custom", prefix_tokens=self.template.tokenizer.count(system_prompt))
+        self.last_prompt_stats = stats
 
         payload = {
             "model": self.model,
             "messages": messages,
             # "transform": "middle-out"
         }
+        if stream:
+            payload["stream"] = True
+        return payload
 
-        response = requests.post(self.api_url, headers=headers, json=payload)
+    @staticmethod
+    def _api_error(status_code, text, retry_after=None):
+        return LLMAPIError(status_code, text, retry_after)
+
+    def query(
+        self,
+        user_query: str,
+        context: str,
+        image_refs: list,
+        table_refs: list = None,
+        code_snippets: list = None,
+        system_prompt: str = None
+    ) -> str:
+        payload = self._payload(user_query, context, image_refs, table_refs, code_snippets, system_prompt)
+        with span("llm.total"):
+            response = self._sync_client().post(
+                self.api_url, headers=self._headers(), json=payload, timeout=self.timeout
+            )
 
         if response.status_code == 200:
             return response.json()["choices"][0]["message"]["content"]
         else:
-            raise Exception(f"OpenRouter API error: {response.status_code} - {response.text}")
+            raise self._api_error(response.status_code, response.text)
+
+    async def aquery(
+        self,
+        user_query: str,
+        context: str,
+        image_refs: list,
+        table_refs: list = None,
+        code_snippets: list = None,
+        system_prompt: str = None
+    ) -> str:
+        payload = self._payload(user_query, context, image_refs, table_refs, code_snippets, system_prompt)
+        client = self._get_async_client()
+
+        async def attempt():
+            response = await client.post(
+                self.api_url, headers=self._headers(), json=payload, timeout=self.timeout
+            )
+            if response.status_code == 200:
+                return response.json()["choices"][0]["message"]["content"]
+            raise self._api_error(response.status_code, response.text, _retry_after(response))
+
+        # Non-streaming: the whole answer arrives at once, so there is no separate first-token time
+        with span("llm.total"):
+            return await self._resilience()["complete"].call(attempt)
+
+    async def astream(
+        self,
+        user_query: str,
+        context: str,
+        image_refs: list,
+        table_refs: list = None,
+        code_snippets: list = None,
+        system_prompt: str = None
+    ):
+        # Yields content deltas as the provider streams them (OpenAI-style SSE).
+        # Retries and the breaker only cover opening the stream up to the first
+        # token; once tokens have been sent a failure is passed on to the caller.
+        payload = self._payload(
+            user_query, context, image_refs, table_refs, code_snippets, system_prompt, stream=True
+        )
+        client = self._get_async_client()
+
+        async def open_stream():
+            request = client.build_request(
+                "POST", self.api_url, headers=self._headers(), json=payload, timeout=self.timeout
+            )
+            response = await client.send(request, stream=True)
+            try:
+                if response.status_code != 200:
+                    body = await response.aread()
+                    raise self._api_error(
+                        response.status_code, body.decode("utf-8", "replace"), _retry_after(response)
+                    )
+                deltas = self._iter_deltas(response)
+                first = await anext(deltas, None)
+                return response, deltas, first
+            except BaseException:
+                await response.aclose()
+                raise
+
+        started = time.perf_counter()
+        response, deltas, first = await self._resilience()["stream"].call(open_stream, hedge=False)
+        observe("llm.ttft", time.perf_counter() - started)
+        try:
+            if first is not None:
+                yield first
+                async for delta in deltas:
+                    yield delta
+        finally:
+            observe("llm.total", time.perf_counter() - started)
+            await response.aclose()
+
+    async def _iter_deltas(self, response):
+        async for line in response.aiter_lines():
+            # Blank lines separate events; ":"-prefixed lines are keep-alive comments
+            if not line.startswith("data:"):
+                continue
+            data = line[len("data:"):].strip()
+            if data == "[DONE]":
+                break
+            event = json.loads(data)
+            if "error" in event:
+                error = event["error"]
+                code = error.get("code", 502) if isinstance(error, dict) else 502
+                raise self._api_error(code if isinstance(code, int) else 502, str(error))
+            choices = event.get("choices") or [{}]
+            delta = choices[0].get("delta", {}).get("content")
+            if delta:
+                yield delta
@@ -0,0 +1,58 @@
+import os
+import threading
+from pathlib import Path
+from string import Template
+from src.rag_pipeline.tokenizer import Tokenizer
+
+PROMPT_DIR = Path(__file__).resolve().parent / "prompts"
+DEFAULT_PROMPT_VERSION = os.getenv("PROMPT_VERSION", "v1")
+
+
+def _read(path):
+    # Normalise line endings so the compiled prefix is byte-identical on every platform
+    return path.read_text(encoding="utf-8").replace("\r\n", "\n").strip()
+
+
+class PromptTemplate:
+    """A versioned prompt loaded from prompts/<version>/.
+
+    system.md and instructions.md are compiled once into the system message,
+    which is the fixed prefix of every request. Only user.md, filled with the
+    query and packed context, varies, so provider-side prompt caching can
+    match the whole prefix.
+    """
+
+    _instances = {}
+    _lock = threading.Lock()
+
+    def __init__(self, version: str = DEFAULT_PROMPT_VERSION, tokenizer: Tokenizer = None):
+        template_dir = PROMPT_DIR / version
+        if not template_dir.is_dir():
+            raise ValueError(f"Unknown prompt version: {version}")
+        self.version = version
+        self.tokenizer = tokenizer or Tokenizer.get()
+
+        self.prefix = _read(template_dir / "system.md") + "\n\n" + _read(template_dir / "instructions.md")
+        self.user_template = Template(_read(template_dir / "user.md"))
+        self.prefix_tokens = self.tokenizer.count(self.prefix)
+
+    @classmethod
+    def get(cls, version: str = DEFAULT_PROMPT_VERSION):
+        with cls._lock:
+            if version not in cls._instances:
+                cls._instances[version] = cls(version)
+            return cls._instances[version]
+
+    def messages(self, user_query: str, context_prompt: str):
+        # Returns the chat messages plus prefix/suffix token counts for this request
+        user_message = self.user_template.safe_substitute(query=user_query, context=context_prompt)
+        messages = [
+            {"role": "system", "content": self.prefix},
+            {"role": "user", "content": user_message},
+        ]
+        stats = {
+            "version": self.version,
+            "prefix_tokens": self.prefix_tokens,
+            "suffix_tokens": self.tokenizer.count(user_message),
+        }
+        return messages, stats
@@ -1,8 +1,15 @@
-from sentence_transformers import SentenceTransformer
+from src.embedding.model_registry import registry, DEFAULT_MODEL_NAME
+from src.rag_pipeline.embedding_scheduler import EmbeddingScheduler, QUERY_BATCH_SIZE
+from src.observability.tracing import span
 
 class QueryEmbedder:
-    def __init__(self, model_name="all-MiniLM-L6-v2"):
-        self.model = SentenceTransformer(model_name)
+    def __init__(self, model_name=DEFAULT_MODEL_NAME):
+        # Concurrent queries share forward passes through the scheduler unless batching is off
+        self.scheduler = EmbeddingScheduler.get(model_name) if QUERY_BATCH_SIZE > 1 else None
+        self.model = registry.get_encoder(model_name)
 
     def embed(self, query: str):
-        return self.model.encode(query).tolist()
\ No newline at end of file
+        with span("query.embed"):
+            if self.scheduler is not None:
+                return self.scheduler.encode(query).tolist()
+            return self.model.encode(query).tolist()
@@ -0,0 +1,258 @@
+import asyncio
+import random
+import threading
+import time
+from collections import deque
+import httpx
+
+# Upstream statuses worth retrying: timeouts, rate limits and server-side failures
+RETRYABLE_STATUS = {408, 425, 429, 500, 502, 503, 504}
+
+
+class LLMAPIError(Exception):
+    def __init__(self, status_code: int, detail: str, retry_after: float = None):
+        super().__init__(f"OpenRouter API error: {status_code} - {detail}")
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class CircuitOpenError(Exception):
+    pass
+
+
+def is_retryable(error):
+    if isinstance(error, LLMAPIError):
+        return error.status_code in RETRYABLE_STATUS
+    return isinstance(error, (httpx.TransportError, asyncio.TimeoutError))
+
+
+class LatencyTracker:
+    """Rolling window of successful call latencies."""
+
+    def __init__(self, window: int = 500):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, p: float):
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return None
+        index = min(len(samples) - 1, max(0, round(p / 100 * len(samples)) - 1))
+        return samples[index]
+
+    def __len__(self):
+        return len(self._samples)
+
+    def snapshot(self):
+        return {
+            "samples": len(self),
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99)
+        }
+
+
+class CircuitBreaker:
+    """Fails fast after `failure_threshold` consecutive upstream failures.
+
+    After `reset_timeout` seconds one probe call is let through (half-open);
+    its success closes the breaker, its failure opens it again.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.times_opened = 0
+        self.rejected = 0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                self._probe_in_flight = False
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            self.rejected += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.consecutive_failures = 0
+            self._probe_in_flight = False
+
+    def release(self):
+        # The probe ended without a verdict (cancelled, or a client-side error); let the next call probe
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.consecutive_failures += 1
+            if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    self.times_opened += 1
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+                self._probe_in_flight = False
+
+    def snapshot(self):
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "times_opened": self.times_opened,
+            "rejected": self.rejected
+        }
+
+
+class ResilientCaller:
+    """Deadline-aware retries, optional hedging and a circuit breaker around an async call.
+
+    `call(attempt)` runs `attempt()` (a coroutine function) until it succeeds,
+    a non-retryable error is raised, the deadline passes or attempts run out.
+    With hedge_percentile set, a duplicate attempt is started once the first
+    has been running longer than that percentile of recent latencies, and the
+    first one to succeed wins.
+    """
+
+    def __init__(self, max_attempts: int = 3, base_delay: float = 0.25, max_delay: float = 4.0,
+                 deadline: float = 60.0, hedge_percentile: float = None, hedge_min_samples: int = 20,
+                 breaker: CircuitBreaker = None):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline = deadline
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+        self.breaker = breaker or CircuitBreaker()
+        self.latency = LatencyTracker()
+        self.counters = {
+            "calls": 0,
+            "successes": 0,
+            "failures": 0,
+            "retries": 0,
+            "hedges": 0,
+            "hedge_wins": 0,
+            "short_circuited": 0,
+            "deadline_exceeded": 0
+        }
+
+    def _hedge_delay(self):
+        if self.hedge_percentile is None or len(self.latency) < self.hedge_min_samples:
+            return None
+        return self.latency.percentile(self.hedge_percentile)
+
+    async def _timed(self, attempt):
+        start = time.monotonic()
+        result = await attempt()
+        self.latency.record(time.monotonic() - start)
+        return result
+
+    async def _hedged(self, attempt):
+        hedge_delay = self._hedge_delay()
+        if hedge_delay is None:
+            return await self._timed(attempt)
+
+        primary = asyncio.ensure_future(self._timed(attempt))
+        pending = {primary}
+        try:
+            done, pending = await asyncio.wait(pending, timeout=hedge_delay)
+            if done:
+                return primary.result()
+
+            self.counters["hedges"] += 1
+            hedge = asyncio.ensure_future(self._timed(attempt))
+            pending.add(hedge)
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            self.counters["hedge_wins"] += 1
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def _backoff(self, attempt_number, error):
+        # Full jitter: uniform in [0, min(max_delay, base * 2^n)], but honour Retry-After
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt_number - 1)))
+        retry_after = getattr(error, "retry_after", None)
+        return max(delay, retry_after) if retry_after else delay
+
+    async def call(self, attempt, hedge: bool = True):
+        self.counters["calls"] += 1
+        if not self.breaker.allow():
+            self.counters["short_circuited"] += 1
+            raise CircuitOpenError("LLM upstream is unavailable (circuit open); try again later.")
+        try:
+            return await self._attempts(attempt, hedge)
+        except BaseException:
+            # CancelledError (e.g. a client leaving /query/stream) skips both record_* calls;
+            # a half-open breaker would otherwise wait for this probe forever
+            self.breaker.release()
+            raise
+
+    async def _attempts(self, attempt, hedge):
+        deadline_at = time.monotonic() + self.deadline
+        error = None
+        for attempt_number in range(1, self.max_attempts + 1):
+            remaining = deadline_at - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                run = self._hedged(attempt) if hedge else self._timed(attempt)
+                result = await asyncio.wait_for(run, remaining)
+            except Exception as e:
+                error = e
+                if not is_retryable(e):
+                    # Client-side errors (bad request, auth) say nothing about upstream health:
+                    # free the probe slot but leave the breaker's state as it is
+                    self.breaker.release()
+                    break
+                self.breaker.record_failure()
+                if self.breaker.state == CircuitBreaker.OPEN or attempt_number == self.max_attempts:
+                    break
+                delay = self._backoff(attempt_number, e)
+                if time.monotonic() + delay >= deadline_at:
+                    break
+                self.counters["retries"] += 1
+                await asyncio.sleep(delay)
+            else:
+                self.breaker.record_success()
+                self.counters["successes"] += 1
+                return result
+
+        self.counters["failures"] += 1
+        if error is None or isinstance(error, asyncio.TimeoutError):
+            self.counters["deadline_exceeded"] += 1
+            raise TimeoutError(f"LLM call exceeded its {self.deadline}s deadline") from error
+        raise error
+
+    def snapshot(self):
+        return {
+            **self.counters,
+            "hedge_delay": self._hedge_delay(),
+            "latency": self.latency.snapshot(),
+            "breaker": self.breaker.snapshot()
+        }
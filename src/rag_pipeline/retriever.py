@@ -1,10 +1,14 @@
-import chromadb
+from src.embedding.model_registry import DEFAULT_DB_PATH
+from src.embedding.vector_store import open_vector_store, DEFAULT_VECTOR_BACKEND
+from src.observability.tracing import span
 
 class Retriever:
-    def __init__(self, db_path="../data/chroma_db", collection_name="session_id"):
-        self.client = chromadb.PersistentClient(path=db_path)
-        self.collection = self.client.get_or_create_collection(name=collection_name)
+    def __init__(self, db_path=DEFAULT_DB_PATH, collection_name="session_id", backend=DEFAULT_VECTOR_BACKEND,
+                 store=None):
+        # `store` reuses an already opened vector store (e.g. from SessionManager)
+        self.store = store or open_vector_store(collection_name, db_path, backend)
 
     def retrieve(self, query_embedding, top_k=5):
-        results = self.collection.query(query_embeddings=[query_embedding], n_results=top_k)
-        return results
\ No newline at end of file
+        with span("query.retrieve"):
+            results = self.store.query(query_embedding, top_k=top_k)
+        return results
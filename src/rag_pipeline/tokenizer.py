@@ -0,0 +1,48 @@
+import os
+import re
+import threading
+
+DEFAULT_ENCODING = os.getenv("PROMPT_TOKENIZER", "cl100k_base")
+
+
+class Tokenizer:
+    """Token counting for prompt budgeting.
+
+    Uses a tiktoken BPE encoding. If it can't be loaded (e.g. no network to
+    fetch the vocabulary on first use) it falls back to a word/punctuation
+    estimate, which runs slightly high for English prose.
+    """
+
+    _instances = {}
+    _lock = threading.Lock()
+
+    def __init__(self, encoding_name: str = DEFAULT_ENCODING):
+        self.encoding_name = encoding_name
+        try:
+            import tiktoken
+            self._encoding = tiktoken.get_encoding(encoding_name)
+        except Exception:
+            self._encoding = None
+
+    @classmethod
+    def get(cls, encoding_name: str = DEFAULT_ENCODING):
+        with cls._lock:
+            if encoding_name not in cls._instances:
+                cls._instances[encoding_name] = cls(encoding_name)
+            return cls._instances[encoding_name]
+
+    def count(self, text: str):
+        if not text:
+            return 0
+        if self._encoding is not None:
+            return len(self._encoding.encode(text, disallowed_special=()))
+        return len(re.findall(r"\w+|[^\w\s]", text))
+
+    def truncate(self, text: str, max_tokens: int):
+        if max_tokens <= 0:
+            return ""
+        if self._encoding is not None:
+            tokens = self._encoding.encode(text, disallowed_special=())
+            return text if len(tokens) <= max_tokens else self._encoding.decode(tokens[:max_tokens])
+        pieces = list(re.finditer(r"\w+|[^\w\s]", text))
+        return text if len(pieces) <= max_tokens else text[:pieces[max_tokens].start()].rstrip()
@@ -0,0 +1,24 @@
+import asyncio
+from src.rag_pipeline.answer_cache import SingleFlight
+
+
+def test_followers_join_a_started_flight():
+    async def scenario():
+        flight = SingleFlight()
+        runs = []
+
+        async def answer():
+            runs.append(1)
+            await asyncio.sleep(0.05)
+            return "answer"
+
+        assert flight.join("key") is None
+        leader = flight.start("key", answer)
+        results = await asyncio.gather(flight.do("key", answer), flight.do("key", answer), leader)
+
+        assert results == ["answer"] * 3
+        assert len(runs) == 1
+        assert flight.snapshot() == {"executed": 1, "coalesced": 2, "in_flight": 0}
+        assert flight.join("key") is None
+
+    asyncio.run(scenario())
@@ -0,0 +1,21 @@
+from src.embedding.asset_store import AssetStore
+
+
+def _row(id_, text):
+    return id_, "code", {"text": text}, 3
+
+
+def test_release_deletes_rows_no_other_session_references(tmp_path):
+    store = AssetStore(tmp_path / "assets.sqlite")
+    store.put_many([_row("legacy", "kept")])  # written before references were recorded
+    store.put_many([_row("shared", "a"), _row("only-a", "b")], session_id="session-a")
+    store.put_many([_row("shared", "a"), _row("only-b", "c")], session_id="session-b")
+
+    assert store.release("session-a") == 1
+    assert set(store.token_counts(["legacy", "shared", "only-a", "only-b"])) == {"legacy", "shared", "only-b"}
+
+    assert store.release("session-b") == 2
+    assert set(store.get_many(["legacy", "shared", "only-b"])) == {"legacy"}
+    assert store.release("session-b") == 0
+    assert store.disk_bytes() > 0
+    store.close()
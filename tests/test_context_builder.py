@@ -0,0 +1,42 @@
+from src.rag_pipeline.context_builder import ContextBuilder
+
+
+class _WordTokenizer:
+    def count(self, text):
+        return len(text.split())
+
+    def truncate(self, text, max_tokens):
+        return " ".join(text.split()[:max_tokens])
+
+
+class _Assets:
+    def __init__(self, payloads):
+        self.payloads = payloads
+
+    def token_counts(self, ids):
+        return {id_: 5 for id_ in ids if id_ in self.payloads}
+
+    def get_many(self, ids):
+        return {id_: self.payloads[id_] for id_ in ids if id_ in self.payloads}
+
+
+def _results(*hits):
+    return {"documents": [[text for text, _ in hits]], "metadatas": [[meta for _, meta in hits]]}
+
+
+def test_duplicate_text_still_packs_its_assets():
+    assets = _Assets({
+        "img-a": {"path": "images/a.png", "caption": "first"},
+        "img-b": {"path": "images/b.png", "caption": "second"},
+    })
+    builder = ContextBuilder(token_budget=200, tokenizer=_WordTokenizer(), asset_store=assets)
+
+    context = builder.build(_results(
+        ("See the figure below.", {"image_ids": "img-a"}),
+        ("See the figure below.", {"image_ids": "img-b"}),
+        ("See the figure below.", {"image_ids": "img-a"}),
+    ))
+
+    assert context["context"] == "See the figure below."
+    assert context["images"] == [("images/a.png", "first"), ("images/b.png", "second")]
+    assert context["tokens"] == 4 + 4 + 2 * (5 + 4)
@@ -0,0 +1,78 @@
+import asyncio
+import pytest
+from src.rag_pipeline.resilience import CircuitBreaker, CircuitOpenError, LLMAPIError, ResilientCaller
+
+
+def test_cancelled_half_open_probe_releases_breaker():
+    async def scenario():
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+        caller = ResilientCaller(max_attempts=1, breaker=breaker)
+
+        async def fail():
+            raise LLMAPIError(503, "unavailable")
+
+        with pytest.raises(LLMAPIError):
+            await caller.call(fail)
+        assert breaker.state == CircuitBreaker.OPEN
+
+        started = asyncio.Event()
+
+        async def hang():
+            started.set()
+            await asyncio.sleep(3600)
+
+        probe = asyncio.ensure_future(caller.call(hang))
+        await started.wait()
+        assert breaker.state == CircuitBreaker.HALF_OPEN
+        probe.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await probe
+
+        async def ok():
+            return "ok"
+
+        assert await caller.call(ok) == "ok"
+        assert breaker.state == CircuitBreaker.CLOSED
+
+    asyncio.run(scenario())
+
+
+def test_half_open_allows_single_probe():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+    breaker.record_failure()
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.release()
+    assert breaker.allow()
+
+
+def test_open_breaker_short_circuits():
+    async def scenario():
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=3600)
+        breaker.record_failure()
+        caller = ResilientCaller(breaker=breaker)
+
+        async def ok():
+            return "ok"
+
+        with pytest.raises(CircuitOpenError):
+            await caller.call(ok)
+
+    asyncio.run(scenario())
+
+
+def test_client_error_does_not_close_half_open_breaker():
+    async def scenario():
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+        breaker.record_failure()
+        caller = ResilientCaller(max_attempts=3, breaker=breaker)
+
+        async def bad_request():
+            raise LLMAPIError(400, "bad request")
+
+        with pytest.raises(LLMAPIError):
+            await caller.call(bad_request)
+        assert breaker.state == CircuitBreaker.HALF_OPEN
+        assert breaker.allow()  # the probe slot was freed for the next call
+
+    asyncio.run(scenario())
@@ -0,0 +1,44 @@
+import os
+import time
+from src.ingestion.documents import SessionDocuments
+from src.ingestion.sessions import SessionManager
+
+
+def _write(path, size, age):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(b"x" * size)
+    mtime = time.time() - age
+    os.utime(path, (mtime, mtime))
+    os.utime(path.parent, (mtime, mtime))
+
+
+def test_quota_counts_and_sweeps_upload_cache_without_ttl(tmp_path):
+    data = tmp_path / "data"
+    mb = 1024 * 1024
+    day = 24 * 3600
+    _write(data / "old" / "file.bin", mb, age=2 * day)
+    SessionDocuments(data, "old").save({"doc_id": "doc", "digest": "shared", "ingested_at": 0})
+    _write(data / "old" / ".last_access", 0, age=2 * day)
+    _write(data / "recent" / ".last_access", mb, age=0)
+    _write(data / "_uploads" / "shared" / "chunks.json", mb, age=2 * day)
+    _write(data / "_uploads" / "orphan" / "chunks.json", mb, age=2 * day)
+    _write(data / "_uploads" / "fresh" / "chunks.json", mb, age=0)
+
+    manager = SessionManager(base_dir=data, db_path=tmp_path / "db", ttl=0, disk_quota_mb=2.5)
+    evicted = manager.sweep()
+
+    # The orphaned entry goes first, then the oldest session and the entry only it used;
+    # an entry written moments ago may belong to a job still running
+    assert evicted == ["old"]
+    assert sorted(path.name for path in (data / "_uploads").iterdir()) == ["fresh"]
+    assert manager.upload_cache_evicted == 2
+    assert (data / "recent").is_dir()
+
+
+def test_upload_cache_within_quota_is_kept(tmp_path):
+    data = tmp_path / "data"
+    _write(data / "_uploads" / "orphan" / "chunks.json", 1024, age=2 * 24 * 3600)
+
+    manager = SessionManager(base_dir=data, db_path=tmp_path / "db", ttl=0, disk_quota_mb=1)
+    assert manager.sweep() == []
+    assert (data / "_uploads" / "orphan").is_dir()
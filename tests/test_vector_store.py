@@ -0,0 +1,95 @@
+import numpy as np
+from src.embedding.vector_store import NumpyVectorStore
+
+
+def _batch(start, count, dim=8, doc_id="doc"):
+    rng = np.random.default_rng(start)
+    ids = [f"{doc_id}:{i}" for i in range(start, start + count)]
+    vectors = rng.standard_normal((count, dim)).astype(np.float32)
+    documents = [f"chunk {i}" for i in range(start, start + count)]
+    metadatas = [{"doc_id": doc_id} for _ in range(count)]
+    return ids, vectors, documents, metadatas
+
+
+def test_bulk_publishes_one_generation(tmp_path, monkeypatch):
+    store = NumpyVectorStore(tmp_path, "session")
+    writes = []
+    original = store._publish
+    monkeypatch.setattr(store, "_publish", lambda *args: (writes.append(1), original(*args)))
+
+    with store.bulk():
+        for start in range(0, 640, 64):
+            ids, vectors, documents, metadatas = _batch(start, 64)
+            store.upsert(ids, vectors.tolist(), documents, metadatas)
+        assert store.count() == 0  # nothing is published until the block exits
+        assert store.size() == 640
+    assert len(writes) == 1
+    assert store.count() == 640
+
+    ids, vectors, _, _ = _batch(128, 1)
+    result = store.query(vectors[0].tolist(), top_k=1)
+    assert result["ids"][0] == ids
+    assert result["documents"][0] == ["chunk 128"]
+
+
+def test_bulk_applies_updates_and_deletes(tmp_path):
+    store = NumpyVectorStore(tmp_path, "session")
+    ids, vectors, documents, metadatas = _batch(0, 10)
+    store.upsert(ids, vectors.tolist(), documents, metadatas)
+
+    with store.bulk():
+        store.upsert(ids[:2], vectors[:2].tolist(), ["changed 0", "changed 1"], metadatas[:2])
+        store.delete(ids[5:])
+        store.delete(["doc:missing"])
+    assert store.count() == 5
+    assert store.ids_for_doc("doc") == set(ids[:5])
+    result = store.query(vectors[1].tolist(), top_k=1)
+    assert result["documents"][0] == ["changed 1"]
+
+
+def test_bulk_discards_writes_on_error(tmp_path):
+    store = NumpyVectorStore(tmp_path, "session")
+    ids, vectors, documents, metadatas = _batch(0, 4)
+    try:
+        with store.bulk():
+            store.upsert(ids, vectors.tolist(), documents, metadatas)
+            raise RuntimeError("embedding failed")
+    except RuntimeError:
+        pass
+    assert store.count() == 0
+
+
+def test_writes_append_to_the_published_files(tmp_path):
+    store = NumpyVectorStore(tmp_path, "session", quantization="int8")
+    ids, vectors, documents, metadatas = _batch(0, 10)
+    store.upsert(ids, vectors.tolist(), documents, metadatas)
+    files = {key: store._index()[key] for key in ("vectors", "codes", "records")}
+
+    with store.bulk():
+        store.upsert(*_batch(10, 10))
+        store.upsert(ids[:1], vectors[:1].tolist(), ["changed 0"], metadatas[:1])
+    index = store._index()
+    assert {key: index[key] for key in files} == files
+    assert (store.dir / files["vectors"]).stat().st_size == 21 * 8 * 4
+    assert index["dead"] == [0]
+    assert store.count() == 20
+    assert store.query(vectors[0].tolist(), top_k=1)["documents"][0] == ["changed 0"]
+
+
+def test_rewritten_files_outlive_their_readers(tmp_path):
+    store = NumpyVectorStore(tmp_path, "session")
+    ids, vectors, documents, metadatas = _batch(0, 10)
+    store.upsert(ids, vectors.tolist(), documents, metadatas)
+
+    with store._reading() as index:
+        # Dead rows outnumber live ones after each of these, so the files are rewritten twice
+        store.delete(ids[:8])
+        store.upsert(*_batch(10, 2))
+        store.delete(ids[8:] + ["doc:10"])
+        assert store._index()["vectors"] != index["vectors"]
+        assert store._records(index, [3])[0]["document"] == "chunk 3"
+        assert np.allclose(store._vectors(index)[3], vectors[3] / np.linalg.norm(vectors[3]))
+
+    store.upsert(*_batch(20, 1))
+    assert sorted(path.name for path in store.dir.glob("vectors-*")) == [store._index()["vectors"]]
+    assert store.count() == 2